@@ -13,11 +13,43 @@ import logging
 import httplib
 import tornado.web
 
+from apache.aurora.rest.apps.base import AuroraRequestHandler
+from apache.aurora.rest.apps.caching import JobListingCache, etag_matches
+from apache.aurora.rest.apps.jobspecs import JobspecStore, JobspecsHandler, JobspecHandler, make_digest
+from apache.aurora.rest.apps.applied import AppliedConfigs
+from apache.aurora.rest.apps.fanout import FanOutNotServedHandler, CLUSTERS_PATTERN
+from apache.aurora.rest.executors.updater import RESTART_SETTINGS, UPDATE_SETTINGS
+from apache.aurora.rest.apps.monitoring import MetricsHandler, MemoryHandler, ProfileHandler, observe_request
+from apache.aurora.rest.executors import context, pool
+
 logger = logging.getLogger("tornado.access")
 
+# executor -------------------------------------------------------------
+
+class InstrumentedExecutor():
+    """Executor proxy that instruments the commands executed by the IOLoop
+
+    Implementation of Decorator design pattern. The commands are marked
+    and executed the way the workers of the pools execute them, so that
+    they can be profiled and their memory measured.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def __getattr__(self, name):
+        getattr(self.executor, name)
+
+        def call(*args, **kwargs):
+            request_context = context.current()
+            pool.prepare(request_context)
+            return pool.run_in_server_process(name, self.executor, args, kwargs, request_context)
+
+        return call
+
 # basic handlers -------------------------------------------------------
 
-class VersionHandler(tornado.web.RequestHandler):
+class VersionHandler(AuroraRequestHandler):
     """Request handler reporting the version of the REST service"""
 
     def get(self):
@@ -28,13 +60,24 @@ class VersionHandler(tornado.web.RequestHandler):
 
 # aurora interface handlers --------------------------------------------
 
-class ListJobsHandler(tornado.web.RequestHandler):
+class ListJobsHandler(AuroraRequestHandler):
     """Request handler to list all Aurora jobs matching a search criteria"""
 
     def get(self, cluster, role):
         logger.info("entered ListJobsHandler::GET")
 
-        (jobkey, jobs, errors) = self.application.get_executor().list_jobs(
+        cache = self.application.get_listing_cache()
+        if_none_match = self.request.headers.get("If-None-Match")
+
+        # conditional request for unchanged listing, no need to ask the scheduler
+        etag = cache.get(cluster, role)
+        if etag_matches(if_none_match, etag):
+            logger.info("listing not modified, answered from cache")
+            self.set_header("Etag", etag)
+            self.set_status(httplib.NOT_MODIFIED)
+            return
+
+        (jobkey, jobs, errors) = self.get_executor().list_jobs(
                                                             cluster, role)
         if errors is None:
             logger.info("no errors")
@@ -42,6 +85,13 @@ class ListJobsHandler(tornado.web.RequestHandler):
             if len(jobs) == 0:
                 logger.info("nothing found")
                 self.set_status(httplib.NOT_FOUND)
+            else:
+                etag = cache.put(cluster, role, jobs)
+                self.set_header("Etag", etag)
+                if etag_matches(if_none_match, etag):
+                    logger.info("listing not modified")
+                    self.set_status(httplib.NOT_MODIFIED)
+                    return
             self.write({
                 "status":       "success",
                 "key":          jobkey,
@@ -60,7 +110,7 @@ class ListJobsHandler(tornado.web.RequestHandler):
                 "jobs":         {}
             })
 
-class JobHandler(tornado.web.RequestHandler):
+class JobHandler(AuroraRequestHandler):
     """Request handler to create and kill Aurora jobs
 
     1. HTTP PUT method to create jobs
@@ -71,10 +121,13 @@ class JobHandler(tornado.web.RequestHandler):
     def put(self, cluster, role, environment, jobname):
         logger.info("entered JobHandler::PUT")
 
-        (jobkey, errors) = self.application.get_executor().create_job(
-                                    cluster, role, environment, jobname,
-                                    self.request.body)
+        jobspec = self.get_jobspec()
+        (jobkey, errors) = self.get_executor().create_job(
+                                    cluster, role, environment, jobname, jobspec)
         if errors is None:
+            self.application.get_listing_cache().invalidate(cluster, role)
+            self.application.get_applied_configs().record(
+                            jobkey, make_digest(jobspec) if jobspec is not None else None, [])
             self.set_status(httplib.CREATED)
             self.write({
                 "status":       "success",
@@ -96,15 +149,15 @@ class JobHandler(tornado.web.RequestHandler):
     def delete(self, cluster, role, environment, jobname):
         logger.info("entered JobHandler::DELETE")
 
-        jobspec = None
-        if self.request.body is not None and len(self.request.body) > 0:
-            jobspec = self.request.body
+        jobspec = self.get_jobspec()
         shards = self.get_query_arguments("shards")
 
-        (jobkey, jobs, errors) = self.application.get_executor().delete_job(
+        (jobkey, jobs, errors) = self.get_executor().delete_job(
                                     cluster, role, environment, jobname,
                                     jobspec=jobspec, instances=shards)
         if errors is None:
+            self.application.get_listing_cache().invalidate(cluster, role)
+            self.application.get_applied_configs().forget(jobkey)
             # no jobs were found to terminate, not an error
             if len(jobs) == 0:
                 self.set_status(httplib.NOT_FOUND)
@@ -125,7 +178,7 @@ class JobHandler(tornado.web.RequestHandler):
                 "errors":       errors
             })
 
-class UpdateJobHandler(tornado.web.RequestHandler):
+class UpdateJobHandler(AuroraRequestHandler):
     """Request handlers to update Aurora jobs, or cancel the update of
 
     1. HTTP PUT method to update jobs, optionally with _shards_ query parameter
@@ -135,11 +188,35 @@ class UpdateJobHandler(tornado.web.RequestHandler):
     def put(self, cluster, role, environment, jobname):
         logger.info("entered UpdateJobHandler::PUT")
 
+        jobspec = self.get_jobspec()
         shards = self.get_query_arguments("shards")
-        (jobkey, errors) = self.application.get_executor().update_job(
+        settings = self.get_updater_settings(UPDATE_SETTINGS)
+
+        # the same configuration was applied already, nothing to roll out
+        applied = self.application.get_applied_configs()
+        digest = make_digest(jobspec) if jobspec is not None else None
+        jobkey = "/".join((cluster, role, environment, jobname))
+        if digest is not None and not self.get_bool_argument("force") and \
+                applied.is_applied(jobkey, digest, shards):
+            applied.skipped(jobkey, digest)
+            self.write({
+                "status":       "unchanged",
+                "key":          jobkey,
+                "count":        0,
+                "job":          jobkey,
+                "config":       digest
+            })
+            return
+
+        # the configuration of the job is not known until the update completes
+        applied.submitted(jobkey, digest)
+
+        (jobkey, errors) = self.get_executor().update_job(
                                     cluster, role, environment, jobname,
-                                    jobspec=self.request.body, instances=shards)
+                                    jobspec=jobspec, instances=shards,
+                                    updater_settings=settings)
         if errors is None:
+            applied.record(jobkey, digest, shards)
             self.set_status(httplib.ACCEPTED)
             self.write({
                 "status":       "success",
@@ -161,13 +238,12 @@ class UpdateJobHandler(tornado.web.RequestHandler):
     def delete(self, cluster, role, environment, jobname):
         logger.info("entered UpdateJobHandler::DELETE")
 
-        jobspec = None
-        if self.request.body is not None and len(self.request.body) > 0:
-            jobspec = self.request.body
+        jobspec = self.get_jobspec()
 
-        (jobkey, errors) = self.application.get_executor().cancel_update_job(
+        (jobkey, errors) = self.get_executor().cancel_update_job(
                                     cluster, role, environment, jobname, jobspec)
         if errors is None:
+            self.application.get_applied_configs().forget(jobkey)
             self.set_status(httplib.ACCEPTED)
             self.write({
                 "status":       "success",
@@ -186,7 +262,7 @@ class UpdateJobHandler(tornado.web.RequestHandler):
                 "errors":       errors
             })
 
-class RestartJobHandler(tornado.web.RequestHandler):
+class RestartJobHandler(AuroraRequestHandler):
     """Request handler to restart Aurora jobs
 
     1. HTTP PUT method to restart job, optionally with _shards_ query parameter
@@ -195,14 +271,14 @@ class RestartJobHandler(tornado.web.RequestHandler):
     def put(self, cluster, role, environment, jobname):
         logger.info("entered RestartJobHandler::PUT")
 
-        jobspec = None
-        if self.request.body is not None and len(self.request.body) > 0:
-            jobspec = self.request.body
+        jobspec = self.get_jobspec()
         shards = self.get_query_arguments("shards")
+        settings = self.get_updater_settings(RESTART_SETTINGS)
 
-        (jobkey, errors) = self.application.get_executor().restart_job(
+        (jobkey, errors) = self.get_executor().restart_job(
                                     cluster, role, environment, jobname,
-                                    jobspec=jobspec, instances=shards)
+                                    jobspec=jobspec, instances=shards,
+                                    updater_settings=settings)
         if errors is None:
             self.set_status(httplib.ACCEPTED)
             self.write({
@@ -241,15 +317,24 @@ class AuroraSyncApplication(tornado.web.Application):
         logging.info("Tornado sync application created")
 
         self.url_prefix = prefix.lstrip('/').rstrip('/')
-        self.executor   = executor
+        self.executor   = InstrumentedExecutor(executor) if executor is not None else None
+        self.listing_cache = JobListingCache(settings.get("list_cache_ttl", 0))
+        self.jobspec_store = JobspecStore(settings.get("jobspec_store_bytes", 0))
+        self.applied_configs = AppliedConfigs(settings.get("applied_configs"))
 
         # TODO: remove this or make it optional and controlled by cli switch
         settings["debug"] = True
         handlers = self.make_app_handlers(self.url_prefix, [
             (r"/version",                           VersionHandler),
+            (r"/metrics",                           MetricsHandler),
+            (r"/admin/memory",                      MemoryHandler),
+            (r"/admin/profile",                     ProfileHandler),
+            (r"/jobspecs",                          JobspecsHandler),
+            (r"/jobspecs/([0-9a-f]{64})",           JobspecHandler),
             (r"/jobs/(.+)/(.+)/(.+)/(.+)/restart",  RestartJobHandler),
             (r"/jobs/(.+)/(.+)/(.+)/(.+)/update",   UpdateJobHandler),
             (r"/jobs/(.+)/(.+)/(.+)/(.+)",          JobHandler),
+            (r"/jobs/" + CLUSTERS_PATTERN + "/([^/]+)",  FanOutNotServedHandler),
             (r"/jobs/(.+)/(.+)",                    ListJobsHandler)
         ])
 
@@ -257,6 +342,16 @@ class AuroraSyncApplication(tornado.web.Application):
 
     def get_executor(self): return self.executor
 
+    def get_listing_cache(self): return self.listing_cache
+
+    def get_jobspec_store(self): return self.jobspec_store
+
+    def get_applied_configs(self): return self.applied_configs
+
+    def log_request(self, handler):
+        super(AuroraSyncApplication, self).log_request(handler)
+        observe_request(handler)
+
     def make_app_handlers(self, url_prefix, handlers):
         return [ ("/" + url_prefix + "/" + url.lstrip('/'), handler)
                     for url, handler in handlers ]
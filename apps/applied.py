@@ -0,0 +1,159 @@
+# ----------------------------------------------------------------------
+#
+#                  Registry of Applied Job Configurations
+#
+# Reconcilers update their jobs on schedule whether the configuration
+# has changed or not, and every update makes the scheduler roll through
+# all instances of the job. The registry keeps the digest of the last
+# configuration that was successfully applied to every job, by create
+# or update, so that update with the same configuration is answered
+# right away as "unchanged".
+#
+# An update to another configuration makes the registry forget the job
+# until it succeeds, so that an update with the configuration applied
+# before it, and waiting behind it, is not skipped.
+#
+# The registry only knows the changes made through this server. Jobs
+# changed with the Aurora client directly are updated with the _force_
+# parameter. Kills and cancelled updates forget the job, because the
+# configuration of its instances is no longer known.
+#
+# ----------------------------------------------------------------------
+
+import os
+import json
+import time
+import logging
+import tempfile
+
+from apache.aurora.rest.monitor import metrics
+
+logger = logging.getLogger("tornado.access")
+
+UNCHANGED = metrics.counter(
+    "aurora_rest_updates_unchanged_total",
+    "Number of job updates skipped because the configuration was already applied")
+
+def expand_instances(instances):
+    """Return sorted list of the instances given as "0,2,4-7" strings
+
+    Raise ValueError if they are not numbers or ranges of numbers.
+    """
+
+    expanded = set()
+    for instance in instances:
+        for item in str(instance).split(","):
+            bounds = item.split("-")
+            if len(bounds) > 2:
+                raise ValueError("invalid range of instances: %s" % item)
+            expanded.update(range(int(bounds[0]), int(bounds[-1]) + 1))
+    return sorted(expanded)
+
+# registry -------------------------------------------------------------
+
+class AppliedConfigs():
+    """Digests of the last applied configurations by job key, saved to _path_ if given"""
+
+    def __init__(self, path=None):
+        self.path = os.path.expanduser(path) if path else None
+        self.jobs = {}
+
+        if path:
+            self.load()
+        logger.info("AppliedConfigs(path=%s) created, %d jobs", path, len(self.jobs))
+
+    def is_applied(self, jobkey, digest, instances):
+        """Test if the configuration was applied to the instances of the job
+
+        Configuration applied to all instances (empty list) is applied to
+        any of them as well, otherwise the instances must be the same as,
+        or some of, the instances it was applied to.
+        """
+
+        entry = self.jobs.get(jobkey)
+        if entry is None or entry["config"] != digest:
+            return False
+        if len(entry["instances"]) == 0:
+            return True
+        if len(instances) == 0:
+            return False
+
+        try:
+            return set(expand_instances(instances)) <= set(expand_instances(entry["instances"]))
+        except ValueError:
+            # let the executor report the invalid instances
+            return False
+
+    def record(self, jobkey, digest, instances):
+        """Record configuration applied to the instances of the job, all if the list is empty
+
+        Instances of the same configuration applied before are added to
+        the new ones.
+        """
+
+        if digest is None:
+            self.forget(jobkey)
+            return
+
+        try:
+            instances = expand_instances(instances)
+        except ValueError:
+            self.forget(jobkey)
+            return
+
+        entry = self.jobs.get(jobkey)
+        if entry is not None and entry["config"] == digest and len(instances) > 0:
+            if len(entry["instances"]) == 0:
+                instances = []
+            else:
+                instances = sorted(set(instances) | set(expand_instances(entry["instances"])))
+
+        self.jobs[jobkey] = {
+            "config":       digest,
+            "instances":    instances,
+            "applied_at":   time.time()
+        }
+        self.save()
+
+    def submitted(self, jobkey, digest):
+        """Forget the job when update to configuration other than the applied one is on its way"""
+
+        entry = self.jobs.get(jobkey)
+        if entry is not None and entry["config"] != digest:
+            self.forget(jobkey)
+
+    def forget(self, jobkey):
+        if self.jobs.pop(jobkey, None) is not None:
+            self.save()
+
+    def skipped(self, jobkey, digest):
+        logger.info("configuration %s already applied to job %s, update skipped", digest, jobkey)
+        UNCHANGED.inc()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.jobs = json.load(f)
+        except IOError:
+            # not saved yet
+            self.jobs = {}
+        except ValueError as e:
+            logger.warning("applied configurations in %s are not readable, starting over: %s",
+                           self.path, e)
+            self.jobs = {}
+
+    def save(self):
+        """Write the registry to temporary file and rename it over the old one"""
+
+        if not self.path:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            with tempfile.NamedTemporaryFile(dir=directory, prefix=".applied-", delete=False) as f:
+                json.dump(self.jobs, f, sort_keys=True)
+            os.rename(f.name, self.path)
+        except (IOError, OSError) as e:
+            logger.warning("failed to save applied configurations to %s: %s", self.path, e)
@@ -0,0 +1,182 @@
+# ----------------------------------------------------------------------
+#
+#                  Base Class of Request Handlers
+#
+# Functionality shared by the handlers of the synchronous and the
+# asynchronous applications: the request context that follows the
+# Aurora command through the executors, the report of time spent in
+# the phases of the request and the log of slow requests.
+#
+# ----------------------------------------------------------------------
+
+import json
+import math
+import logging
+import httplib
+
+import tornado.web
+
+from apache.aurora.rest.executors.context import RequestContext, ContextBoundExecutor
+from apache.aurora.rest.executors.updater import UpdaterLimits
+
+logger = logging.getLogger("tornado.access")
+
+# base handler ---------------------------------------------------------
+
+class AuroraRequestHandler(tornado.web.RequestHandler):
+    """Base class of the request handlers of the REST service
+
+    Every request gets its own RequestContext. Calls to the executor
+    made through get_executor() carry the context along, so the time
+    spent in every phase of the request is reported in the Server-Timing
+    header of the response.
+
+    Clients tell how long they are going to wait for the response with
+    the X-Request-Timeout header (in seconds). Commands that are still
+    waiting for a worker when the deadline passes are discarded.
+    """
+
+    def __init__(self, application, request, **kwargs):
+        self.context = RequestContext(type(self).__name__ + "::" + request.method)
+        super(AuroraRequestHandler, self).__init__(application, request, **kwargs)
+
+    def prepare(self):
+        timeout = self.request.headers.get("X-Request-Timeout")
+        if timeout is not None:
+            try:
+                timeout = float(timeout)
+            except ValueError:
+                timeout = -1
+            if timeout <= 0:
+                raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                            "X-Request-Timeout must be positive number of seconds")
+            self.context.set_timeout(timeout, override=True)
+
+    def get_executor(self):
+        """Return the executor of the application bound to the context of this request"""
+
+        return ContextBoundExecutor(self.application.get_executor(), self.context,
+                                    self.settings.get("request_timeouts"))
+
+    def get_jobspec(self):
+        """Return the job configuration of the request, None if there is none
+
+        The configuration is sent in the body of the request, or refers
+        with the _config_ parameter to configuration uploaded before.
+        Bodies received by the streaming HTTP server are read back from
+        their spool file, others are taken from the request as they are.
+        """
+
+        body = getattr(self.request, "jobspec_body", None)
+        jobspec = body.read() if body is not None else self.request.body
+
+        digest = self.get_query_argument("config", None)
+        if digest:
+            if jobspec:
+                raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                            "job configuration in both the body and config argument")
+            jobspec = self.application.get_jobspec_store().get(digest)
+            if jobspec is None:
+                raise tornado.web.HTTPError(httplib.NOT_FOUND,
+                                            "job configuration %s is not stored, upload it again", digest)
+
+        return jobspec if jobspec else None
+
+    def get_int_argument(self, name, default=None, minimum=None, maximum=None):
+        """Return the value of integer query argument, validated against the limits"""
+
+        value = self.get_query_argument(name, None)
+        if value is None or len(value) == 0:
+            return default
+
+        try:
+            value = int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                        "argument %s must be integer: %s" % (name, value))
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                        "argument %s out of range [%s, %s]: %d" %
+                                        (name, minimum, maximum, value))
+        return value
+
+    def get_updater_settings(self, names):
+        """Return the settings of the job updater from the query arguments
+
+        Settings that are not given have the server defaults, the values
+        are validated against the server limits.
+        """
+
+        limits = self.settings.get("updater_limits") or UpdaterLimits()
+        settings = {}
+        for name in names:
+            (default, minimum, maximum) = limits.limits(name)
+            settings[name] = self.get_int_argument(name, default, minimum, maximum)
+        return settings
+
+    def get_bool_argument(self, name, default=False):
+        """Return the value of boolean query argument: true, yes or 1 and false, no or 0"""
+
+        value = self.get_query_argument(name, None)
+        if value is None or len(value) == 0:
+            return default
+
+        if value.lower() in ("true", "yes", "1"):
+            return True
+        if value.lower() in ("false", "no", "0"):
+            return False
+        raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                    "argument %s must be true or false: %s" % (name, value))
+
+    def write_error(self, status_code, **kwargs):
+        """Report errors as JSON document like the rest of the responses"""
+
+        errors = [ self._reason ]
+        exc_info = kwargs.get("exc_info")
+        if exc_info is not None and isinstance(exc_info[1], tornado.web.HTTPError):
+            e = exc_info[1]
+            if e.log_message:
+                errors.append(e.log_message % e.args if e.args else e.log_message)
+
+            # load shedding, tell the client when to come back
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after is not None:
+                self.set_header("Retry-After", str(int(math.ceil(retry_after))))
+
+        self.finish({
+            "status":       "failure",
+            "errors":       errors
+        })
+
+    def write(self, chunk):
+        with self.context.phase("serialize"):
+            super(AuroraRequestHandler, self).write(chunk)
+
+    def finish(self, chunk=None):
+        if chunk is not None:
+            self.write(chunk)
+
+        # streamed responses have sent the headers already
+        if not self._headers_written:
+            self.context.add_phase("total", self.request.request_time())
+            self.set_header("Server-Timing", self.context.server_timing())
+
+        super(AuroraRequestHandler, self).finish()
+
+    def on_finish(self):
+        body = getattr(self.request, "jobspec_body", None)
+        if body is not None:
+            body.close()
+
+        threshold = self.settings.get("slow_request_ms", 0)
+        duration  = self.request.request_time() * 1000.0
+        if threshold > 0 and duration > threshold:
+            logger.warning("slow request: %s", json.dumps({
+                "handler":      type(self).__name__,
+                "method":       self.request.method,
+                "uri":          self.request.uri,
+                "status":       self.get_status(),
+                "duration_ms":  round(duration, 3),
+                "phases_ms":    dict([ (name, round(seconds * 1000.0, 3))
+                                    for name, seconds in self.context.phases.items() ])
+            }, sort_keys=True))
@@ -0,0 +1,111 @@
+# ----------------------------------------------------------------------
+#
+#                  Job Listing Cache and Entity Tags
+#
+# Clients that poll the list of jobs do not need to download the same
+# payload over and over again. Every successful listing is tagged with
+# an entity tag computed from its content, and the tag of the most
+# recent listing is kept for a short time so that conditional requests
+# can be answered without calling the scheduler.
+#
+# ----------------------------------------------------------------------
+
+import time
+import hashlib
+import logging
+
+from tornado.escape import utf8
+
+logger = logging.getLogger("tornado.access")
+
+# entity tags ----------------------------------------------------------
+
+def make_etag(jobs):
+    """Compute entity tag for a list of jobs
+
+    The scheduler does not guarantee the order of the jobs it returns,
+    so the list is sorted first and the same set of jobs always produces
+    the same tag.
+    """
+
+    digest = hashlib.sha1()
+    for job in sorted(jobs):
+        digest.update(utf8(job))
+        digest.update(b"\n")
+
+    return '"%s"' % digest.hexdigest()
+
+def etag_matches(if_none_match, etag):
+    """Test if entity tag is listed in the value of If-None-Match header"""
+
+    if if_none_match is None or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+
+    return False
+
+# listing cache --------------------------------------------------------
+
+class JobListingCache():
+    """Cache of entity tags of the most recent job listings
+
+    The tag of the last successful listing of every cluster/role pair is
+    kept for _ttl_ seconds. Mutations of jobs invalidate the entry of
+    their cluster/role so the next conditional request goes to the
+    scheduler again. Zero _ttl_ disables the cache.
+    """
+
+    def __init__(self, ttl=0, max_entries=1024):
+        logger.info("JobListingCache(ttl=%s) created", ttl)
+
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.entries     = {}
+
+    def get(self, cluster, role):
+        """Return the tag of the cached listing, or None if not cached or expired"""
+
+        entry = self.entries.get((cluster, role))
+        if entry is None:
+            return None
+
+        (etag, expires) = entry
+        if time.time() >= expires:
+            self.entries.pop((cluster, role), None)
+            return None
+
+        return etag
+
+    def put(self, cluster, role, jobs):
+        """Cache the tag of job listing and return it"""
+
+        etag = make_etag(jobs)
+        if self.ttl <= 0:
+            return etag
+
+        if len(self.entries) >= self.max_entries:
+            self.purge()
+        self.entries[(cluster, role)] = (etag, time.time() + self.ttl)
+
+        return etag
+
+    def invalidate(self, cluster, role):
+        self.entries.pop((cluster, role), None)
+
+    def purge(self):
+        """Drop expired entries, or all of them if none has expired yet"""
+
+        now = time.time()
+        expired = [ key for key, (_, expires) in self.entries.items() if now >= expires ]
+        if len(expired) == 0:
+            self.entries.clear()
+        for key in expired:
+            self.entries.pop(key, None)
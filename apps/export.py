@@ -0,0 +1,107 @@
+# ----------------------------------------------------------------------
+#
+#                  Export of Job Inventory of Cluster
+#
+# The jobs of all roles of a cluster are exported with one request, as
+# newline-delimited JSON: one document per job and line. The jobs are
+# listed with one call to the scheduler, and the response is written in
+# batches of lines with chunked transfer encoding. The next batch is
+# written only after the previous one was sent to the client, so that
+# neither the whole document, nor the output buffer of a slow client,
+# are ever held in memory.
+#
+# ----------------------------------------------------------------------
+
+import json
+import logging
+import httplib
+
+import tornado.web
+from tornado import gen
+from tornado.concurrent import Future
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.apps.base import AuroraRequestHandler
+
+logger = logging.getLogger("tornado.access")
+
+EXPORTED_JOBS = metrics.counter(
+    "aurora_rest_exported_jobs_total",
+    "Number of jobs sent by inventory exports by cluster",
+    ["cluster"])
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson; charset=utf-8"
+
+# jobs written between two flushes of the response
+BATCH_SIZE = 500
+
+def job_line(job):
+    """Return the line of job given as cluster/role/environment/name"""
+
+    (cluster, role, environment, name) = job.split("/", 3)
+    return json.dumps({
+        "key":          job,
+        "cluster":      cluster,
+        "role":         role,
+        "environment":  environment,
+        "name":         name
+    }, sort_keys=True) + "\n"
+
+# handler --------------------------------------------------------------
+
+class ExportHandler(AuroraRequestHandler):
+    """Request handler to export the jobs of a cluster
+
+    1. HTTP GET method streams the jobs of all roles in the cluster as
+       newline-delimited JSON
+    """
+
+    def initialize(self):
+        self.disconnected = False
+        self.sending = None
+
+    @tornado.web.asynchronous
+    @gen.coroutine
+    def get(self, cluster):
+        logger.info("entered ExportHandler::GET")
+
+        (_, jobs, errors) = yield self.get_executor().list_all_jobs(cluster)
+        if errors is not None:
+            self.set_status(httplib.INTERNAL_SERVER_ERROR)
+            self.finish({
+                "status":       "failure",
+                "key":          cluster,
+                "count":        0,
+                "errors":       errors
+            })
+            return
+
+        logger.info("exporting %d jobs of cluster %s", len(jobs), cluster)
+        self.set_header("Content-Type", NDJSON_CONTENT_TYPE)
+        self.set_header("X-Job-Count", str(len(jobs)))
+
+        for start in xrange(0, len(jobs), BATCH_SIZE):
+            batch = jobs[start:start + BATCH_SIZE]
+            self.write("".join([ job_line(job) for job in batch ]))
+            yield self.send()
+            if self.disconnected:
+                logger.warning("export of cluster %s interrupted by the client after %d jobs",
+                               cluster, start)
+                return
+            EXPORTED_JOBS.inc((cluster,), len(batch))
+
+        logger.info("exiting ExportHandler::GET")
+        self.finish()
+
+    def send(self):
+        """Flush the response, return future that completes when it was sent"""
+
+        sending = self.sending = Future()
+        self.flush(callback=lambda: sending.done() or sending.set_result(None))
+        return sending
+
+    def on_connection_close(self):
+        # the flush callback is not called on closed connection
+        self.disconnected = True
+        if self.sending is not None and not self.sending.done():
+            self.sending.set_result(None)
@@ -0,0 +1,182 @@
+# ----------------------------------------------------------------------
+#
+#                  Listing of Jobs of Role Across Clusters
+#
+# The jobs of a role in several clusters are listed with one request:
+# the cluster of the listing is "*" for all configured clusters, or a
+# comma-separated list of clusters. The listings of the clusters are
+# handed to the executor all at once, they run in parallel when the
+# executor has a pool of workers, and the response is sent when all of
+# them completed, or when the deadline of the request has passed.
+#
+# The response merges the jobs of all clusters and reports the outcome
+# of every cluster. Clusters that failed, or did not answer in time, do
+# not fail the whole request while at least one cluster answered.
+#
+# ----------------------------------------------------------------------
+
+import logging
+import httplib
+
+import tornado.web
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+
+from apache.aurora.rest.apps.base import AuroraRequestHandler
+
+logger = logging.getLogger("tornado.access")
+
+ALL_CLUSTERS = "*"
+
+# cluster part of the URL of listings across clusters: "*" or list with comma
+CLUSTERS_PATTERN = r"(\*|[^/]*,[^/]*)"
+
+def parse_clusters(spec):
+    """Parse list of clusters given as "cluster,cluster" """
+
+    clusters = []
+    for item in (spec or "").split(","):
+        if len(item.strip()) > 0 and item.strip() not in clusters:
+            clusters.append(item.strip())
+    return clusters
+
+def wait_all(futures, deadline=None, io_loop=None):
+    """Return future that completes when all _futures_ are done, or at the deadline"""
+
+    io_loop = io_loop or IOLoop.current()
+    waiting = Future()
+    pending = [ len(futures) ]
+
+    def done(future):
+        pending[0] -= 1
+        if pending[0] == 0 and not waiting.done():
+            waiting.set_result(None)
+
+    def expired():
+        if not waiting.done():
+            waiting.set_result(None)
+
+    if len(futures) == 0:
+        waiting.set_result(None)
+        return waiting
+
+    for future in futures:
+        io_loop.add_future(future, done)
+    if deadline is not None:
+        timeout = io_loop.add_timeout(deadline, expired)
+        waiting.add_done_callback(lambda f: io_loop.remove_timeout(timeout))
+
+    return waiting
+
+def start_listing(executor, cluster, role):
+    """Hand the listing of the cluster to the executor, return future of its result
+
+    Listings that the executor rejects right away (full queue, open
+    circuit of the cluster) are reported like the failed ones.
+    """
+
+    try:
+        return executor.list_jobs(cluster, role)
+    except Exception as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+def outcome_of(future):
+    """Report of the listing of one cluster: its status, jobs and errors"""
+
+    if not future.done():
+        return { "status": "timeout", "count": 0, "errors": [ "no response before the deadline" ] }
+
+    try:
+        (jobkey, jobs, errors) = future.result()
+    except tornado.web.HTTPError as e:
+        errors = [ httplib.responses.get(e.status_code, "Unknown") ]
+        if e.log_message:
+            errors.append(e.log_message % e.args if e.args else e.log_message)
+        return { "status": "failure", "count": 0, "errors": errors }
+    except Exception as e:
+        return { "status": "failure", "count": 0, "errors": [ "%s: %s" % (type(e).__name__, e) ] }
+
+    if errors is not None:
+        return { "status": "failure", "count": 0, "errors": errors }
+    return { "status": "success", "count": len(jobs), "jobs": jobs }
+
+# handler --------------------------------------------------------------
+
+class FanOutListJobsHandler(AuroraRequestHandler):
+    """Request handler to list the jobs of a role in several clusters
+
+    1. HTTP GET method lists the jobs in all configured clusters ("*"),
+       or in the comma-separated list of clusters
+    """
+
+    @tornado.web.asynchronous
+    @gen.coroutine
+    def get(self, clusters, role):
+        logger.info("entered FanOutListJobsHandler::GET")
+
+        if clusters == ALL_CLUSTERS:
+            clusters = self.settings.get("clusters") or []
+            if len(clusters) == 0:
+                raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                            "no clusters configured, list them with --clusters")
+        else:
+            clusters = parse_clusters(clusters)
+            if len(clusters) == 0:
+                raise tornado.web.HTTPError(httplib.BAD_REQUEST, "no clusters in the list")
+
+        executor = self.get_executor()
+        futures = [ (cluster, start_listing(executor, cluster, role)) for cluster in clusters ]
+
+        # the deadline set by the client or the default of list_jobs, or the fan-out timeout
+        deadline = self.context.deadline
+        timeout = self.settings.get("fan_out_timeout", 0)
+        if timeout > 0:
+            deadline = min(deadline or float("inf"), self.context.started_at + timeout)
+
+        yield wait_all([ future for (_, future) in futures ], deadline)
+
+        report = {}
+        jobs = []
+        for (cluster, future) in futures:
+            report[cluster] = outcome_of(future)
+            jobs.extend(report[cluster].pop("jobs", []))
+            if report[cluster]["status"] != "success":
+                logger.warning("listing of cluster %s: %s", cluster, report[cluster]["errors"])
+
+        answered = len([ r for r in report.values() if r["status"] == "success" ])
+        if answered == 0:
+            status = "failure"
+            self.set_status(httplib.INTERNAL_SERVER_ERROR)
+        elif answered < len(clusters):
+            status = "partial"
+        else:
+            status = "success"
+            if len(jobs) == 0:
+                self.set_status(httplib.NOT_FOUND)
+
+        self.write({
+            "status":       status,
+            "key":          "%s/%s" % (",".join(clusters), role),
+            "count":        len(jobs),
+            "jobs":         dict(enumerate(jobs, start=1)),
+            "clusters":     report
+        })
+
+        logger.info("exiting FanOutListJobsHandler::GET")
+        self.finish()
+
+class FanOutNotServedHandler(AuroraRequestHandler):
+    """Request handler rejecting listings across clusters where they are not served
+
+    1. HTTP GET method fails with 400, so that "*" or the list of clusters
+       are not taken for the name of a cluster
+    """
+
+    def get(self, clusters, role):
+        logger.info("entered FanOutNotServedHandler::GET")
+
+        raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                    "listing of jobs across clusters is not served in synchronous mode")
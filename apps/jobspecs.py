@@ -0,0 +1,151 @@
+# ----------------------------------------------------------------------
+#
+#                  Content-Addressed Store of Job Configurations
+#
+# Deployments send the same job configuration with every command of the
+# job: create, update, restarts and finally kill. The configuration can
+# instead be uploaded once, it is stored under the SHA-256 digest of its
+# content, and the commands refer to it with _config_ query parameter.
+#
+# The store keeps the most recently used configurations up to a total
+# size, the least recently used ones are dropped when it is full. A
+# command that refers to dropped configuration is answered with 404 and
+# the client uploads it again.
+#
+# ----------------------------------------------------------------------
+
+import hashlib
+import logging
+import httplib
+
+from collections import OrderedDict
+
+import tornado.web
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.apps.base import AuroraRequestHandler
+
+logger = logging.getLogger("tornado.access")
+
+STORE_BYTES = metrics.gauge(
+    "aurora_rest_jobspec_store_bytes",
+    "Total size of the job configurations in the store")
+
+STORE_LOOKUPS = metrics.counter(
+    "aurora_rest_jobspec_store_lookups_total",
+    "Number of references to stored job configurations by result: hit or miss",
+    ["result"])
+
+def make_digest(jobspec):
+    return hashlib.sha256(jobspec).hexdigest()
+
+# store ----------------------------------------------------------------
+
+class JobspecStore():
+    """Job configurations by their digest, at most _max_bytes_ of them in total
+
+    Zero _max_bytes_ disables the store.
+    """
+
+    def __init__(self, max_bytes=0):
+        logger.info("JobspecStore(max_bytes=%d) created", max_bytes)
+
+        self.max_bytes = max_bytes
+        self.size      = 0
+        self.entries   = OrderedDict()
+
+        STORE_BYTES.set_function(lambda: self.size)
+
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def put(self, jobspec, digest=None):
+        """Store the configuration, return its digest and whether it was stored before"""
+
+        digest = digest or make_digest(jobspec)
+        if digest in self.entries:
+            self.entries[digest] = self.entries.pop(digest)
+            return (digest, True)
+
+        self.entries[digest] = jobspec
+        self.size += len(jobspec)
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            (dropped, content) = self.entries.popitem(last=False)
+            self.size -= len(content)
+            logger.info("job configuration %s dropped from the store", dropped)
+
+        return (digest, False)
+
+    def get(self, digest):
+        """Return the configuration and mark it recently used, None if it is not stored"""
+
+        jobspec = self.entries.pop(digest, None)
+        if jobspec is None:
+            STORE_LOOKUPS.inc(("miss",))
+            return None
+
+        STORE_LOOKUPS.inc(("hit",))
+        self.entries[digest] = jobspec
+        return jobspec
+
+# handlers -------------------------------------------------------------
+
+class JobspecsHandler(AuroraRequestHandler):
+    """Request handler to upload job configuration to the store
+
+    1. HTTP POST method stores the configuration in the body of the
+       request and returns its digest, to be used as _config_ parameter
+       of the job commands
+    """
+
+    def post(self):
+        logger.info("entered JobspecsHandler::POST")
+
+        store = self.application.get_jobspec_store()
+        if not store.enabled():
+            raise tornado.web.HTTPError(httplib.NOT_FOUND, "store of job configurations is disabled")
+
+        jobspec = self.get_jobspec()
+        if jobspec is None:
+            raise tornado.web.HTTPError(httplib.BAD_REQUEST, "job configuration not provided")
+        if len(jobspec) > store.max_bytes:
+            raise tornado.web.HTTPError(httplib.REQUEST_ENTITY_TOO_LARGE,
+                                        "job configuration is larger than the store")
+
+        # the digest computed while the body was received, if it was streamed
+        body = getattr(self.request, "jobspec_body", None)
+        (digest, existed) = store.put(jobspec, body.hexdigest() if body is not None else None)
+
+        location = "%s/%s" % (self.request.path.rstrip("/"), digest)
+        self.set_header("Location", location)
+        self.set_status(httplib.OK if existed else httplib.CREATED)
+        self.write({
+            "status":       "success",
+            "config":       digest,
+            "size":         len(jobspec),
+            "location":     location
+        })
+
+class JobspecHandler(AuroraRequestHandler):
+    """Request handler for stored job configuration
+
+    1. HTTP GET method returns the configuration
+    2. HTTP HEAD method tells whether the configuration is stored
+    """
+
+    def get(self, digest):
+        logger.info("entered JobspecHandler::GET")
+
+        jobspec = self.lookup(digest)
+        self.set_header("Content-Type", "text/plain; charset=utf-8")
+        self.write(jobspec)
+
+    def head(self, digest):
+        jobspec = self.lookup(digest)
+        self.set_header("Content-Length", len(jobspec))
+
+    def lookup(self, digest):
+        jobspec = self.application.get_jobspec_store().get(digest)
+        if jobspec is None:
+            raise tornado.web.HTTPError(httplib.NOT_FOUND, "job configuration %s is not stored", digest)
+        return jobspec
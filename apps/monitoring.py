@@ -0,0 +1,175 @@
+# ----------------------------------------------------------------------
+#
+#                  Monitoring of the REST Service
+#
+# Request handlers that report how the service behaves, shared by the
+# synchronous and asynchronous applications.
+#
+# ----------------------------------------------------------------------
+
+import time
+import pstats
+import logging
+import httplib
+
+import tornado.web
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from apache.aurora.rest.monitor import metrics, profiler, memory
+from apache.aurora.rest.apps.base import AuroraRequestHandler
+
+logger = logging.getLogger("tornado.access")
+
+# how often to check if profiling session is complete
+PROFILE_POLL_SECONDS = 0.1
+
+# how long to wait for the commands of profiling session to complete
+PROFILE_TIMEOUT_SECONDS = 300
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "aurora_rest_http_request_duration_seconds",
+    "Latency of HTTP requests by handler, method and status",
+    ["handler", "method", "status"])
+
+PROCESS_RSS = metrics.gauge(
+    "aurora_rest_process_rss_bytes",
+    "Resident memory of the server process")
+PROCESS_RSS.set_function(memory.rss_bytes)
+
+def observe_request(handler):
+    """Record the latency of completed request, called by the applications"""
+
+    HTTP_REQUEST_SECONDS.observe(handler.request.request_time(),
+        (type(handler).__name__, handler.request.method, str(handler.get_status())))
+
+# monitoring handlers --------------------------------------------------
+
+class MetricsHandler(AuroraRequestHandler):
+    """Request handler exposing metrics in Prometheus text format"""
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.REGISTRY.render())
+
+class ProfileHandler(AuroraRequestHandler):
+    """Request handler to profile the execution of Aurora commands on live server
+
+    1. HTTP POST method starts profiling session, for _seconds_ or for
+       the next _requests_ of _handler_, and returns the aggregated
+       profile when the session is complete
+    2. HTTP GET method returns the profile of the last session
+
+    Optional _sort_ and _limit_ parameters control the report.
+    """
+
+    @tornado.web.asynchronous
+    @gen.coroutine
+    def post(self):
+        logger.info("entered ProfileHandler::POST")
+
+        seconds  = self.get_int_argument("seconds", minimum=1)
+        requests = self.get_int_argument("requests", minimum=1)
+        handler  = self.get_query_argument("handler", None)
+        if (seconds is None) == (requests is None):
+            raise tornado.web.HTTPError(httplib.BAD_REQUEST,
+                                        "either seconds or requests must be specified")
+        timeout = self.get_int_argument("timeout", (seconds or 0) + PROFILE_TIMEOUT_SECONDS, minimum=1)
+        (sort, limit) = self.get_report_arguments()
+
+        session  = profiler.start(seconds=seconds, requests=requests, handler=handler)
+        deadline = time.time() + timeout
+        while not session.is_complete() and time.time() < deadline:
+            yield gen.Task(IOLoop.current().add_timeout, time.time() + PROFILE_POLL_SECONDS)
+        session.stop()
+
+        self.write_report(session, sort, limit)
+        self.finish()
+
+    def get(self):
+        logger.info("entered ProfileHandler::GET")
+
+        (sort, limit) = self.get_report_arguments()
+        session = profiler.session()
+        if session is None:
+            raise tornado.web.HTTPError(httplib.NOT_FOUND, "no profiling session")
+
+        self.write_report(session, sort, limit)
+
+    def get_report_arguments(self):
+        sort = self.get_query_argument("sort", "cumulative")
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise tornado.web.HTTPError(httplib.BAD_REQUEST, "invalid sort key: %s" % sort)
+
+        return (sort, self.get_int_argument("limit", 50, minimum=1))
+
+    def write_report(self, session, sort, limit):
+        self.set_header("Content-Type", "text/plain; charset=utf-8")
+        self.write(session.report(sort=sort, limit=limit))
+
+class MemoryHandler(AuroraRequestHandler):
+    """Request handler to track memory allocations on live server
+
+    1. HTTP POST method takes snapshot of the allocated memory and reports
+       the growth since the previous snapshot. Optional _sample_ parameter
+       enables measurement of every N-th Aurora command of each handler
+       (zero disables it), _interval_ the minimum seconds between measured
+       commands without tracemalloc, and _frames_ sets the depth of traced
+       stacks
+    2. HTTP GET method reports the snapshots, the growth between the last
+       snapshot and the previous one (or snapshot _base_), the growth per
+       request handler and the memory of the workers of process pools
+    3. HTTP DELETE method stops the tracking and drops the collected data
+    """
+
+    def get(self):
+        logger.info("entered MemoryHandler::GET")
+
+        self.write(self.make_report())
+
+    def post(self):
+        logger.info("entered MemoryHandler::POST")
+
+        frames = self.get_int_argument("frames", 1, minimum=1, maximum=64)
+        sample = self.get_int_argument("sample", None, minimum=0)
+        interval = self.get_int_argument("interval", None, minimum=0)
+
+        memory.TRACKER.start(frames)
+        if sample is not None:
+            memory.TRACKER.sample_every = sample
+        if interval is not None:
+            memory.TRACKER.walk_interval = interval
+        memory.TRACKER.snapshot()
+
+        self.write(self.make_report())
+
+    def delete(self):
+        logger.info("entered MemoryHandler::DELETE")
+
+        memory.TRACKER.stop()
+        self.write({ "status": "success" })
+
+    def make_report(self):
+        report = memory.TRACKER.report(base_id=self.get_int_argument("base", None),
+                                       limit=self.get_int_argument("limit", memory.TOP_GROWERS, minimum=1))
+        report["status"] = "success"
+        return report
+
+class LimitsHandler(AuroraRequestHandler):
+    """Request handler reporting the concurrency limits of the clusters
+
+    Reports the current limit, the commands in flight and waiting, and the
+    smoothed and baseline latency of every cluster seen by the pool, and
+    the state of the circuit breaker of every cluster
+    """
+
+    def get(self):
+        logger.info("entered LimitsHandler::GET")
+
+        executor = self.application.get_executor()
+        cluster_limiter = getattr(executor, "limiter", None)
+        circuit_breaker = getattr(executor, "breaker", None)
+        report = cluster_limiter.describe() if cluster_limiter is not None else { "clusters": {} }
+        report["circuits"] = circuit_breaker.describe() if circuit_breaker is not None else {}
+        report["status"] = "success"
+        self.write(report)
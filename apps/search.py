@@ -0,0 +1,245 @@
+# ----------------------------------------------------------------------
+#
+#                  Search of Jobs Across Roles
+#
+# Jobs are found by name without knowing their role with the help of an
+# in-memory index of all jobs of the configured clusters. The jobs of
+# every cluster are listed periodically with one call to the scheduler,
+# and the index is updated with the jobs that appeared or disappeared
+# since the previous listing, instead of being built again. Jobs created
+# or killed through this server in these clusters are updated in the
+# index right away.
+#
+# The index maps tokens to jobs: the role, environment and name of the
+# job, and their parts separated by "-", "_" and ".". The tokens are
+# also kept sorted, so that the tokens starting with a prefix are found
+# with binary search. Queries are either prefixes of tokens, or glob
+# patterns matched against the name and the role/environment/name of
+# the jobs, with the candidates narrowed down by the literal prefix of
+# the pattern.
+#
+# ----------------------------------------------------------------------
+
+import re
+import time
+import bisect
+import fnmatch
+import logging
+import httplib
+
+import tornado.web
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.apps.base import AuroraRequestHandler
+
+logger = logging.getLogger("tornado.access")
+
+INDEX_JOBS = metrics.gauge(
+    "aurora_rest_search_index_jobs",
+    "Number of jobs in the search index by cluster",
+    ["cluster"])
+
+TOKEN_SEPARATORS = re.compile(r"[-_.]+")
+GLOB_CHARACTERS  = re.compile(r"[*?\[]")
+
+def tokens_of(job):
+    """Return the tokens of job given as cluster/role/environment/name"""
+
+    fields = job.lower().split("/")[1:]
+    tokens = set(fields)
+    for field in fields:
+        tokens.update(token for token in TOKEN_SEPARATORS.split(field) if len(token) > 0)
+    return tokens
+
+# index ----------------------------------------------------------------
+
+class JobIndex():
+    """Inverted index of the jobs of the clusters by their tokens"""
+
+    def __init__(self, clusters):
+        self.clusters = clusters
+        self.jobs     = {}
+        self.postings = {}
+        self.tokens   = []
+        self.status   = dict((cluster, { "refreshed_at": None, "errors": None })
+                                for cluster in clusters)
+
+    def covers(self, cluster):
+        """Test if the jobs of the cluster are indexed and refreshed"""
+
+        return cluster in self.status
+
+    def add(self, job):
+        cluster = job.split("/", 1)[0]
+        jobs = self.jobs.setdefault(cluster, set())
+        if job in jobs:
+            return
+        if len(jobs) == 0:
+            INDEX_JOBS.set_function(lambda: len(self.jobs.get(cluster, ())), (cluster,))
+
+        jobs.add(job)
+        for token in tokens_of(job):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                bisect.insort(self.tokens, token)
+            posting.add(job)
+
+    def remove(self, job):
+        jobs = self.jobs.get(job.split("/", 1)[0], set())
+        if job not in jobs:
+            return
+
+        jobs.discard(job)
+        for token in tokens_of(job):
+            posting = self.postings[token]
+            posting.discard(job)
+            if len(posting) == 0:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def update(self, cluster, jobs):
+        """Bring the jobs of the cluster up to date with its listing, return the changes"""
+
+        jobs = set(jobs)
+        known = self.jobs.get(cluster, set())
+        removed = known - jobs
+        added = jobs - known
+        for job in removed:
+            self.remove(job)
+        for job in added:
+            self.add(job)
+
+        return (len(added), len(removed))
+
+    def with_prefix(self, prefix):
+        """Return the tokens starting with the prefix"""
+
+        tokens = []
+        i = bisect.bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            tokens.append(self.tokens[i])
+            i += 1
+        return tokens
+
+    def candidates(self, prefix):
+        """Return the jobs with token starting with the prefix, all jobs if it is empty"""
+
+        if len(prefix) == 0:
+            return set().union(*self.jobs.values())
+        return set().union(*[ self.postings[token] for token in self.with_prefix(prefix) ])
+
+    def search(self, query, cluster=None):
+        """Return the jobs matching the query, sorted"""
+
+        query = query.lower()
+        pattern = GLOB_CHARACTERS.search(query)
+        if pattern is None:
+            found = self.candidates(query)
+        else:
+            # the role, or the name, starts with the literal part of the pattern
+            literal = query[:pattern.start()].split("/")[0]
+            found = [ job for job in self.candidates(literal)
+                        if fnmatch.fnmatchcase(job.lower().split("/", 1)[1], query) or
+                           fnmatch.fnmatchcase(job.lower().rsplit("/", 1)[1], query) ]
+
+        if cluster is not None:
+            found = [ job for job in found if job.split("/", 1)[0] == cluster ]
+        return sorted(found)
+
+    def describe(self):
+        report = {}
+        for cluster, status in self.status.items():
+            report[cluster] = dict(status)
+            report[cluster]["jobs"] = len(self.jobs.get(cluster, ()))
+        return report
+
+# refresh --------------------------------------------------------------
+
+class IndexRefresher():
+    """Lists the jobs of the clusters every _interval_ seconds and updates the index"""
+
+    def __init__(self, index, executor, interval, io_loop=None):
+        logger.info("search index of clusters %s, refreshed every %d seconds",
+                    index.clusters, interval)
+
+        self.index    = index
+        self.executor = executor
+        self.clusters = index.clusters
+        self.io_loop  = io_loop or IOLoop.instance()
+        self.running  = set()
+        self.timer    = PeriodicCallback(self.refresh, interval * 1000, self.io_loop)
+
+    def start(self):
+        self.io_loop.add_callback(self.refresh)
+        self.timer.start()
+
+    def refresh(self):
+        for cluster in self.clusters:
+            # slow scheduler, the previous listing is still running
+            if cluster in self.running:
+                continue
+            self.running.add(cluster)
+            try:
+                future = self.executor.list_all_jobs(cluster)
+            except Exception as e:
+                self.refreshed(cluster, None, e)
+                continue
+            self.io_loop.add_future(future, lambda f, cluster=cluster: self.refreshed(cluster, f))
+
+    def refreshed(self, cluster, future, exception=None):
+        self.running.discard(cluster)
+        status = self.index.status[cluster]
+        try:
+            if exception is not None:
+                raise exception
+            (_, jobs, errors) = future.result()
+        except Exception as e:
+            errors = [ "%s: %s" % (type(e).__name__, e) ]
+
+        if errors is not None:
+            logger.warning("search index of cluster %s not refreshed: %s", cluster, errors)
+            status["errors"] = errors
+            return
+
+        (added, removed) = self.index.update(cluster, jobs)
+        logger.log(logging.INFO if added + removed > 0 else logging.DEBUG,
+                   "search index of cluster %s refreshed, %d jobs added, %d removed",
+                   cluster, added, removed)
+        status["refreshed_at"] = time.time()
+        status["errors"] = None
+
+# handler --------------------------------------------------------------
+
+class SearchHandler(AuroraRequestHandler):
+    """Request handler to find jobs of any role
+
+    1. HTTP GET method returns the jobs matching the query _q_: prefix
+       of token of their role, environment or name, or glob pattern of
+       their name or role/environment/name, optionally only the jobs of
+       _cluster_ and at most _limit_ of them
+    """
+
+    def get(self):
+        logger.info("entered SearchHandler::GET")
+
+        index = self.application.get_search_index()
+        if index is None:
+            raise tornado.web.HTTPError(httplib.NOT_FOUND, "search index is disabled")
+
+        query = self.get_query_argument("q", "")
+        if len(query) == 0:
+            raise tornado.web.HTTPError(httplib.BAD_REQUEST, "query argument q is missing")
+        cluster = self.get_query_argument("cluster", None)
+        limit = self.get_int_argument("limit", 100, minimum=1, maximum=10000)
+
+        jobs = index.search(query, cluster)
+        self.write({
+            "status":       "success",
+            "query":        query,
+            "count":        min(len(jobs), limit),
+            "truncated":    len(jobs) > limit,
+            "jobs":         dict(enumerate(jobs[:limit], start=1)),
+            "clusters":     index.describe()
+        })
@@ -0,0 +1,161 @@
+# ----------------------------------------------------------------------
+#
+#                  Streamed Upload of Job Configurations
+#
+# Tornado reads the whole body of the request into memory before the
+# handler sees it, first into the buffer of the stream and then into
+# one string. The HTTP server created here takes the body from the
+# stream chunk by chunk as it arrives instead: every chunk is added to
+# the SHA-256 digest of the body and written to a spool file, which is
+# kept in memory while it is small and moved to disk when it grows.
+#
+# Requests announcing body larger than the limit are rejected with 413
+# as soon as their headers are read, before the body is received. The
+# clients that wait for "100 Continue" do not send the body at all.
+#
+# ----------------------------------------------------------------------
+
+import json
+import hashlib
+import httplib
+import logging
+import tempfile
+
+from tornado import httputil
+from tornado.escape import native_str, utf8
+from tornado.httpserver import HTTPServer, HTTPConnection
+
+from apache.aurora.rest.monitor import metrics
+
+logger = logging.getLogger("tornado.access")
+
+BODY_BYTES = metrics.histogram(
+    "aurora_rest_request_body_bytes",
+    "Size of the bodies of requests",
+    buckets=[ 1024, 16384, 65536, 262144, 1048576, 4194304, 16777216 ])
+
+BODY_REJECTED = metrics.counter(
+    "aurora_rest_request_body_rejected_total",
+    "Number of requests rejected because their body exceeded the size limit")
+
+# spooled body ---------------------------------------------------------
+
+class JobspecBody():
+    """Body of request written to spool file, with its size and digest"""
+
+    def __init__(self, spool_size):
+        self.file   = tempfile.SpooledTemporaryFile(max_size=spool_size, prefix="aurora-rest-body-")
+        self.hash   = hashlib.sha256()
+        self.size   = 0
+
+    def write(self, chunk):
+        self.hash.update(chunk)
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+    def read(self):
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+# connection -----------------------------------------------------------
+
+class SpoolingStream():
+    """Stream of the connection that hands the body over to the spool file"""
+
+    def __init__(self, stream, connection):
+        self.stream     = stream
+        self.connection = connection
+
+    def read_bytes(self, num_bytes, callback, streaming_callback=None):
+        body = self.connection.body
+        if body is not None and streaming_callback is None:
+            streaming_callback = body.write
+        self.stream.read_bytes(num_bytes, callback, streaming_callback)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class StreamingHTTPConnection(HTTPConnection):
+    """HTTP connection that spools the bodies of requests and limits their size"""
+
+    def __init__(self, stream, address, request_callback, max_body_size, spool_size, **kwargs):
+        self.max_body_size = max_body_size
+        self.spool_size    = spool_size
+        self.body          = None
+        HTTPConnection.__init__(self, SpoolingStream(stream, self), address, request_callback, **kwargs)
+
+    def _on_headers(self, data):
+        self.body = None
+        try:
+            text = native_str(data.decode("latin1"))
+            headers = httputil.HTTPHeaders.parse(text[text.find("\r\n"):])
+            content_length = int(headers.get("Content-Length", 0))
+        except ValueError:
+            # malformed request, reported by the connection
+            return HTTPConnection._on_headers(self, data)
+
+        if self.max_body_size > 0 and content_length > self.max_body_size:
+            self.reject(text[:text.find("\r\n")], content_length)
+            return
+
+        if content_length > 0:
+            self.body = JobspecBody(self.spool_size)
+        HTTPConnection._on_headers(self, data)
+
+    def _on_request_body(self, data):
+        body = self.body
+        self.body = None
+        if body is not None:
+            BODY_BYTES.observe(body.size)
+            logger.info("request body: %d bytes, sha256 %s", body.size, body.hexdigest())
+            self._request.jobspec_body = body
+        HTTPConnection._on_request_body(self, data)
+
+    def reject(self, start_line, content_length):
+        """Answer 413 and close the connection, the body is not read"""
+
+        logger.warning("%s from %s rejected, body of %d bytes exceeds the limit of %d bytes",
+                       start_line, self.address[0], content_length, self.max_body_size)
+        BODY_REJECTED.inc()
+
+        reason = httplib.responses[httplib.REQUEST_ENTITY_TOO_LARGE]
+        content = utf8(json.dumps({
+            "status":       "failure",
+            "errors":       [ reason, "body of %d bytes exceeds the limit of %d bytes" %
+                                        (content_length, self.max_body_size) ]
+        }))
+        self.stream.write(utf8("HTTP/1.1 %d %s\r\n"
+                               "Content-Type: application/json; charset=UTF-8\r\n"
+                               "Content-Length: %d\r\n"
+                               "Connection: close\r\n\r\n" %
+                               (httplib.REQUEST_ENTITY_TOO_LARGE, reason, len(content))) + content,
+                          self.close)
+
+class StreamingHTTPServer(HTTPServer):
+    """HTTP server whose connections spool the bodies of requests"""
+
+    def __init__(self, request_callback, max_body_size=0, spool_size=65536, **kwargs):
+        self.max_body_size = max_body_size
+        self.spool_size    = spool_size
+        HTTPServer.__init__(self, request_callback, **kwargs)
+
+    def handle_stream(self, stream, address):
+        StreamingHTTPConnection(stream, address, self.request_callback,
+                                self.max_body_size, self.spool_size,
+                                no_keep_alive=self.no_keep_alive,
+                                xheaders=self.xheaders, protocol=self.protocol)
+
+# factory --------------------------------------------------------------
+
+def create(application, max_body_size=0, spool_size=65536):
+    """Factory function for HTTP server streaming the request bodies, max_body_size 0 for no limit"""
+
+    logger.info("streamed request bodies: limit %d bytes, spooled to disk above %d bytes",
+                max_body_size, spool_size)
+    return StreamingHTTPServer(application, max_body_size, spool_size)
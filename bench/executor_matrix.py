@@ -0,0 +1,221 @@
+# ----------------------------------------------------------------------
+#
+#                  Benchmark of Executor and Concurrency Modes
+#
+# Starts the REST server once for every combination of executor
+# (internal, external) and concurrency mode (coroutine, thread, process)
+# against a local stand-in scheduler and a stand-in aurora command-line
+# client, drives concurrent load against it and reports throughput,
+# latency and memory of the server process tree.
+#
+# The results are appended to file as one JSON document per run, tagged
+# with the git commit, and can be compared with the last run stored in
+# another file:
+#
+#   $ ./pants build src/main/python/apache/aurora/rest/bench:executor_matrix
+#   $ dist/executor_matrix.pex --server-cmd=dist/aurora_rest.pex \
+#           --output=matrix.jsonl --compare=baseline.jsonl
+#
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import json
+import stat
+import shlex
+import shutil
+import inspect
+import logging
+import argparse
+import tempfile
+import multiprocessing
+
+from apache.aurora.rest.bench import fake_aurora_cli, fake_scheduler, load, results
+
+logger = logging.getLogger("bench")
+
+SUITE = "executor_matrix"
+
+CLUSTER = "bench"
+ROLES   = 16
+
+# environment ----------------------------------------------------------
+
+def write_clusters(directory, scheduler_port):
+    """Write clusters.json that points the Aurora client to the stand-in scheduler"""
+
+    clusters = [{
+        "name":           CLUSTER,
+        "scheduler_uri":  "http://localhost:%d" % scheduler_port,
+        "auth_mechanism": "UNAUTHENTICATED"
+    }]
+
+    os.makedirs(os.path.join(directory, ".aurora"))
+    for path in (os.path.join(directory, "clusters.json"),
+                 os.path.join(directory, ".aurora", "clusters.json")):
+        with open(path, "w") as f:
+            json.dump(clusters, f)
+
+def write_aurora_cli(directory):
+    """Copy the stand-in aurora client as executable script, works from inside .pex too"""
+
+    path = os.path.join(directory, "aurora")
+    with open(path, "w") as f:
+        f.write("#!%s\n" % sys.executable)
+        f.write(inspect.getsource(fake_aurora_cli))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    return path
+
+def make_env(directory, args):
+    env = dict(os.environ)
+    env.update({
+        "HOME":                   directory,
+        "AURORA_CONFIG_ROOT":     directory,
+        "FAKE_AURORA_LATENCY_MS": str(args.latency_ms),
+        "FAKE_AURORA_JOBS":       str(args.jobs_per_role),
+    })
+    return env
+
+# workload -------------------------------------------------------------
+
+def make_workload(kill_every):
+    """Listing of jobs of rotating roles, and every N-th request kill of job"""
+
+    def make_request(client, sequence):
+        role = "role%02d" % ((client + sequence) % ROLES)
+        if kill_every > 0 and sequence % kill_every == kill_every - 1:
+            jobname = fake_scheduler.job_names(role, 1)[0]
+            return ("DELETE", "/alpha/jobs/%s/%s/%s/%s" % (CLUSTER, role,
+                                                           fake_scheduler.ENVIRONMENT, jobname), None)
+        return ("GET", "/alpha/jobs/%s/%s" % (CLUSTER, role), None)
+
+    return make_request
+
+def check_response(request, status, body):
+    """Response check: success, and for kills also 404 of job that was killed already"""
+
+    if request[0] == "DELETE" and status == 404:
+        return load.success(request, 200, body)
+    return load.success(request, status, body)
+
+# benchmark ------------------------------------------------------------
+
+def run_combination(executor, concurrency, aurora_cmd, env, args):
+    cmd = shlex.split(args.server_cmd) + [
+        "--port=%d" % args.port,
+        "--executor=%s" % executor,
+        "--concurrency=%s" % concurrency,
+        "--parallel=%d" % args.parallel,
+        "--aurora_cmd=%s" % aurora_cmd,
+        "--list_cache_ttl=0",
+        "--logging=%s" % args.server_logging,
+    ] + args.server_arg
+
+    server = load.start_server(cmd, env)
+    try:
+        if not load.wait_ready(args.port, args.startup_timeout):
+            logger.error("server did not start: %s/%s", executor, concurrency)
+            return { "executor": executor, "concurrency": concurrency, "failed": "startup" }
+
+        if args.warmup > 0:
+            load.LoadGenerator(args.port, args.clients, make_workload(args.kill_every),
+                               check_response).run(args.warmup)
+
+        sampler = load.MemorySampler(server.pid).start()
+        generator = load.LoadGenerator(args.port, args.clients, make_workload(args.kill_every),
+                                       check_response)
+        summary = generator.run(args.duration)
+        sampler.stop()
+
+        summary.update(results.summarize(generator.latencies))
+        summary.update({
+            "executor":       executor,
+            "concurrency":    concurrency,
+            "clients":        args.clients,
+            "rss_peak_bytes": sampler.peak,
+            "rss_end_bytes":  sampler.last,
+        })
+        return summary
+
+    finally:
+        load.stop_server(server)
+
+def format_result(r):
+    if "failed" in r:
+        return "%-9s %-10s failed: %s" % (r["executor"], r["concurrency"], r["failed"])
+
+    return ("%-9s %-10s %8.1f req/s  p50 %8.1f ms  p99 %8.1f ms  errors %5d  rss %7.1f MB"
+                % (r["executor"], r["concurrency"], r["throughput"] or 0,
+                   r["p50_ms"] or 0, r["p99_ms"] or 0, r["errors"],
+                   r["rss_peak_bytes"] / (1024.0 * 1024.0)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of executor and concurrency modes")
+    parser.add_argument("--server-cmd", default="dist/aurora_rest.pex",
+                        help="command that starts the REST server")
+    parser.add_argument("--server-arg", action="append", default=[],
+                        help="additional option for the server, may be repeated")
+    parser.add_argument("--server-logging", default="warning",
+                        help="log level of the server, logging of every request costs time")
+    parser.add_argument("--executors", default="internal,external")
+    parser.add_argument("--concurrency", default="coroutine,thread,process")
+    parser.add_argument("--port", type=int, default=18888)
+    parser.add_argument("--scheduler-port", type=int, default=18081)
+    parser.add_argument("--parallel", type=int, default=16, help="--parallel of the server")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per combination")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of load before measuring")
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency of the stand-in scheduler and client")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--jobs-per-role", type=int, default=10)
+    parser.add_argument("--kill-every", type=int, default=0, help="every N-th request of client kills job")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--output", default="bench_results.jsonl", help="file to append the results to")
+    parser.add_argument("--compare", help="file with results of the baseline")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    directory = tempfile.mkdtemp(prefix="aurora-rest-bench-")
+    scheduler = multiprocessing.Process(target=fake_scheduler.serve,
+                                        args=(args.scheduler_port, args.latency_ms,
+                                              args.jitter_ms, args.jobs_per_role))
+    scheduler.daemon = True
+    scheduler.start()
+
+    try:
+        write_clusters(directory, args.scheduler_port)
+        aurora_cmd = write_aurora_cli(directory)
+        env = make_env(directory, args)
+
+        matrix = []
+        for executor in args.executors.split(","):
+            for concurrency in args.concurrency.split(","):
+                logger.info("benchmark: executor=%s concurrency=%s", executor, concurrency)
+                result = run_combination(executor, concurrency, aurora_cmd, env, args)
+                logger.info(format_result(result))
+                matrix.append(result)
+    finally:
+        scheduler.terminate()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    params = dict((k, v) for k, v in vars(args).items() if k not in ("output", "compare"))
+    document = results.make_document(SUITE, params, matrix)
+    results.save(document, args.output)
+
+    print("")
+    for r in matrix:
+        print(format_result(r))
+
+    if args.compare:
+        base = results.load(args.compare, SUITE)
+        if base is None:
+            logger.warning("no results of %s found in %s", SUITE, args.compare)
+        else:
+            print("")
+            print(results.compare(base, document, ("executor", "concurrency"),
+                                  ("throughput", "p50_ms", "p99_ms", "rss_peak_bytes")))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# ----------------------------------------------------------------------
+#
+#                  Stand-in for the Aurora Command-line Client
+#
+# Answers the commands that the external executor runs, after sleeping
+# for the configured latency. The script does not import anything but
+# the standard library so that the benchmark harness can copy it as
+# executable file, the settings are taken from environment variables:
+#
+#   FAKE_AURORA_LATENCY_MS  time to spend in every command
+#   FAKE_AURORA_JOBS        number of jobs reported by list_jobs
+#   FAKE_AURORA_FAIL        commands to fail, comma-separated
+#
+# Options that the Aurora client does not know for the command are
+# rejected the way optparse of the client rejects them, so that wrong
+# flags of the executor fail the benchmark instead of passing unseen.
+#
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+
+ENVIRONMENT = "bench"
+
+UPDATER_OPTIONS = ("--batch_size", "--max_per_shard_failures", "--max_total_failures",
+                   "--restart_threshold", "--watch_secs")
+
+# command: options of the Aurora client that the external executor may pass
+COMMANDS = {
+    "list_jobs":        (),
+    "create":           (),
+    "update":           ("--shards", "--updater_health_check_interval_seconds"),
+    "cancel_update":    (),
+    "kill":             ("--shards",),
+    "killall":          (),
+    "restart":          ("--shards", "--updater_health_check_interval_seconds") + UPDATER_OPTIONS,
+}
+
+def main(argv):
+    if len(argv) < 2:
+        sys.stderr.write("usage: %s command [args]\n" % argv[0])
+        return 2
+
+    command = argv[1]
+    if command not in COMMANDS:
+        sys.stderr.write("error: unknown command: %s\n" % command)
+        return 2
+    for arg in argv[2:]:
+        option = arg.split("=", 1)[0]
+        if option.startswith("--") and option not in COMMANDS[command]:
+            sys.stderr.write("%s %s: error: no such option: %s\n" % (argv[0], command, option))
+            return 2
+
+    time.sleep(float(os.environ.get("FAKE_AURORA_LATENCY_MS", "0")) / 1000.0)
+
+    if command in os.environ.get("FAKE_AURORA_FAIL", "").split(","):
+        sys.stdout.write("Response from scheduler: ERROR (message: injected failure)\n")
+        return 1
+
+    if command == "list_jobs":
+        (cluster, role) = argv[2].split("/")[:2]
+        for i in range(int(os.environ.get("FAKE_AURORA_JOBS", "10"))):
+            sys.stdout.write("%s/%s/%s/%s-job-%04d\n" % (cluster, role, ENVIRONMENT, role, i))
+        return 0
+
+    sys.stdout.write("Response from scheduler: OK (message: %s)\n" % " ".join(argv[1:]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,179 @@
+# ----------------------------------------------------------------------
+#
+#                  Stand-in for the Aurora Scheduler
+#
+# Serves the Thrift API of the scheduler over HTTP with JSON protocol,
+# the same transport that the Aurora client uses to talk to scheduler
+# configured with "scheduler_uri" in clusters.json. Every call sleeps
+# for the configured latency before it is answered.
+#
+# getJobs answers with deterministic list of jobs for every role, all
+# other calls are answered with OK and no result, which is enough for
+# the client API calls that do not poll the scheduler afterwards
+# (listing and killing of jobs). createJob checks that the parts of the
+# job configuration agree with each other, so that configurations mixed
+# up between concurrent requests are rejected.
+#
+# ----------------------------------------------------------------------
+
+import time
+import random
+import logging
+import argparse
+import threading
+import BaseHTTPServer
+import SocketServer
+
+from thrift.protocol import TJSONProtocol
+from thrift.transport import TTransport
+
+from gen.apache.aurora.api import AuroraAdmin
+from gen.apache.aurora.api.ttypes import (
+    GetJobsResult,
+    Identity,
+    JobConfiguration,
+    JobKey,
+    Response,
+    ResponseCode,
+    Result
+)
+
+logger = logging.getLogger("bench")
+
+ENVIRONMENT = "bench"
+
+# scheduler ------------------------------------------------------------
+
+def job_names(role, jobs_per_role):
+    """Names of the jobs that the stand-in scheduler reports for the role"""
+
+    return [ "%s-job-%04d" % (role, i) for i in range(jobs_per_role) ]
+
+def inconsistency(config):
+    """Describe the first part of job configuration that does not match its job key, or None"""
+
+    key  = config.key
+    task = config.taskConfig
+    if key is None or task is None:
+        return "job configuration without key or task"
+
+    for (field, expected, actual) in [
+            ("job name",    key.name,        task.jobName),
+            ("environment", key.environment, task.environment),
+            ("owner role",  key.role,        task.owner.role if task.owner is not None else None) ]:
+        if actual is not None and actual != expected:
+            return "%s %s of task does not match job key %s/%s/%s" % (
+                        field, actual, key.role, key.environment, key.name)
+
+    # the processes of the bench jobs echo the name of their job
+    data = task.executorConfig.data if task.executorConfig is not None else ""
+    if key.name not in data:
+        return "executor configuration does not belong to job %s" % key.name
+
+    return None
+
+class FakeSchedulerHandler():
+    """Implementation of the scheduler Thrift interface"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, jobs_per_role=10):
+        self.latency       = latency_ms / 1000.0
+        self.jitter        = jitter_ms / 1000.0
+        self.jobs_per_role = jobs_per_role
+        self.calls         = {}
+        self.lock          = threading.Lock()
+
+    def wait(self, call):
+        with self.lock:
+            self.calls[call] = self.calls.get(call, 0) + 1
+
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def getJobs(self, ownerRole):
+        self.wait("getJobs")
+
+        configs = set([ JobConfiguration(
+                            key=JobKey(role=ownerRole, environment=ENVIRONMENT, name=name),
+                            owner=Identity(role=ownerRole, user=ownerRole))
+                        for name in job_names(ownerRole, self.jobs_per_role) ])
+
+        return Response(responseCode=ResponseCode.OK, messageDEPRECATED="ok",
+                        result=Result(getJobsResult=GetJobsResult(configs=configs)))
+
+    def createJob(self, description, *args):
+        self.wait("createJob")
+
+        problem = inconsistency(description)
+        if problem is not None:
+            logger.warning("createJob: %s", problem)
+            return Response(responseCode=ResponseCode.INVALID_REQUEST, messageDEPRECATED=problem)
+
+        return Response(responseCode=ResponseCode.OK, messageDEPRECATED="ok")
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.wait(name)
+            return Response(responseCode=ResponseCode.OK, messageDEPRECATED="ok")
+
+        return call
+
+# http transport -------------------------------------------------------
+
+class ThriftRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Thrift calls posted to /api, JSON protocol"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.getheader("content-length", 0)))
+
+        itrans = TTransport.TMemoryBuffer(body)
+        otrans = TTransport.TMemoryBuffer()
+        self.server.processor.process(TJSONProtocol.TJSONProtocol(itrans),
+                                      TJSONProtocol.TJSONProtocol(otrans))
+        output = otrans.getvalue()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.apache.thrift.json")
+        self.send_header("Content-Length", str(len(output)))
+        self.end_headers()
+        self.wfile.write(output)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+class FakeSchedulerServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+    request_queue_size  = 128
+
+    def __init__(self, port, handler):
+        BaseHTTPServer.HTTPServer.__init__(self, ("localhost", port), ThriftRequestHandler)
+        self.handler   = handler
+        self.processor = AuroraAdmin.Processor(handler)
+
+# factory --------------------------------------------------------------
+
+def create(port, latency_ms=0, jitter_ms=0, jobs_per_role=10):
+    """Factory function for the stand-in scheduler, call serve_forever() to run it"""
+
+    return FakeSchedulerServer(port, FakeSchedulerHandler(latency_ms, jitter_ms, jobs_per_role))
+
+def serve(port, latency_ms=0, jitter_ms=0, jobs_per_role=10):
+    create(port, latency_ms, jitter_ms, jobs_per_role).serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in for the Aurora scheduler")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--jobs-per-role", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info("fake scheduler listening on port %d, latency %s ms", args.port, args.latency_ms)
+    serve(args.port, args.latency_ms, args.jitter_ms, args.jobs_per_role)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# ----------------------------------------------------------------------
+#
+#                  Micro-benchmarks of the Per-request Hot Paths
+#
+# Times the code that runs on every call with realistic sizes of the
+# input: lists of 10k shards, jobspecs of 5k lines, listings of 50k
+# jobs. The log records of the executors are formatted and written to
+# /dev/null, at the level given with --log-level, because that is part
+# of the cost of these paths in the server.
+#
+# The results are stored and compared the same way as the results of
+# the executor matrix:
+#
+#   $ dist/hot_paths.pex --output=hot_paths.jsonl --compare=baseline.jsonl
+#
+# ----------------------------------------------------------------------
+
+import os
+import re
+import shutil
+import timeit
+import logging
+import argparse
+import tempfile
+
+from apache.aurora.rest.bench import results
+from apache.aurora.rest.bench.executor_matrix import CLUSTER, write_clusters
+
+SUITE = "hot_paths"
+
+ROLE        = "bench"
+ENVIRONMENT = "bench"
+JOBNAME     = "hello"
+
+# inputs ---------------------------------------------------------------
+
+def make_shards(count):
+    """Shards as sent in the query string: one list of single shards and one of ranges"""
+
+    singles = ",".join(str(i) for i in range(count // 2))
+    ranges  = ",".join("%d-%d" % (i, min(i + 9, count - 1)) for i in range(count // 2, count, 10))
+    return [ singles, ranges ]
+
+def make_jobspec(lines):
+    """Aurora configuration with _lines_ lines, most of them process definitions"""
+
+    header = [
+        "processes = [",
+    ]
+    footer = [
+        "]",
+        "",
+        "task = SequentialTask(",
+        "  processes = processes[:10],",
+        "  resources = Resources(cpu = 0.1, ram = 16*MB, disk = 16*MB))",
+        "",
+        "jobs = [",
+        "  Job(cluster = '%s', role = '%s', environment = '%s', name = '%s'," % (CLUSTER, ROLE, ENVIRONMENT, JOBNAME),
+        "      task = task, instances = 1)",
+        "]",
+    ]
+    processes = [ "  Process(name = 'p%05d', cmdline = 'echo {{mesos.instance}} %d')," % (i, i)
+                    for i in range(max(lines - len(header) - len(footer), 1)) ]
+
+    return "\n".join(header + processes + footer) + "\n"
+
+def make_jobs(count):
+    return [ "%s/%s/%s/%s-%06d" % (CLUSTER, ROLE, ENVIRONMENT, JOBNAME, i) for i in range(count) ]
+
+def make_cmd_output(lines):
+    """Output of the aurora client for command over many shards"""
+
+    output = [ "INFO] Instance %d: updated" % i for i in range(lines) ]
+    return "\n".join(output + [ "Response from scheduler: OK (message: done)" ]) + "\n"
+
+# benchmarks -----------------------------------------------------------
+
+def bench_pack_instance_list_internal(args):
+    from apache.aurora.rest.executors import internal_executor
+    executor = internal_executor.create()
+    shards = make_shards(args.shards)
+    return lambda: executor.pack_instance_list(shards)
+
+def bench_pack_instance_list_external(args):
+    from apache.aurora.rest.executors import external_executor
+    executor = external_executor.create()
+    shards = make_shards(args.shards)
+    return lambda: executor.pack_instance_list(shards)
+
+def bench_make_job_config(args):
+    from apache.aurora.common.aurora_job_key import AuroraJobKey
+    from apache.aurora.rest.executors import internal_executor
+    executor = internal_executor.create()
+    job_key = AuroraJobKey(CLUSTER, ROLE, ENVIRONMENT, JOBNAME)
+    jobspec = make_jobspec(args.jobspec_lines)
+    return lambda: executor.make_job_config(job_key, jobspec)
+
+def bench_make_jobspec_file(args):
+    from apache.aurora.rest.executors import external_executor
+    executor = external_executor.create()
+    jobspec = make_jobspec(args.jobspec_lines)
+    return lambda: executor.make_jobspec_file(jobspec).close()
+
+def bench_is_aurora_command_successful(args):
+    from apache.aurora.rest.executors import external_executor
+    executor = external_executor.create()
+    output = make_cmd_output(args.shards)
+    return lambda: executor.is_aurora_command_successful(output)
+
+def bench_route_dispatch(args):
+    """Match of request paths to handlers, the same loop as in tornado.web.Application"""
+
+    from tornado.httpserver import HTTPRequest
+    from apache.aurora.rest.apps import application_async
+
+    app = application_async.create("alpha", executor=None)
+    requests = [ HTTPRequest("GET", path, headers={ "Host": "localhost" }) for path in [
+        "/alpha/version",
+        "/alpha/jobs/%s/%s" % (CLUSTER, ROLE),
+        "/alpha/jobs/%s/%s/%s/%s" % (CLUSTER, ROLE, ENVIRONMENT, JOBNAME),
+        "/alpha/jobs/%s/%s/%s/%s/update" % (CLUSTER, ROLE, ENVIRONMENT, JOBNAME),
+        "/alpha/jobs/%s/%s/%s/%s/restart" % (CLUSTER, ROLE, ENVIRONMENT, JOBNAME),
+    ]]
+
+    def dispatch():
+        for request in requests:
+            for spec in app._get_host_handlers(request):
+                if spec.regex.match(request.path):
+                    break
+
+    return dispatch
+
+def bench_list_response(args):
+    """Serialization of the listing, as done by ListJobsHandler, together with its Etag"""
+
+    from tornado import escape
+    from apache.aurora.rest.apps.caching import make_etag
+
+    jobs = make_jobs(args.jobs)
+    jobkey = "%s/%s" % (CLUSTER, ROLE)
+
+    def serialize():
+        make_etag(jobs)
+        escape.utf8(escape.json_encode({
+            "status":       "success",
+            "key":          jobkey,
+            "count":        len(jobs),
+            "jobs":         dict(enumerate(jobs, start=1))
+        }))
+
+    return serialize
+
+BENCHMARKS = [
+    ("pack_instance_list/internal",             bench_pack_instance_list_internal),
+    ("pack_instance_list/external",             bench_pack_instance_list_external),
+    ("make_job_config",                         bench_make_job_config),
+    ("make_jobspec_file",                       bench_make_jobspec_file),
+    ("is_aurora_command_successful",            bench_is_aurora_command_successful),
+    ("route_dispatch",                          bench_route_dispatch),
+    ("list_response",                           bench_list_response),
+]
+
+# runner ---------------------------------------------------------------
+
+def measure(name, func, args):
+    """Time the function, the number of calls per round is chosen to take ~0.2 seconds"""
+
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        if timer.timeit(number) >= 0.2 or number >= 1000000:
+            break
+        number *= 10
+
+    timings = [ t / number for t in timer.repeat(args.repeat, number) ]
+
+    return {
+        "name":     name,
+        "calls":    number,
+        "best_ms":  round(min(timings) * 1000.0, 4),
+        "mean_ms":  round(sum(timings) / len(timings) * 1000.0, 4)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the per-request hot paths")
+    parser.add_argument("--only", help="run only benchmarks with name matching this expression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--shards", type=int, default=10000)
+    parser.add_argument("--jobspec-lines", type=int, default=5000)
+    parser.add_argument("--jobs", type=int, default=50000)
+    parser.add_argument("--log-level", default="info", help="level of the log of the executors")
+    parser.add_argument("--output", default="bench_results.jsonl", help="file to append the results to")
+    parser.add_argument("--compare", help="file with results of the baseline")
+    args = parser.parse_args()
+
+    dev_null = open(os.devnull, "w")
+    logging.basicConfig(stream=dev_null, level=getattr(logging, args.log_level.upper()))
+
+    # the job configuration is validated against the known clusters
+    directory = tempfile.mkdtemp(prefix="aurora-rest-bench-")
+    write_clusters(directory, 0)
+    os.environ["HOME"] = os.environ["AURORA_CONFIG_ROOT"] = directory
+
+    measurements = []
+    try:
+        for name, setup in BENCHMARKS:
+            if args.only and not re.search(args.only, name):
+                continue
+            result = measure(name, setup(args), args)
+            print("%-36s %12.4f ms  (mean %.4f ms, %d calls x %d)"
+                    % (name, result["best_ms"], result["mean_ms"], result["calls"], args.repeat))
+            measurements.append(result)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    params = dict((k, v) for k, v in vars(args).items() if k not in ("output", "compare"))
+    document = results.make_document(SUITE, params, measurements)
+    results.save(document, args.output)
+
+    if args.compare:
+        base = results.load(args.compare, SUITE)
+        if base is not None:
+            print("")
+            print(results.compare(base, document, ("name",), ("best_ms",)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# ----------------------------------------------------------------------
+#                  Load Generation against the REST Server
+# ----------------------------------------------------------------------
+
+import os
+import json
+import time
+import signal
+import socket
+import httplib
+import logging
+import resource
+import threading
+import subprocess
+
+logger = logging.getLogger("bench")
+
+PAGE_SIZE = resource.getpagesize()
+
+# server process -------------------------------------------------------
+
+def start_server(cmd, env=None):
+    """Start the REST server as child process"""
+
+    logger.info("starting server: %s", " ".join(cmd))
+    return subprocess.Popen(cmd, env=env, preexec_fn=os.setsid)
+
+def wait_ready(port, timeout=60, host="localhost"):
+    """Wait until the server answers GET /alpha/version, return False on timeout"""
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = httplib.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/alpha/version")
+            if conn.getresponse().status == 200:
+                return True
+        except (socket.error, httplib.HTTPException):
+            pass
+        time.sleep(0.2)
+
+    return False
+
+def stop_server(process, timeout=10):
+    """Stop the server together with all its workers"""
+
+    if process.poll() is not None:
+        return
+
+    os.killpg(process.pid, signal.SIGTERM)
+    deadline = time.time() + timeout
+    while process.poll() is None and time.time() < deadline:
+        time.sleep(0.1)
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+# memory ---------------------------------------------------------------
+
+def children(pid):
+    """Return the pids of all descendants of process _pid_"""
+
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % entry) as stat:
+                # the name of the command is in parenthesis and may contain spaces
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (IOError, OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+
+    result = []
+    pending = [pid]
+    while pending:
+        for child in parents.get(pending.pop(), []):
+            result.append(child)
+            pending.append(child)
+
+    return result
+
+def rss_of(pid):
+    try:
+        with open("/proc/%d/statm" % pid) as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (IOError, OSError, IndexError, ValueError):
+        return 0
+
+def rss_of_tree(pid):
+    """Resident memory of process _pid_ and all its descendants"""
+
+    return sum(rss_of(p) for p in [pid] + children(pid))
+
+class MemorySampler():
+    """Thread that samples the resident memory of the server process tree"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid      = pid
+        self.interval = interval
+        self.peak     = 0
+        self.last     = 0
+        self.stopped  = threading.Event()
+        self.thread   = threading.Thread(target=self.run, name="memory-sampler")
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.last = rss_of_tree(self.pid)
+            self.peak = max(self.peak, self.last)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+# load generator -------------------------------------------------------
+
+class LoadGenerator():
+    """Concurrent clients that send requests for a number of seconds
+
+    Every client keeps its own connection open and sends the next request
+    as soon as the response to the previous one is received. The requests
+    are made by _make_request(client, sequence)_ that returns tuple
+    (method, path, body), and every response is passed to _check(request,
+    status, body)_ that returns True if the response was correct.
+    """
+
+    def __init__(self, port, clients, make_request, check=None, host="localhost", timeout=300):
+        self.host         = host
+        self.port         = port
+        self.clients      = clients
+        self.make_request = make_request
+        self.check        = check or (lambda request, status, body: status == 200)
+        self.timeout      = timeout
+        self.lock         = threading.Lock()
+        self.latencies    = []
+        self.statuses     = {}
+        self.errors       = 0
+
+    def record(self, latency, status, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if not ok:
+                self.errors += 1
+
+    def client(self, number, deadline):
+        conn = None
+        sequence = 0
+        while time.time() < deadline:
+            request = self.make_request(number, sequence)
+            sequence += 1
+            (method, path, body) = request
+            start = time.time()
+            try:
+                if conn is None:
+                    conn = httplib.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                conn.request(method, path, body)
+                response = conn.getresponse()
+                data = response.read()
+                ok = self.check(request, response.status, data)
+                self.record(time.time() - start, response.status, ok)
+                if response.getheader("connection", "").lower() == "close":
+                    conn.close()
+                    conn = None
+            except (socket.error, httplib.HTTPException):
+                self.record(time.time() - start, "connection error", False)
+                if conn is not None:
+                    conn.close()
+                conn = None
+
+        if conn is not None:
+            conn.close()
+
+    def run(self, seconds):
+        """Send requests for _seconds_, return the summary of the responses"""
+
+        deadline = time.time() + seconds
+        threads = [ threading.Thread(target=self.client, args=(i, deadline), name="client-%d" % i)
+                        for i in range(self.clients) ]
+
+        start = time.time()
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - start
+
+        return {
+            "requests":   len(self.latencies),
+            "errors":     self.errors,
+            "statuses":   dict((str(k), v) for k, v in self.statuses.items()),
+            "seconds":    round(elapsed, 3),
+            "throughput": round(len(self.latencies) / elapsed, 2) if elapsed > 0 else None
+        }
+
+def success(request, status, body):
+    """Response check: status 200 and JSON document with status success"""
+
+    if status != 200:
+        return False
+    try:
+        return json.loads(body).get("status") == "success"
+    except ValueError:
+        return False
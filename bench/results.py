@@ -0,0 +1,105 @@
+# ----------------------------------------------------------------------
+#                  Storage and Comparison of Benchmark Results
+# ----------------------------------------------------------------------
+
+import os
+import json
+import math
+import time
+import socket
+import platform
+import subprocess
+
+# statistics -----------------------------------------------------------
+
+def percentile(values, p):
+    """Return the p-th percentile (0-100) of the values, nearest-rank method"""
+
+    if len(values) == 0:
+        return None
+
+    ordered = sorted(values)
+    rank = int(math.ceil(p / 100.0 * len(ordered)))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+def summarize(latencies):
+    """Summary of list of latencies (in seconds) in milliseconds"""
+
+    if len(latencies) == 0:
+        return { "p50_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None }
+
+    return {
+        "p50_ms":   round(percentile(latencies, 50) * 1000.0, 3),
+        "p99_ms":   round(percentile(latencies, 99) * 1000.0, 3),
+        "mean_ms":  round(sum(latencies) / len(latencies) * 1000.0, 3),
+        "max_ms":   round(max(latencies) * 1000.0, 3)
+    }
+
+# results --------------------------------------------------------------
+
+def git_commit(path=None):
+    """Return the commit of the source tree, or None if not known"""
+
+    try:
+        with open(os.devnull, "w") as dev_null:
+            return subprocess.check_output(["git", "rev-parse", "HEAD"],
+                        cwd=path or os.path.dirname(os.path.abspath(__file__)),
+                        stderr=dev_null).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_document(suite, params, results):
+    """Wrap benchmark results with the data needed to compare them across commits"""
+
+    return {
+        "suite":        suite,
+        "commit":       git_commit(),
+        "timestamp":    time.time(),
+        "host":         socket.gethostname(),
+        "python":       platform.python_version(),
+        "params":       params,
+        "results":      results
+    }
+
+def save(document, path):
+    """Append the document to file with one JSON document per line"""
+
+    with open(path, "a") as output:
+        output.write(json.dumps(document, sort_keys=True) + "\n")
+
+def load(path, suite=None):
+    """Return the last document of the suite stored in file"""
+
+    document = None
+    with open(path) as source:
+        for line in source:
+            if len(line.strip()) == 0:
+                continue
+            d = json.loads(line)
+            if suite is None or d.get("suite") == suite:
+                document = d
+
+    return document
+
+def compare(base, current, key_fields, value_fields):
+    """Format table comparing results of two documents, matched by _key_fields_"""
+
+    def key(result):
+        return tuple(result.get(f) for f in key_fields)
+
+    base_results = dict((key(r), r) for r in base["results"])
+
+    lines = [ "base: %s  current: %s" % (base.get("commit"), current.get("commit")) ]
+    for result in current["results"]:
+        previous = base_results.get(key(result))
+        columns = [ "/".join(str(k) for k in key(result)) ]
+        for field in value_fields:
+            value = result.get(field)
+            old   = previous.get(field) if previous is not None else None
+            if value is None or old is None or old == 0:
+                columns.append("%s=%s" % (field, value))
+            else:
+                columns.append("%s=%s (%+.1f%%)" % (field, value, (value - old) * 100.0 / old))
+        lines.append("  ".join(columns))
+
+    return "\n".join(lines)
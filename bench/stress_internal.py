@@ -0,0 +1,298 @@
+# ----------------------------------------------------------------------
+#
+#                  Concurrency Stress Test of the Internal Executor
+#
+# Drives AuroraInternalApiExecutor from many threads of the thread pool
+# executor, and from many processes of the process pool executor,
+# against a local stand-in scheduler, with the level of parallelism
+# growing step by step. Every request works on its own role and job, so
+# its response is fully known in advance:
+#
+#   - listing of the jobs of the role must return exactly the jobs of
+#     that role reported by the scheduler
+#   - creation of job from configuration that names the job must reach
+#     the scheduler with configuration of that job and nothing else
+#   - kill of job must report the key of that job
+#
+# Responses that report error are counted as errors, responses that
+# belong to another request or are malformed are counted as corrupted.
+# The highest safe parallelism of a mode is the highest level that, as
+# well as all levels below it, completed without errors and corruption.
+#
+#   $ ./pants build src/main/python/apache/aurora/rest/bench:stress_internal
+#   $ dist/stress_internal.pex --modes=thread,process --levels=1,2,4,8,16,32,64
+#
+# ----------------------------------------------------------------------
+
+import os
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+from apache.aurora.rest.bench import fake_scheduler, results
+from apache.aurora.rest.bench.executor_matrix import CLUSTER, write_clusters
+
+logger = logging.getLogger("bench")
+
+SUITE = "stress_internal"
+
+ENVIRONMENT = fake_scheduler.ENVIRONMENT
+
+# the processes echo the name of the job, the stand-in scheduler checks it
+JOBSPEC = """
+hello = Process(name = 'hello', cmdline = 'echo %(name)s')
+
+task = SequentialTask(
+  processes = [hello],
+  resources = Resources(cpu = 0.1, ram = 16*MB, disk = 16*MB))
+
+jobs = [
+  Job(cluster = '%(cluster)s', role = '%(role)s', environment = '%(environment)s',
+      name = '%(name)s', task = task, instances = 1)
+]
+"""
+
+# workload -------------------------------------------------------------
+
+def make_request(client, sequence, jobs_per_role):
+    """Return the command of the request and the check of its result
+
+    The check returns None if the result is correct, otherwise tuple
+    (kind, description) where kind is "error" or "corrupted".
+    """
+
+    role = "stress%03d%07d" % (client, sequence)
+    name = "%s-job" % role
+    path = "%s/%s/%s/%s" % (CLUSTER, role, ENVIRONMENT, name)
+    kind = sequence % 3
+
+    if kind == 0:
+        expected = sorted("%s/%s/%s/%s" % (CLUSTER, role, ENVIRONMENT, job)
+                            for job in fake_scheduler.job_names(role, jobs_per_role))
+
+        def check(result):
+            (jobkey, jobs, errors) = result
+            if errors:
+                return ("error", "list_jobs %s: %s" % (role, errors))
+            if jobkey != "%s/%s" % (CLUSTER, role) or sorted(jobs) != expected:
+                return ("corrupted", "list_jobs %s returned %s %s" % (role, jobkey, jobs[:3]))
+            return None
+
+        return ("list_jobs", (CLUSTER, role), check)
+
+    if kind == 1:
+        jobspec = JOBSPEC % { "cluster": CLUSTER, "role": role, "environment": ENVIRONMENT, "name": name }
+
+        def check(result):
+            (jobkey, errors) = result
+            if jobkey != path:
+                return ("corrupted", "create_job %s returned key %s" % (path, jobkey))
+            if errors:
+                # the stand-in scheduler rejects configurations of other jobs
+                if any("does not match" in e or "does not belong" in e for e in errors):
+                    return ("corrupted", "create_job %s: %s" % (path, errors))
+                return ("error", "create_job %s: %s" % (path, errors))
+            return None
+
+        return ("create_job", (CLUSTER, role, ENVIRONMENT, name, jobspec), check)
+
+    def check(result):
+        (jobkey, killed, errors) = result
+        if errors:
+            return ("error", "delete_job %s: %s" % (path, errors))
+        if jobkey != path or killed != [path]:
+            return ("corrupted", "delete_job %s returned %s %s" % (path, jobkey, killed))
+        return None
+
+    return ("delete_job", (CLUSTER, role, ENVIRONMENT, name), check)
+
+# stress ---------------------------------------------------------------
+
+class Stress():
+    """Clients that keep _level_ requests outstanding for a number of seconds"""
+
+    def __init__(self, executor, level, jobs_per_role, samples=5):
+        self.executor      = executor
+        self.level         = level
+        self.jobs_per_role = jobs_per_role
+        self.samples       = samples
+        self.lock          = threading.Lock()
+        self.latencies     = []
+        self.counts        = { "error": 0, "corrupted": 0, "exception": 0 }
+        self.examples      = []
+
+    def record(self, latency, failure):
+        with self.lock:
+            self.latencies.append(latency)
+            if failure is not None:
+                self.counts[failure[0]] += 1
+                if len(self.examples) < self.samples:
+                    self.examples.append("%s: %s" % failure)
+
+    def client(self, number, deadline):
+        sequence = 0
+        while time.time() < deadline:
+            (method, args, check) = make_request(number, sequence, self.jobs_per_role)
+            sequence += 1
+            start = time.time()
+            try:
+                result = getattr(self.executor, method)(*args).result()
+                try:
+                    failure = check(result)
+                except (TypeError, ValueError):
+                    failure = ("corrupted", "%s returned malformed result %r" % (method, result))
+            except Exception as e:
+                failure = ("exception", "%s raised %s: %s" % (method, type(e).__name__, e))
+            self.record(time.time() - start, failure)
+
+    def run(self, seconds):
+        deadline = time.time() + seconds
+        threads = [ threading.Thread(target=self.client, args=(i, deadline), name="stress-%d" % i)
+                        for i in range(self.level) ]
+
+        start = time.time()
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - start
+
+        summary = {
+            "level":      self.level,
+            "requests":   len(self.latencies),
+            "throughput": round(len(self.latencies) / elapsed, 2) if elapsed > 0 else None,
+            "examples":   self.examples
+        }
+        summary.update(self.counts)
+        summary.update(results.summarize(self.latencies))
+        return summary
+
+def make_executor(mode, level, args):
+    """Pool executor of _mode_ with _level_ workers around the internal executor
+
+    The protections of the pools (adaptive cluster limit, circuit breaker,
+    coalescing, retries) are turned off, and every request works on its
+    own job, so that the workers of the pool call the Aurora client as
+    many at a time as there are clients.
+    """
+
+    from apache.aurora.rest.executors import internal_executor
+    delegate = internal_executor.create(retries=0)
+
+    if mode == "thread":
+        from concurrent.futures import ThreadPoolExecutor
+        from apache.aurora.rest.executors import mt_executor
+        pool = ThreadPoolExecutor(level)
+        return (mt_executor.create(delegate, thread_pool=pool, max_workers=level,
+                                   adaptive_limit=False, coalesce=False), pool)
+
+    from concurrent.futures import ProcessPoolExecutor
+    from apache.aurora.rest.executors import mp_executor
+    pool = ProcessPoolExecutor(level)
+    return (mp_executor.create(delegate, process_pool=pool, max_procs=level,
+                               adaptive_limit=False, coalesce=False), pool)
+
+def run_mode(mode, args):
+    """Run the levels of parallelism of _mode_, return their results and the highest safe one"""
+
+    levels = []
+    safe = 0
+    for level in [ int(l) for l in args.levels.split(",") ]:
+        (executor, pool) = make_executor(mode, level, args)
+        try:
+            if args.warmup > 0:
+                Stress(executor, level, args.jobs_per_role).run(args.warmup)
+            result = Stress(executor, level, args.jobs_per_role).run(args.duration)
+        finally:
+            pool.shutdown(wait=True)
+
+        result["mode"] = mode
+        levels.append(result)
+        logger.info(format_result(result))
+        for example in result["examples"]:
+            logger.warning("  %s", example)
+
+        failed = result["error"] + result["corrupted"] + result["exception"]
+        if failed > 0:
+            if not args.keep_going:
+                break
+        elif safe == len(levels) - 1:
+            safe = len(levels)
+
+    highest = levels[safe - 1]["level"] if safe > 0 else 0
+    return (levels, highest)
+
+def format_result(r):
+    return ("%-8s %4d  %8.1f req/s  p50 %8.1f ms  p99 %8.1f ms  errors %5d  corrupted %5d  exceptions %5d"
+                % (r["mode"], r["level"], r["throughput"] or 0, r["p50_ms"] or 0, r["p99_ms"] or 0,
+                   r["error"], r["corrupted"], r["exception"]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency stress test of the internal executor")
+    parser.add_argument("--modes", default="thread,process")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64", help="numbers of workers and clients to try")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load per level")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of load before measuring")
+    parser.add_argument("--keep-going", action="store_true", help="try higher levels after a failed level")
+    parser.add_argument("--scheduler-port", type=int, default=18082)
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency of the stand-in scheduler")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--jobs-per-role", type=int, default=10)
+    parser.add_argument("--log-level", default="warning", help="level of the log of the executors")
+    parser.add_argument("--output", default="bench_results.jsonl", help="file to append the results to")
+    parser.add_argument("--compare", help="file with results of the baseline")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), format="%(asctime)s %(message)s")
+    logger.setLevel(logging.INFO)
+
+    # the Aurora client finds the stand-in scheduler through clusters.json,
+    # the worker processes inherit the environment
+    directory = tempfile.mkdtemp(prefix="aurora-rest-stress-")
+    write_clusters(directory, args.scheduler_port)
+    os.environ["HOME"] = os.environ["AURORA_CONFIG_ROOT"] = directory
+
+    scheduler = multiprocessing.Process(target=fake_scheduler.serve,
+                                        args=(args.scheduler_port, args.latency_ms,
+                                              args.jitter_ms, args.jobs_per_role))
+    scheduler.daemon = True
+    scheduler.start()
+
+    measurements = []
+    safe = {}
+    try:
+        for mode in args.modes.split(","):
+            logger.info("stress: mode=%s levels=%s", mode, args.levels)
+            (levels, highest) = run_mode(mode, args)
+            measurements.extend(levels)
+            safe[mode] = highest
+    finally:
+        scheduler.terminate()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    params = dict((k, v) for k, v in vars(args).items() if k not in ("output", "compare"))
+    params["highest_safe_level"] = safe
+    document = results.make_document(SUITE, params, measurements)
+    results.save(document, args.output)
+
+    print("")
+    for r in measurements:
+        print(format_result(r))
+    print("")
+    for mode in args.modes.split(","):
+        print("highest safe parallelism of %-8s %d" % (mode + ":", safe[mode]))
+
+    if args.compare:
+        base = results.load(args.compare, SUITE)
+        if base is not None:
+            print("")
+            print(results.compare(base, document, ("mode", "level"),
+                                  ("throughput", "p99_ms", "corrupted")))
+
+if __name__ == "__main__":
+    main()
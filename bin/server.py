@@ -3,7 +3,9 @@
 #  REST service exposing API interface to Aurora client commands
 # ----------------------------------------------------------------------
 
-import tornado.httpserver
+import time
+STARTED_AT = time.time()
+
 import tornado.ioloop
 import tornado.options
 import tornado.web
@@ -11,18 +13,10 @@ import tornado.process
 
 from tornado.options import define, options
 
-from apache.aurora.rest.apps import (
-    application,
-    application_async
-)
-
-from apache.aurora.rest.executors import (
-    external_executor,
-    internal_executor,
-    coroutine_executor,
-    mt_executor,
-    mp_executor
-)
+from apache.aurora.rest.monitor import imports, watchdog, asynclog
+from apache.aurora.rest.executors.context import parse_timeouts
+from apache.aurora.rest.apps import upload, fanout
+from apache.aurora.rest.executors import updater
 
 import logging
 logger = logging.getLogger("tornado.access")
@@ -34,8 +28,100 @@ REQUESTS_PER_CPU = 16
 
 define("port", 		default=8888, 		help="run on the given port", type=int)
 define("executor", 	default="internal", 	help="Type of Aurora command executor", type=str)
+define("aurora_cmd", 	default=None, 		help="Aurora command-line client run by the external executor", type=str)
 define("concurrency", 	default="process", 	help="Type of concurrent execution", type=str)
 define("parallel", 	default=NCPUs*REQUESTS_PER_CPU, help="max number of simultaneous requests", type=int)
+define("max_queued_reads", default=256, help="max number of list requests waiting for a worker, 0 for unbounded", type=int)
+define("max_queued_mutations", default=64, help="max number of job changes waiting for a worker, 0 for unbounded", type=int)
+define("adaptive_limit", default=True, 	help="adapt the number of parallel requests per cluster to the scheduler latency", type=bool)
+define("breaker_failures", default=5, 	help="consecutive failures that open the circuit of a cluster, 0 to disable", type=int)
+define("breaker_reset", default=30.0, 	help="seconds the circuit of a cluster stays open before it is probed", type=float)
+define("breaker_probes", default=1, 	help="number of commands let through to probe a cluster with open circuit", type=int)
+define("coalesce", 	default=True, 	help="answer identical waiting changes of the same job with one command", type=bool)
+define("retries", 	default=2, 	help="retries of idempotent scheduler calls after transient errors, 0 to disable", type=int)
+define("retry_backoff_ms", default=100, help="base of the jittered exponential wait between retries, in milliseconds", type=int)
+define("retry_budget", 	default=0.1, 	help="retries allowed per scheduler call, on average, for each cluster", type=float)
+define("retry_after", 	default=1, 	help="seconds that rejected clients are asked to wait before retry", type=int)
+define("request_timeout", default=0.0,	help="seconds after which queued requests are discarded, 0 to wait forever", type=float)
+define("request_timeouts", default="", 	help="timeouts of operations, e.g. list_jobs=30,restart_job=600", type=str)
+define("clusters", 	default="", 	help="clusters listed by fan-out listing of all clusters, e.g. east,west", type=str)
+define("fan_out_timeout", default=0.0, 	help="seconds to wait for the clusters of fan-out listing, 0 to wait for all", type=float)
+define("search_refresh", default=60, 	help="seconds between listings of all jobs of --clusters for the search index, 0 to disable", type=int)
+define("list_cache_ttl", default=5, 	help="seconds to answer conditional job listings from cache", type=int)
+define("slow_request_ms", default=5000,	help="log requests slower than this many milliseconds, 0 to disable", type=int)
+define("watchdog_ms", 	default=500, 	help="report IOLoop blocked longer than this many milliseconds, 0 to disable", type=int)
+define("max_body_size", default=16*1024*1024, help="max size of request body in bytes, larger are rejected with 413, 0 for no limit", type=int)
+define("body_spool_size", default=64*1024, help="request bodies larger than this many bytes are spooled to disk", type=int)
+define("jobspec_store_mb", default=64, help="megabytes of uploaded job configurations kept for reference by hash, 0 to disable", type=int)
+define("updater_defaults", default="", help="default settings of the job updater, e.g. batch_size=5,watch_secs=10", type=str)
+define("updater_limits", default="", 	help="upper limits of the settings of the job updater, e.g. batch_size=50", type=str)
+define("applied_configs", default="~/.aurora_rest/applied_configs.json", help="file to keep the digests of configurations applied to jobs, empty to keep them in memory", type=str)
+define("config_cache", 	default=64, 	help="evaluated job configurations kept for reuse by the internal executor, 0 to disable", type=int)
+define("log_queue", 	default=10000, 	help="log records buffered for the log writer thread, 0 to write on the logging thread", type=int)
+define("import_report", default=10, 	help="number of most expensive imports to log at startup, 0 to disable", type=int)
+
+# simulated executor, for capacity testing without Aurora cluster
+define("sim_latency_ms", default=100.0,	help="mean latency of simulated scheduler calls", type=float)
+define("sim_latency_dist", default="lognormal", help="constant, uniform, exponential or lognormal", type=str)
+define("sim_error_rate", default=0.0, 	help="probability that simulated scheduler call fails", type=float)
+define("sim_slowdown", 	default="", 	help="per-cluster latency factors, e.g. east=5,west=2", type=str)
+define("sim_jobs_per_role", default=10, help="number of jobs of every role in the simulated inventory", type=int)
+define("sim_outage", 	default="", 	help="clusters with unreachable simulated scheduler, e.g. east,west", type=str)
+
+# Registries of the executors and concurrency modes. The modules are
+# imported only when the mode is selected, the Aurora client code that
+# is needed by the internal executor is not loaded by the others, and
+# the workers of process pools do not inherit it.
+#
+#   name: (module, function returning arguments of module.create())
+
+EXECUTORS = {
+    "external":     ("apache.aurora.rest.executors.external_executor",
+                     lambda: { "aurora_cmd": options.aurora_cmd }),
+    "internal":     ("apache.aurora.rest.executors.internal_executor",
+                     lambda: { "retries":           options.retries,
+                               "retry_backoff_ms":  options.retry_backoff_ms,
+                               "retry_budget":      options.retry_budget,
+                               "config_cache":      options.config_cache }),
+    "simulated":    ("apache.aurora.rest.executors.simulated_executor",
+                     lambda: { "latency_ms":       options.sim_latency_ms,
+                               "distribution":     options.sim_latency_dist,
+                               "error_rate":       options.sim_error_rate,
+                               "slowdowns":        options.sim_slowdown,
+                               "jobs_per_role":    options.sim_jobs_per_role,
+                               "outages":          options.sim_outage,
+                               "retries":          options.retries,
+                               "retry_backoff_ms": options.retry_backoff_ms,
+                               "retry_budget":     options.retry_budget }),
+}
+
+CONCURRENCY = {
+    "coroutine":    ("apache.aurora.rest.executors.coroutine_executor",
+                     lambda: {}),
+    "thread":       ("apache.aurora.rest.executors.mt_executor",
+                     lambda: { "max_workers":          options.parallel,
+                               "max_queued_reads":     options.max_queued_reads,
+                               "max_queued_mutations": options.max_queued_mutations,
+                               "retry_after":          options.retry_after,
+                               "adaptive_limit":       options.adaptive_limit,
+                               "breaker_failures":     options.breaker_failures,
+                               "breaker_reset":        options.breaker_reset,
+                               "breaker_probes":       options.breaker_probes,
+                               "coalesce":             options.coalesce }),
+    "process":      ("apache.aurora.rest.executors.mp_executor",
+                     lambda: { "max_procs":            options.parallel,
+                               "max_queued_reads":     options.max_queued_reads,
+                               "max_queued_mutations": options.max_queued_mutations,
+                               "retry_after":          options.retry_after,
+                               "adaptive_limit":       options.adaptive_limit,
+                               "breaker_failures":     options.breaker_failures,
+                               "breaker_reset":        options.breaker_reset,
+                               "breaker_probes":       options.breaker_probes,
+                               "coalesce":             options.coalesce }),
+}
+
+APPLICATION_ASYNC = "apache.aurora.rest.apps.application_async"
+APPLICATION_SYNC  = "apache.aurora.rest.apps.application"
 
 def proxy_main():
     """Main function to prepare the Tornado web server to process Aurora REST API calls
@@ -51,31 +137,52 @@ def proxy_main():
 
       1. Spawning external process to invoke the Aurora command-line client
       2. Calling directly the Aurora client code
+      3. Simulating the Aurora scheduler, for capacity testing
 
     """
 
     tornado.options.parse_command_line()
 
-    if options.executor == "external":
-        client = external_executor.create()
-    elif options.executor == "internal":
-        client = internal_executor.create()
-    else:
+    if options.log_queue > 0:
+        asynclog.install(options.log_queue)
+
+    if options.executor not in EXECUTORS:
         logger.error("invalid executor: %s, exiting!" % options.executor)
         return
 
-    if options.concurrency == "coroutine":
-        app = application_async.create("alpha", executor=coroutine_executor.create(client))
-    elif options.concurrency == "thread":
-        executor = mt_executor.create(client, max_workers=options.parallel)
-        app = application_async.create("alpha", executor=executor)
-    elif options.concurrency == "process":
-        executor = mp_executor.create(client, max_procs=options.parallel)
-        app = application_async.create("alpha", executor=executor)
+    startup = imports.StartupReport(STARTED_AT)
+
+    (module_name, arguments) = EXECUTORS[options.executor]
+    client = startup.load(module_name).create(**arguments())
+
+    request_timeouts = parse_timeouts(options.request_timeouts)
+    request_timeouts.setdefault("*", options.request_timeout)
+
+    settings = {
+        "list_cache_ttl":   options.list_cache_ttl,
+        "slow_request_ms":  options.slow_request_ms,
+        "request_timeouts": request_timeouts,
+        "jobspec_store_bytes": options.jobspec_store_mb * 1024 * 1024,
+        "applied_configs":  options.applied_configs,
+        "updater_limits":   updater.create(options.updater_defaults, options.updater_limits),
+        "clusters":         fanout.parse_clusters(options.clusters),
+        "fan_out_timeout":  options.fan_out_timeout,
+        "search_refresh":   options.search_refresh,
+    }
+
+    if options.concurrency in CONCURRENCY:
+        (module_name, arguments) = CONCURRENCY[options.concurrency]
+        executor = startup.load(module_name).create(client, **arguments())
+        app = startup.load(APPLICATION_ASYNC).create("alpha", executor=executor, **settings)
     else:
-        app = application.create("alpha", executor=client)
+        app = startup.load(APPLICATION_SYNC).create("alpha", executor=client, **settings)
 
-    http_server = tornado.httpserver.HTTPServer(app)
+    http_server = upload.create(app, options.max_body_size, options.body_spool_size)
     http_server.listen(options.port)
 
+    if options.watchdog_ms > 0:
+        watchdog.create(options.watchdog_ms)
+
+    startup.log(options.import_report)
+
     tornado.ioloop.IOLoop.instance().start()
@@ -0,0 +1,185 @@
+# ----------------------------------------------------------------------
+#
+#                  Circuit Breaker per Cluster
+#
+# When the scheduler of a cluster is down every command waits for the
+# connect timeout while it holds a worker of the pool. After _failures_
+# consecutive commands of a cluster fail, its circuit opens and further
+# commands are rejected right away with 503. After _reset_ seconds the
+# circuit is half-open: up to _probes_ commands are let through to see
+# whether the scheduler is back. Success of a probe closes the circuit,
+# failure opens it again for another _reset_ seconds.
+#
+# Only exceptions count as failures, errors reported by the scheduler in
+# its response show that it is alive and well enough to answer.
+#
+# ----------------------------------------------------------------------
+
+import time
+import logging
+import httplib
+import threading
+
+import tornado.web
+
+from apache.aurora.rest.monitor import metrics
+
+logger = logging.getLogger("tornado.application")
+
+CLOSED    = "closed"
+OPEN      = "open"
+HALF_OPEN = "half-open"
+
+STATE_VALUES = { CLOSED: 0, OPEN: 1, HALF_OPEN: 2 }
+
+CIRCUIT_STATE = metrics.gauge(
+    "aurora_rest_cluster_circuit_state",
+    "State of the circuit breaker per cluster: 0 closed, 1 open, 2 half-open",
+    ["cluster"])
+
+CIRCUIT_REJECTED = metrics.counter(
+    "aurora_rest_cluster_circuit_rejected_total",
+    "Number of Aurora commands rejected because the circuit of the cluster was open",
+    ["cluster"])
+
+class ClusterUnavailable(tornado.web.HTTPError):
+    """Command rejected because the circuit of its cluster is open, answered with 503"""
+
+    def __init__(self, cluster, failures, retry_after):
+        tornado.web.HTTPError.__init__(self, httplib.SERVICE_UNAVAILABLE,
+                                       "scheduler of cluster %s is unavailable, %d consecutive "
+                                       "commands failed", cluster, failures)
+        self.retry_after = retry_after
+
+# circuit --------------------------------------------------------------
+
+class Circuit():
+    """State of the circuit of one cluster"""
+
+    def __init__(self, cluster):
+        self.cluster   = cluster
+        self.state     = CLOSED
+        self.failures  = 0
+        self.opened_at = None
+        self.probing   = 0
+        self.rejected  = 0
+
+        CIRCUIT_STATE.set_function(lambda: STATE_VALUES[self.state], (cluster,))
+
+    def describe(self):
+        return {
+            "state":        self.state,
+            "failures":     self.failures,
+            "opened_at":    self.opened_at,
+            "rejected":     self.rejected
+        }
+
+# circuit breaker ------------------------------------------------------
+
+class CircuitBreaker():
+    """Circuits of the clusters in front of a pool of workers, failures 0 turns it off"""
+
+    def __init__(self, pool, failures=5, reset=30.0, probes=1):
+        self.pool     = pool
+        self.failures = failures
+        self.reset    = reset
+        self.probes   = max(1, probes)
+        self.circuits = {}
+        self.lock     = threading.Lock()
+
+        if failures > 0:
+            logger.info("%s pool circuit breaker: failures=%d, reset=%.1f s, probes=%d",
+                        pool, failures, reset, self.probes)
+
+    def get_circuit(self, cluster):
+        """Return the circuit of the cluster, call with the lock held"""
+
+        circuit = self.circuits.get(cluster)
+        if circuit is None:
+            circuit = Circuit(cluster)
+            self.circuits[cluster] = circuit
+        return circuit
+
+    def admit(self, cluster):
+        """Return True if the command is probe, raise ClusterUnavailable if the circuit is open"""
+
+        with self.lock:
+            circuit = self.get_circuit(cluster)
+            if circuit.state == CLOSED:
+                return False
+
+            now = time.time()
+            if circuit.state == OPEN and now - circuit.opened_at >= self.reset:
+                logger.info("circuit of cluster %s is half-open, probing the scheduler", cluster)
+                circuit.state = HALF_OPEN
+
+            if circuit.state == HALF_OPEN and circuit.probing < self.probes:
+                circuit.probing += 1
+                return True
+
+            circuit.rejected += 1
+            CIRCUIT_REJECTED.inc((cluster,))
+            retry_after = max(1.0, circuit.opened_at + self.reset - now)
+            raise ClusterUnavailable(cluster, circuit.failures, retry_after)
+
+    def record(self, cluster, probe, exception):
+        """Account for the outcome of command admitted by admit()"""
+
+        with self.lock:
+            circuit = self.get_circuit(cluster)
+            if probe:
+                circuit.probing -= 1
+
+            # commands rejected by the server itself say nothing about the scheduler
+            if isinstance(exception, tornado.web.HTTPError):
+                return
+
+            if exception is None:
+                if circuit.state != CLOSED:
+                    logger.info("circuit of cluster %s is closed, the scheduler is back", cluster)
+                circuit.state = CLOSED
+                circuit.failures = 0
+                circuit.opened_at = None
+                return
+
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN and probe:
+                logger.warning("circuit of cluster %s opened again, probe failed: %s", cluster, exception)
+                circuit.state = OPEN
+                circuit.opened_at = time.time()
+            elif circuit.state == CLOSED and circuit.failures >= self.failures:
+                logger.warning("circuit of cluster %s opened after %d consecutive failures, last: %s",
+                               cluster, circuit.failures, exception)
+                circuit.state = OPEN
+                circuit.opened_at = time.time()
+
+    def guard(self, cluster, start):
+        """Start the command unless the circuit of the cluster is open
+
+        _start_ submits the command and returns future of its outcome,
+        which is returned to the caller and recorded when it completes.
+        """
+
+        if self.failures <= 0:
+            return start()
+
+        probe = self.admit(cluster)
+        try:
+            future = start()
+        except Exception as e:
+            self.record(cluster, probe, e)
+            raise
+
+        future.add_done_callback(lambda f: self.record(cluster, probe, f.exception()))
+        return future
+
+    def describe(self):
+        with self.lock:
+            return dict([ (name, circuit.describe()) for name, circuit in self.circuits.items() ])
+
+# factory --------------------------------------------------------------
+
+def create(pool, failures=5, reset=30.0, probes=1):
+    """Factory function for per-cluster circuit breaker in front of pool"""
+
+    return CircuitBreaker(pool, failures, reset, probes)
@@ -0,0 +1,166 @@
+# ----------------------------------------------------------------------
+#                  Context of Requests Executed by Executors
+# ----------------------------------------------------------------------
+
+import time
+import logging
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger("tornado.access")
+
+_local = threading.local()
+
+# request context ------------------------------------------------------
+
+class RequestContext():
+    """Data about the REST request that travels with the Aurora command
+
+    The context is created by the request handler and follows the
+    command through the executors: it is made current in the worker
+    thread that executes the command, and a copy of it is sent to the
+    worker process when process pools are used.
+
+    Time spent in the phases of the request (waiting in the queue of the
+    pool, parsing of the job configuration, calling the scheduler etc.)
+    is accumulated by phase name. The context also tells the worker if
+    the command should be profiled, or its memory allocations measured,
+    and until when the client waits for the response.
+    """
+
+    def __init__(self, name):
+        self.name       = name
+        self.started_at = time.time()
+        self.phases     = OrderedDict()
+        self.profile    = None
+        self.memory     = False
+        self.deadline   = None
+        self.lock       = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def merge(self, phases):
+        for name, seconds in (phases or {}).items():
+            self.add_phase(name, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager that accounts the time spent in its block to phase"""
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.time() - start)
+
+    def set_timeout(self, seconds, override=False):
+        """Set the deadline of the request, unless it was set already"""
+
+        if seconds and (override or self.deadline is None):
+            self.deadline = self.started_at + seconds
+
+    def expired(self):
+        """Return by how many seconds the deadline has passed, None if it has not"""
+
+        if self.deadline is None:
+            return None
+        late = time.time() - self.deadline
+        return late if late > 0 else None
+
+    def fork(self):
+        """Return copy of the context without the phases, to be sent to another process"""
+
+        child = RequestContext(self.name)
+        child.started_at = self.started_at
+        child.profile    = self.profile
+        child.memory     = self.memory
+        child.deadline   = self.deadline
+        return child
+
+    def server_timing(self):
+        """Format the phases as value of Server-Timing HTTP header"""
+
+        with self.lock:
+            return ", ".join([ "%s;dur=%.3f" % (name, seconds * 1000.0)
+                                for name, seconds in self.phases.items() ])
+
+# current context ------------------------------------------------------
+
+def current():
+    """Return the context of the request executed by the current thread"""
+
+    return getattr(_local, "context", None)
+
+@contextmanager
+def activate(context):
+    """Context manager that makes context current in its block"""
+
+    previous = getattr(_local, "context", None)
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+@contextmanager
+def phase(name):
+    """Context manager that accounts the time spent in its block to the current context"""
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        context = current()
+        if context is not None:
+            context.add_phase(name, time.time() - start)
+
+# executor proxy -------------------------------------------------------
+
+def parse_timeouts(spec):
+    """Parse timeouts of operations given as "method=seconds,method=seconds" """
+
+    timeouts = {}
+    for item in (spec or "").split(","):
+        if len(item.strip()) == 0:
+            continue
+        (method, seconds) = item.split("=", 1)
+        timeouts[method.strip()] = float(seconds)
+
+    return timeouts
+
+class ContextBoundExecutor():
+    """Executor proxy that makes the request context current for every call
+
+    Implementation of Decorator design pattern. Executors that hand the
+    command to a pool of workers capture the current context when the
+    command is submitted. Requests without deadline set by the client
+    get the default timeout of the called operation, "*" for all others.
+    """
+
+    def __init__(self, executor, context, timeouts=None):
+        self.executor = executor
+        self.context  = context
+        self.timeouts = timeouts or {}
+
+    def __getattr__(self, name):
+        method = getattr(self.executor, name)
+
+        def call(*args, **kwargs):
+            self.context.set_timeout(self.timeouts.get(name, self.timeouts.get("*")))
+            with activate(self.context):
+                return method(*args, **kwargs)
+
+        return call
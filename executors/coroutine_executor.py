@@ -6,6 +6,8 @@ import logging
 
 from tornado.concurrent import return_future
 
+from apache.aurora.rest.executors import context, pool
+
 logger = logging.getLogger("tornado.access")
 
 # coroutine executor --------------------------------------------------
@@ -33,46 +35,65 @@ class CoroutineAuroraExecutor():
 
         self.executor = executor
 
+    def run(self, method_name, *args, **kwargs):
+        """Execute delegate's method, instrumented on behalf of the current request"""
+
+        request_context = context.current()
+        pool.prepare(request_context)
+
+        return pool.run_in_server_process(method_name, self.executor, args, kwargs, request_context)
+
     @return_future
     def list_jobs(self, cluster, role, callback=None):
         logger.info("entered CoroutineAuroraExecutor::list_jobs")
 
-        result = self.executor.list_jobs(cluster, role)
+        result = self.run("list_jobs", cluster, role)
+        callback(result)
+
+    @return_future
+    def list_all_jobs(self, cluster, callback=None):
+        logger.info("entered CoroutineAuroraExecutor::list_all_jobs")
+
+        result = self.run("list_all_jobs", cluster)
         callback(result)
 
     @return_future
     def create_job(self, cluster, role, environment, jobname, jobspec, callback=None):
         logger.info("entered CoroutineAuroraExecutor::create_job")
 
-        result = self.executor.create_job(cluster, role, environment, jobname, jobspec)
+        result = self.run("create_job", cluster, role, environment, jobname, jobspec)
         callback(result)
 
     @return_future
-    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[], callback=None):
+    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[],
+                   updater_settings=None, callback=None):
         logger.info("entered CoroutineAuroraExecutor::update_job")
 
-        result = self.executor.update_job(cluster, role, environment, jobname, jobspec, instances)
+        result = self.run("update_job", cluster, role, environment, jobname, jobspec, instances,
+                          updater_settings)
         callback(result)
 
     @return_future
     def cancel_update_job(self, cluster, role, environment, jobname, jobspec=None, callback=None):
         logger.info("entered CoroutineAuroraExecutor::cancel_update_job")
 
-        result = self.executor.cancel_update_job(cluster, role, environment, jobname, jobspec)
+        result = self.run("cancel_update_job", cluster, role, environment, jobname, jobspec)
         callback(result)
 
     @return_future
-    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[], callback=None):
+    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[],
+                    updater_settings=None, callback=None):
         logger.info("entered CoroutineAuroraExecutor::restart_job")
 
-        result = self.executor.restart_job(cluster, role, environment, jobname, jobspec, instances)
+        result = self.run("restart_job", cluster, role, environment, jobname, jobspec, instances,
+                          updater_settings)
         callback(result)
 
     @return_future
     def delete_job(self, cluster, role, environment, jobname, jobspec=None, instances=[], callback=None):
         logger.info("entered CoroutineAuroraExecutor::delete_job")
 
-        result = self.executor.delete_job(cluster, role, environment, jobname, jobspec, instances)
+        result = self.run("delete_job", cluster, role, environment, jobname, jobspec, instances)
         callback(result)
 
 # factory --------------------------------------------------------------
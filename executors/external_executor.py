@@ -8,8 +8,16 @@ import subprocess
 
 from apache.aurora.common.aurora_job_key import AuroraJobKey
 
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.executors import context, updater
+
 logger = logging.getLogger("tornado.application")
 
+SCHEDULER_CALL_SECONDS = metrics.histogram(
+    "aurora_rest_scheduler_call_seconds",
+    "Latency of calls to the Aurora scheduler",
+    ["cluster", "call"])
+
 DEFAULT_AURORA_CMD      = "/home/mkrastev/projects/Mesos/incubator-aurora.git/dist/aurora_client.pex"
 AURORA_SUCCESS_RESPONSE = r"Response from scheduler: OK"
 
@@ -41,15 +49,15 @@ class AuroraExternalCommandExecutor():
             logger.info("job spec not provided")
             return(None)
 
-        logger.info("job spec:")
-        lineno = 1
-        for l in jobspec.splitlines():
-            logger.info("  %3d: %s" % (lineno, l))
-            lineno += 1
+        logger.info("job spec: %d bytes", len(jobspec))
+        if logger.isEnabledFor(logging.DEBUG):
+            for lineno, l in enumerate(jobspec.splitlines(), start=1):
+                logger.debug("  %3d: %s", lineno, l)
 
-        file = tempfile.NamedTemporaryFile(suffix=".aurora")
-        file.write(jobspec)
-        file.flush()
+        with context.phase("config"):
+            file = tempfile.NamedTemporaryFile(suffix=".aurora")
+            file.write(jobspec)
+            file.flush()
 
         return(file)
 
@@ -61,7 +69,7 @@ class AuroraExternalCommandExecutor():
             return(None)
         else:
             packed_list = ",".join(instances)
-            logger.info("list of shards: [%s]" % packed_list)
+            logger.debug("list of shards: [%s]", packed_list)
             return(packed_list)
 
     def is_aurora_command_successful(self, cmd_output):
@@ -74,7 +82,7 @@ class AuroraExternalCommandExecutor():
 
         cmd_success_status = False
         for s in cmd_output.splitlines():
-            logger.info("  > %s" % s)
+            logger.debug("  > %s", s)
             if AURORA_SUCCESS_RESPONSE in s:
                 cmd_success_status = True
 
@@ -88,15 +96,16 @@ class AuroraExternalCommandExecutor():
 
         try:
             with open("/dev/null") as dev_null:
-                cmd_output = subprocess.check_output(
+                with SCHEDULER_CALL_SECONDS.time((cluster, "list_jobs")), context.phase("scheduler"):
+                    cmd_output = subprocess.check_output(
                                 [ self.aurora_cmd, "list_jobs", jobkey ],
                                 stderr=dev_null)
 
                 jobs = cmd_output.splitlines()
-                if len(jobs) == 0:
-                    logger.info("no jobs found for key = %s" % jobkey)
-                for s in jobs:
-                    logger.info("> %s" % s )
+                logger.info("%d jobs found for key = %s", len(jobs), jobkey)
+                if logger.isEnabledFor(logging.DEBUG):
+                    for s in jobs:
+                        logger.debug("> %s", s)
 
                 return(jobkey, jobs, None)
 
@@ -104,6 +113,13 @@ class AuroraExternalCommandExecutor():
             logger.exception("Failed to list Aurora jobs")
             return(jobkey, [], ["Exception when listing aurora jobs"] + [e.msg])
 
+    def list_all_jobs(self, cluster):
+        """Listing of all jobs, not supported by the Aurora command-line client"""
+
+        logger.warning("aurora client can not list the jobs of all roles in cluster %s", cluster)
+        return(cluster, [], ["Failed to list Aurora jobs",
+                             "Listing of all jobs of cluster is not supported by the external executor"])
+
     def create_job(self, cluster, role, environment, jobname, jobspec):
         """Method to create aurora job"""
 
@@ -121,8 +137,9 @@ class AuroraExternalCommandExecutor():
                                            "Job configuration is missing (not provided)!"])
 
             cmd_args = [job_key.to_path(),jobspec_file.name]
-            cmd_output = subprocess.check_output(
-                [self.aurora_cmd, "create"] + cmd_args, stderr=subprocess.STDOUT)
+            with SCHEDULER_CALL_SECONDS.time((cluster, "create")), context.phase("scheduler"):
+                cmd_output = subprocess.check_output(
+                    [self.aurora_cmd, "create"] + cmd_args, stderr=subprocess.STDOUT)
 
         except subprocess.CalledProcessError as e:
             logger.warning("aurora client exit status: %d, details follow" % e.returncode)
@@ -143,7 +160,8 @@ class AuroraExternalCommandExecutor():
             logger.warning("aurora -- create job failed")
             return(job_key.to_path(), ["Error reported by aurora client:"] + cmd_output.splitlines())
 
-    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[]):
+    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[],
+                   updater_settings=None):
         """Method to update aurora job"""
 
         job_key = AuroraJobKey(cluster, role, environment, jobname)
@@ -163,9 +181,11 @@ class AuroraExternalCommandExecutor():
             cmd_args = [job_key.to_path(), jobspec_file.name]
             if instances is not None:
                 cmd_args = ["--shards=" + instances] + cmd_args
+            cmd_args = updater.command_flags(updater_settings, updater.UPDATE_SETTINGS) + cmd_args
 
-            cmd_output = subprocess.check_output(
-                [self.aurora_cmd, "update"] + cmd_args, stderr=subprocess.STDOUT)
+            with SCHEDULER_CALL_SECONDS.time((cluster, "update")), context.phase("scheduler"):
+                cmd_output = subprocess.check_output(
+                    [self.aurora_cmd, "update"] + cmd_args, stderr=subprocess.STDOUT)
 
         except subprocess.CalledProcessError as e:
             logger.warning("aurora client exit status: %d, details follow" % e.returncode)
@@ -200,8 +220,9 @@ class AuroraExternalCommandExecutor():
             if jobspec_file is not None:
                 cmd_args.append(jobspec_file.name)
 
-            cmd_output = subprocess.check_output(
-                [self.aurora_cmd, "cancel_update"] + cmd_args, stderr=subprocess.STDOUT)
+            with SCHEDULER_CALL_SECONDS.time((cluster, "cancel_update")), context.phase("scheduler"):
+                cmd_output = subprocess.check_output(
+                    [self.aurora_cmd, "cancel_update"] + cmd_args, stderr=subprocess.STDOUT)
 
         except subprocess.CalledProcessError as e:
             logger.warning("aurora client exit status: %d, details follow" % e.returncode)
@@ -243,8 +264,9 @@ class AuroraExternalCommandExecutor():
             else:
                 cmd = "killall"
 
-            cmd_output = subprocess.check_output(
-                [self.aurora_cmd, cmd] + cmd_args, stderr=subprocess.STDOUT)
+            with SCHEDULER_CALL_SECONDS.time((cluster, cmd)), context.phase("scheduler"):
+                cmd_output = subprocess.check_output(
+                    [self.aurora_cmd, cmd] + cmd_args, stderr=subprocess.STDOUT)
 
         except subprocess.CalledProcessError as e:
             logger.warning("aurora client exit status: %d, details follow" % e.returncode)
@@ -264,7 +286,8 @@ class AuroraExternalCommandExecutor():
             logger.warning("aurora -- delete job failed")
             return(job_key.to_path(), [], ["Error reported by aurora client"] + cmd_output.splitlines())
 
-    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[]):
+    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[],
+                    updater_settings=None):
         """Method to restart aurora job"""
 
         job_key = AuroraJobKey(cluster, role, environment, jobname)
@@ -281,9 +304,11 @@ class AuroraExternalCommandExecutor():
                 cmd_args.append(jobspec_file.name)
             if instances is not None:
                 cmd_args = ["--shards=" + instances] + cmd_args
+            cmd_args = updater.command_flags(updater_settings, updater.RESTART_SETTINGS) + cmd_args
 
-            cmd_output = subprocess.check_output(
-                [self.aurora_cmd, "restart"] + cmd_args, stderr=subprocess.STDOUT)
+            with SCHEDULER_CALL_SECONDS.time((cluster, "restart")), context.phase("scheduler"):
+                cmd_output = subprocess.check_output(
+                    [self.aurora_cmd, "restart"] + cmd_args, stderr=subprocess.STDOUT)
 
         except subprocess.CalledProcessError as e:
             logger.warning("aurora client exit status: %d, details follow" % e.returncode)
@@ -305,7 +330,7 @@ class AuroraExternalCommandExecutor():
 
 # factory --------------------------------------------------------------
 
-def create(aurora_cmd=DEFAULT_AURORA_CMD):
+def create(aurora_cmd=None):
     """Factory function for executor objects that spanw Aurora command-line client"""
 
-    return AuroraExternalCommandExecutor(aurora_cmd)
+    return AuroraExternalCommandExecutor(aurora_cmd or DEFAULT_AURORA_CMD)
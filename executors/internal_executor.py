@@ -2,8 +2,12 @@
 #                      Aurora Internal API Executor
 # ----------------------------------------------------------------------
 
+import hashlib
 import tempfile
 import logging
+import threading
+
+from collections import OrderedDict
 
 from apache.aurora.common.aurora_job_key import AuroraJobKey
 from apache.aurora.client.commands.core import get_job_config
@@ -11,9 +15,51 @@ from apache.aurora.client.commands.core import get_job_config
 from apache.aurora.client.factory import make_client
 from gen.apache.aurora.api.ttypes import ResponseCode
 from apache.aurora.client.api.updater_util import UpdaterConfig
+from thrift.transport.TTransport import TTransportException
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.executors import context, retry, updater
 
 logger = logging.getLogger("tornado.application")
 
+SCHEDULER_CALL_SECONDS = metrics.histogram(
+    "aurora_rest_scheduler_call_seconds",
+    "Latency of calls to the Aurora scheduler",
+    ["cluster", "call"])
+
+# errors of the scheduler that may not happen again when the call is repeated
+TRANSIENT_RESPONSE_CODES = frozenset([ getattr(ResponseCode, name)
+                                        for name in ("ERROR", "ERROR_TRANSIENT")
+                                            if hasattr(ResponseCode, name) ])
+
+TRANSIENT_EXCEPTIONS = retry.TRANSIENT_EXCEPTIONS + (TTransportException,)
+
+CONFIG_CACHE = metrics.counter(
+    "aurora_rest_config_cache_total",
+    "Number of job configurations needed by commands by result: hit when evaluated before, or miss",
+    ["result"])
+
+# Evaluated job configurations, by digest of the configuration and key of
+# the job. Kept apart from the executor, because with process pools the
+# executor is copied to the worker with every command. The configuration
+# objects are only read by the Aurora client API.
+
+_configs = OrderedDict()
+_configs_lock = threading.Lock()
+
+def cached_config(key):
+    with _configs_lock:
+        config = _configs.pop(key, None)
+        if config is not None:
+            _configs[key] = config
+        return config
+
+def cache_config(key, config, size):
+    with _configs_lock:
+        _configs[key] = config
+        while len(_configs) > size:
+            _configs.popitem(last=False)
+
 # basic handlers -------------------------------------------------------
 
 # TODO: Is this still needed, and where?
@@ -33,26 +79,64 @@ class AuroraInternalApiExecutor():
     of service.
     """
 
-    def __init__(self):
+    def __init__(self, retry_policy=None, config_cache=0):
         logger.info("aurora -- internal executor created")
 
+        self.retry_policy = retry_policy or retry.create(retries=0)
+        self.config_cache = config_cache
+
     def make_job_key(self, cluster, role):
         return cluster + "/" + role
 
+    def make_client(self, cluster):
+        """Create Aurora client API object for the cluster"""
+
+        with context.phase("client"):
+            return make_client(cluster)
+
+    def call_scheduler(self, cluster, call, rpc):
+        """Call the scheduler with _rpc(api)_, transient errors of idempotent calls are retried"""
+
+        def attempt():
+            api = self.make_client(cluster)
+            with SCHEDULER_CALL_SECONDS.time((cluster, call)), context.phase("scheduler"):
+                return rpc(api)
+
+        return self.retry_policy.call(cluster, call, attempt,
+                                      lambda resp: resp.responseCode in TRANSIENT_RESPONSE_CODES)
+
     def make_job_config(self, job_key, jobspec):
-        """Write jobspec string to file"""
+        """Return job configuration object of jobspec string, evaluated before or now"""
 
         if jobspec is None or len(jobspec) == 0:
             logger.info("job spec not provided")
             return(None)
 
-        logger.info("job spec:")
-        lineno = 1
-        for l in jobspec.splitlines():
-            logger.info("  %3d: %s" % (lineno, l))
-            lineno += 1
+        logger.info("job spec: %d bytes", len(jobspec))
+        if logger.isEnabledFor(logging.DEBUG):
+            for lineno, l in enumerate(jobspec.splitlines(), start=1):
+                logger.debug("  %3d: %s", lineno, l)
+
+        if self.config_cache <= 0:
+            return self.parse_job_config(job_key, jobspec)
 
-        with tempfile.NamedTemporaryFile(suffix=".aurora") as config_file:
+        key = (hashlib.sha256(jobspec).hexdigest(), job_key.to_path())
+        config = cached_config(key)
+        if config is not None:
+            logger.info("job spec evaluated before, %s", key[0])
+            CONFIG_CACHE.inc(("hit",))
+            return config
+
+        CONFIG_CACHE.inc(("miss",))
+        config = self.parse_job_config(job_key, jobspec)
+        cache_config(key, config, self.config_cache)
+        return config
+
+    def parse_job_config(self, job_key, jobspec):
+        """Write jobspec string to file and evaluate it"""
+
+        with context.phase("config"), \
+             tempfile.NamedTemporaryFile(suffix=".aurora") as config_file:
             config_file.write(jobspec)
             config_file.flush()
             try:
@@ -85,7 +169,7 @@ class AuroraInternalApiExecutor():
             [[ packed_list.extend(list_from_single_or_range(x))
                                         for x in instance.split(",")]
                                             for instance in instances ]
-            logger.info("list of shards: %s" % packed_list)
+            logger.debug("list of shards: %s", packed_list)
             return(packed_list)
 
     def response_string(self, resp):
@@ -93,31 +177,48 @@ class AuroraInternalApiExecutor():
             % (ResponseCode._VALUES_TO_NAMES[resp.responseCode], resp.messageDEPRECATED))
                                                     # yes, this is the actual attribute name
 
+    def job_string(self, cluster, job):
+        return '{0}/{1.key.role}/{1.key.environment}/{1.key.name}'.format(cluster, job)
+
     def list_jobs(self, cluster, role):
         """Method to execute [ aurora list_jobs cluster/role command ]"""
 
-        def job_string(cluster, job):
-            return '{0}/{1.key.role}/{1.key.environment}/{1.key.name}'.format(cluster, job)
-
         jobkey = self.make_job_key(cluster, role)
         logger.info("request to list jobs = %s" % jobkey)
 
-        api = make_client(cluster)
-        resp = api.get_jobs(role)
+        resp = self.call_scheduler(cluster, "get_jobs", lambda api: api.get_jobs(role))
         if resp.responseCode != ResponseCode.OK:
             logger.warning("Failed to list Aurora jobs")
             responseStr = self.response_string(resp)
             logger.warning(responseStr)
             return(jobkey, [], ["Failed to list Aurora jobs", responseStr])
 
-        jobs = [ job_string(cluster, job) for job in resp.result.getJobsResult.configs ]
-        if len(jobs) == 0:
-            logger.info("no jobs found for key = %s" % jobkey)
-        for s in jobs:
-            logger.info("> %s" % s )
+        jobs = [ self.job_string(cluster, job) for job in resp.result.getJobsResult.configs ]
+        logger.info("%d jobs found for key = %s", len(jobs), jobkey)
+        if logger.isEnabledFor(logging.DEBUG):
+            for s in jobs:
+                logger.debug("> %s", s)
 
         return(jobkey, jobs, None)
 
+    def list_all_jobs(self, cluster):
+        """Method to list the jobs of all roles in the cluster"""
+
+        logger.info("request to list all jobs of cluster = %s", cluster)
+
+        # without role the scheduler returns the jobs of all roles
+        resp = self.call_scheduler(cluster, "get_jobs", lambda api: api.get_jobs(None))
+        if resp.responseCode != ResponseCode.OK:
+            logger.warning("Failed to list Aurora jobs")
+            responseStr = self.response_string(resp)
+            logger.warning(responseStr)
+            return(cluster, [], ["Failed to list Aurora jobs", responseStr])
+
+        jobs = [ self.job_string(cluster, job) for job in resp.result.getJobsResult.configs ]
+        logger.info("%d jobs found in cluster = %s", len(jobs), cluster)
+
+        return(cluster, jobs, None)
+
     def create_job(self, cluster, role, environment, jobname, jobspec):
         """Method to create aurora job"""
 
@@ -130,8 +231,7 @@ class AuroraInternalApiExecutor():
             return(job_key.to_path(), ["Failed to create Aurora job",
                                        "Can not create job configuration object because", str(e)])
 
-        api = make_client(job_key.cluster)
-        resp = api.create_job(config)
+        resp = self.call_scheduler(job_key.cluster, "create_job", lambda api: api.create_job(config))
         if resp.responseCode != ResponseCode.OK:
             logger.warning("aurora -- create job failed")
             responseStr = self.response_string(resp)
@@ -141,7 +241,8 @@ class AuroraInternalApiExecutor():
         logger.info("aurora -- create job successful")
         return(job_key.to_path(), None)
 
-    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[]):
+    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[],
+                   updater_settings=None):
         """Method to update aurora job"""
 
         job_key = AuroraJobKey(cluster, role, environment, jobname)
@@ -154,8 +255,11 @@ class AuroraInternalApiExecutor():
             return(job_key.to_path(), ["Failed to update Aurora job",
                                        "Can not create job configuration object because", str(e)])
 
-        api = make_client(cluster)
-        resp = api.update_job(config, instances=instances)
+        settings = updater.with_defaults(updater_settings)
+        resp = self.call_scheduler(cluster, "update_job",
+                                   lambda api: api.update_job(config,
+                                        health_check_interval_seconds=settings["health_check_interval"],
+                                        instances=instances))
         if resp.responseCode != ResponseCode.OK:
             logger.warning("aurora -- update job failed")
             responseStr = self.response_string(resp)
@@ -177,8 +281,8 @@ class AuroraInternalApiExecutor():
             return(job_key.to_path(), ["Failed to cancel update of Aurora job",
                                        "Can not create job configuration object because", str(e)])
 
-        api = make_client(cluster)
-        resp = api.cancel_update(job_key, config=config)
+        resp = self.call_scheduler(cluster, "cancel_update",
+                                   lambda api: api.cancel_update(job_key, config=config))
         if resp.responseCode != ResponseCode.OK:
             logger.warning("aurora -- cancel the update of job failed")
             responseStr = self.response_string(resp)
@@ -188,7 +292,8 @@ class AuroraInternalApiExecutor():
         logger.info("aurora -- cancel of update job successful")
         return(job_key.to_path(), None)
 
-    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[]):
+    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[],
+                    updater_settings=None):
         """Method to restart aurora job"""
 
         job_key = AuroraJobKey(cluster, role, environment, jobname)
@@ -201,18 +306,21 @@ class AuroraInternalApiExecutor():
             return(job_key.to_path(), ["Failed to restart Aurora job",
                                        "Can not create job configuration object because", str(e)])
 
-        # these are the default values from apache.aurora.client.commands.core.restart()
+        # the defaults are the values from apache.aurora.client.commands.core.restart()
+        settings = updater.with_defaults(updater_settings)
         updater_config = UpdaterConfig(
-            1,          # options.batch_size
-            60,         # options.restart_threshold
-            30,         # options.watch_secs
-            0,          # options.max_per_shard_failures
-            0           # options.max_total_failures
+            settings["batch_size"],
+            settings["restart_threshold"],
+            settings["watch_secs"],
+            settings["max_per_shard_failures"],
+            settings["max_total_failures"]
         )
+        logger.info("updater settings: %s", settings)
 
-        api = make_client(job_key.cluster)
-        # instances = all shards, health check = 3 sec
-        resp = api.restart(job_key, instances, updater_config, 3, config=config)
+        # instances = None for all shards
+        resp = self.call_scheduler(job_key.cluster, "restart",
+                                   lambda api: api.restart(job_key, instances, updater_config,
+                                                           settings["health_check_interval"], config=config))
         if resp.responseCode != ResponseCode.OK:
             logger.warning("aurora -- restart job failed")
             responseStr = self.response_string(resp)
@@ -235,8 +343,8 @@ class AuroraInternalApiExecutor():
             return(job_key.to_path(), ["Failed to delete Aurora job",
                                        "Can not create job configuration object because", str(e)])
 
-        api = make_client(job_key.cluster)
-        resp = api.kill_job(job_key, config=config, instances=instances)
+        resp = self.call_scheduler(job_key.cluster, "kill_job",
+                                   lambda api: api.kill_job(job_key, config=config, instances=instances))
         if resp.responseCode != ResponseCode.OK:
             logger.warning("aurora -- kill job failed")
             responseStr = self.response_string(resp)
@@ -248,7 +356,12 @@ class AuroraInternalApiExecutor():
 
 # factory --------------------------------------------------------------
 
-def create():
-    """Factory function for executor objects that call directly Aurora client API"""
+def create(retries=2, retry_backoff_ms=100, retry_budget=0.1, config_cache=64):
+    """Factory function for executor objects that call directly Aurora client API
+
+    _config_cache_ is the number of evaluated job configurations kept for
+    reuse by later commands, 0 evaluates every configuration again.
+    """
 
-    return AuroraInternalApiExecutor()
+    retry_policy = retry.create(retries, retry_backoff_ms, retry_budget, TRANSIENT_EXCEPTIONS)
+    return AuroraInternalApiExecutor(retry_policy, config_cache)
@@ -0,0 +1,156 @@
+# ----------------------------------------------------------------------
+#
+#                  Serialization of Mutations per Job
+#
+# Two changes of the same job executed at the same time (e.g. update and
+# restart) race at the scheduler, and the Aurora client may not be safe
+# to use for one job from many threads. Mutations of a job are therefore
+# executed one at a time, in the order they arrived, while mutations of
+# different jobs and all listings run in parallel as before.
+#
+# A mutation that waits for its job and is the same as one that already
+# waits (same command with the same arguments, e.g. two restarts of the
+# job) is not queued again, it gets the outcome of the waiting one.
+# Waiting mutations count against the queue limit of the mutations of
+# the pool, so a burst of different changes of one job is rejected like
+# any other burst of changes.
+#
+# ----------------------------------------------------------------------
+
+import logging
+import threading
+
+from collections import deque
+
+from concurrent.futures import Future
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.executors.pool import READ_METHODS
+from apache.aurora.rest.executors.limiter import chain
+
+logger = logging.getLogger("tornado.application")
+
+JOB_WAITING = metrics.gauge(
+    "aurora_rest_job_mutations_waiting",
+    "Number of job mutations waiting for other mutation of the same job",
+    ["pool"])
+
+COALESCED = metrics.counter(
+    "aurora_rest_job_mutations_coalesced_total",
+    "Number of job mutations answered with the outcome of identical waiting mutation",
+    ["pool", "method"])
+
+def job_key(args):
+    """Key of the job from the arguments of mutation: cluster, role, environment and name"""
+
+    return "/".join(args[:4])
+
+# job queue ------------------------------------------------------------
+
+class JobQueue():
+    """Mutations of one job that wait for the running one"""
+
+    def __init__(self, key):
+        self.key     = key
+        self.running = None
+        self.waiting = deque()
+
+# job locks ------------------------------------------------------------
+
+class JobLocks():
+    """Executes the mutations of every job one at a time"""
+
+    def __init__(self, pool, coalesce=True, admission=None):
+        self.pool      = pool
+        self.coalesce  = coalesce
+        self.admission = admission
+        self.jobs      = {}
+        self.lock      = threading.Lock()
+
+        JOB_WAITING.set_function(self.waiting, (pool,))
+
+    def waiting(self):
+        with self.lock:
+            return sum(len(queue.waiting) for queue in self.jobs.values())
+
+    def submit(self, method_name, args, kwargs, start):
+        """Start the command now, or after the mutations of its job that came before it
+
+        _start_ hands the command over for execution and returns future of
+        its outcome. Errors raised by _start_ of command that is started
+        right away are raised to the caller, as well as ExecutorOverloaded
+        of command that would wait when the queue of mutations is full.
+        """
+
+        if method_name in READ_METHODS:
+            return start()
+
+        key = job_key(args)
+        signature = (method_name, args, sorted(kwargs.items()))
+        with self.lock:
+            queue = self.jobs.get(key)
+            if queue is None:
+                queue = JobQueue(key)
+                self.jobs[key] = queue
+
+            if queue.running is not None:
+                if self.coalesce:
+                    for (waiting, _, future) in queue.waiting:
+                        if waiting == signature:
+                            logger.info("%s of job %s coalesced with identical waiting request",
+                                        method_name, key)
+                            COALESCED.inc((self.pool, method_name))
+                            return future
+
+                if self.admission is not None:
+                    self.admission.admit(method_name)
+
+                logger.info("%s of job %s waits for %s", method_name, key, queue.running)
+                future = Future()
+                queue.waiting.append((signature, start, future))
+                return future
+
+            queue.running = method_name
+
+        return self.start(queue, start)
+
+    def start(self, queue, start, future=None):
+        try:
+            inner = start()
+        except Exception as e:
+            self.release(queue)
+            if future is None:
+                raise
+            future.set_exception(e)
+            return future
+
+        def done(inner):
+            if future is not None:
+                chain(inner, future)
+            self.release(queue)
+
+        inner.add_done_callback(done)
+        return future or inner
+
+    def release(self, queue):
+        """Start the next mutation of the job, or forget the job if there is none"""
+
+        with self.lock:
+            if len(queue.waiting) == 0:
+                queue.running = None
+                del self.jobs[queue.key]
+                return
+            (signature, start, future) = queue.waiting.popleft()
+            queue.running = signature[0]
+
+        # admitted again by _start_ when it is handed to the pool
+        if self.admission is not None:
+            self.admission.release(signature[0])
+        self.start(queue, start, future)
+
+# factory --------------------------------------------------------------
+
+def create(pool, coalesce=True, admission=None):
+    """Factory function for per-job serialization of mutations in front of pool"""
+
+    return JobLocks(pool, coalesce, admission)
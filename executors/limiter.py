@@ -0,0 +1,271 @@
+# ----------------------------------------------------------------------
+#
+#                  Adaptive Concurrency Limit per Cluster
+#
+# The number of Aurora commands executed at the same time against one
+# cluster is limited, and the limit follows the health of the scheduler
+# of the cluster (AIMD with latency gradient):
+#
+#   - every command that completes in time raises the limit by 1/limit,
+#     that is about one more command per round-trip
+#   - failed commands, raising exception or answered by the scheduler
+#     with ERROR, or latency growing above _tolerance_ times the baseline
+#     latency of the cluster, cut the limit by the _backoff_ factor, at
+#     most once per round-trip
+#
+# Commands over the limit wait in a queue of the cluster and are handed
+# to the pool when other commands of the same cluster complete, so one
+# slow scheduler does not take all the workers of the pool.
+#
+# ----------------------------------------------------------------------
+
+import re
+import time
+import logging
+import threading
+
+from collections import deque
+
+import tornado.web
+from concurrent.futures import Future
+
+from apache.aurora.rest.monitor import metrics
+
+logger = logging.getLogger("tornado.application")
+
+CLUSTER_LIMIT = metrics.gauge(
+    "aurora_rest_cluster_concurrency_limit",
+    "Current limit of Aurora commands executed at the same time per cluster",
+    ["cluster"])
+
+CLUSTER_IN_FLIGHT = metrics.gauge(
+    "aurora_rest_cluster_in_flight",
+    "Number of Aurora commands being executed per cluster",
+    ["cluster"])
+
+CLUSTER_PENDING = metrics.gauge(
+    "aurora_rest_cluster_pending",
+    "Number of Aurora commands waiting for the concurrency limit of the cluster",
+    ["cluster"])
+
+# smoothing of the observed latency
+LATENCY_ALPHA = 0.2
+
+# speed at which the baseline latency follows lasting increase of latency
+BASELINE_DRIFT = 0.01
+
+# helpers --------------------------------------------------------------
+
+def chain(source, target):
+    """Copy outcome of future _source_ to future _target_"""
+
+    exception = source.exception()
+    if exception is not None:
+        target.set_exception(exception)
+    else:
+        target.set_result(source.result())
+
+def scheduler_time(request_context, elapsed):
+    """Time spent calling the scheduler, falls back to the time of the whole command"""
+
+    if request_context is not None:
+        seconds = request_context.phases.get("scheduler")
+        if seconds:
+            return seconds
+    return elapsed
+
+# response codes of the scheduler that tell it is in trouble, not that the request was wrong
+SCHEDULER_FAILURES = frozenset([ "ERROR", "ERROR_TRANSIENT" ])
+
+SCHEDULER_RESPONSE = re.compile(r"Response from scheduler: (\w+)")
+
+def scheduler_failed(result):
+    """Test if the result of command, (jobkey, ..., errors), reports failure of the scheduler
+
+    Errors of the request itself, like INVALID_REQUEST of job that does
+    not exist or invalid job configuration, say nothing about the health
+    of the scheduler.
+    """
+
+    if not isinstance(result, tuple) or len(result) == 0 or result[-1] is None:
+        return False
+    for error in result[-1]:
+        match = SCHEDULER_RESPONSE.search(str(error))
+        if match is not None and match.group(1) in SCHEDULER_FAILURES:
+            return True
+    return False
+
+# cluster limit --------------------------------------------------------
+
+class ClusterLimit():
+    """Concurrency limit, commands in flight and commands waiting for one cluster"""
+
+    def __init__(self, cluster, initial):
+        self.cluster       = cluster
+        self.limit         = float(initial)
+        self.in_flight     = 0
+        self.pending       = deque()
+        self.latency       = None
+        self.baseline      = None
+        self.last_decrease = 0.0
+        self.completed     = 0
+        self.errors        = 0
+
+        CLUSTER_LIMIT.set_function(lambda: int(self.limit), (cluster,))
+        CLUSTER_IN_FLIGHT.set_function(lambda: self.in_flight, (cluster,))
+        CLUSTER_PENDING.set_function(lambda: len(self.pending), (cluster,))
+
+    def describe(self):
+        return {
+            "limit":        int(self.limit),
+            "in_flight":    self.in_flight,
+            "pending":      len(self.pending),
+            "latency_ms":   round(self.latency * 1000.0, 3) if self.latency is not None else None,
+            "baseline_ms":  round(self.baseline * 1000.0, 3) if self.baseline is not None else None,
+            "completed":    self.completed,
+            "errors":       self.errors
+        }
+
+# limiter --------------------------------------------------------------
+
+class AdaptiveLimiter():
+    """Per-cluster concurrency limits in front of a pool of workers
+
+    With _adaptive_ False the limit of every cluster stays at _maximum_,
+    and maximum 0 turns the limiter off.
+    """
+
+    def __init__(self, pool, initial, minimum=1, maximum=0, tolerance=2.0, backoff=0.5,
+                 adaptive=True):
+        self.pool      = pool
+        self.maximum   = maximum
+        self.minimum   = max(1, minimum)
+        self.initial   = max(self.minimum, min(initial, maximum) if maximum > 0 else initial)
+        self.tolerance = tolerance
+        self.backoff   = backoff
+        self.adaptive  = adaptive and maximum > 0
+        self.clusters  = {}
+        self.lock      = threading.Lock()
+
+        logger.info("AdaptiveLimiter(pool=%s, initial=%d, max=%d, adaptive=%s) created",
+                    pool, self.initial, maximum, self.adaptive)
+
+    def get_cluster(self, cluster):
+        """Return the limit of the cluster, call with the lock held"""
+
+        state = self.clusters.get(cluster)
+        if state is None:
+            state = ClusterLimit(cluster, self.initial if self.adaptive else self.maximum)
+            self.clusters[cluster] = state
+        return state
+
+    def submit(self, cluster, start, request_context=None):
+        """Start the command now, or when the cluster is under its limit
+
+        _start_ hands the command to the pool and returns future of its
+        outcome. The returned future completes with the same outcome.
+        """
+
+        if self.maximum <= 0:
+            return start()
+
+        future = Future()
+        with self.lock:
+            state = self.get_cluster(cluster)
+            if state.in_flight < int(state.limit):
+                state.in_flight += 1
+            else:
+                state.pending.append((start, future, request_context))
+                return future
+
+        self.start(state, start, future, request_context)
+        return future
+
+    def start(self, state, start, future, request_context):
+        started_at = time.time()
+        try:
+            inner = start()
+        except Exception as e:
+            self.release(state, started_at, request_context, e)
+            future.set_exception(e)
+            return
+
+        def done(inner):
+            self.release(state, started_at, request_context, inner.exception(),
+                         inner.exception() is None and scheduler_failed(inner.result()))
+            chain(inner, future)
+
+        inner.add_done_callback(done)
+
+    def release(self, state, started_at, request_context, exception, errors=False):
+        """Account for completed command and start the commands that fit under the limit
+
+        _errors_ tells that the command completed, but the scheduler
+        answered that it failed.
+        """
+
+        latency = scheduler_time(request_context, time.time() - started_at)
+        ready = []
+        with self.lock:
+            state.in_flight -= 1
+            # commands rejected by the server itself say nothing about the scheduler
+            if not isinstance(exception, tornado.web.HTTPError):
+                self.adapt(state, latency, exception is not None or errors)
+
+            while state.pending and state.in_flight < int(state.limit):
+                state.in_flight += 1
+                ready.append(state.pending.popleft())
+
+        for (start, future, context) in ready:
+            self.start(state, start, future, context)
+
+    def adapt(self, state, latency, failed):
+        """Update the limit from the outcome of command, call with the lock held"""
+
+        state.completed += 1
+        if failed:
+            state.errors += 1
+        else:
+            state.latency = latency if state.latency is None else \
+                (1 - LATENCY_ALPHA) * state.latency + LATENCY_ALPHA * latency
+            state.baseline = latency if state.baseline is None else \
+                min(state.baseline * (1 + BASELINE_DRIFT), latency)
+
+        if not self.adaptive:
+            return
+
+        now = time.time()
+        congested = failed or state.latency > state.baseline * self.tolerance
+        if congested:
+            # decrease at most once per round-trip, commands in flight saw the same conditions
+            if now - state.last_decrease > (state.latency or 0):
+                state.last_decrease = now
+                previous = state.limit
+                state.limit = max(self.minimum, state.limit * self.backoff)
+                if int(state.limit) < int(previous):
+                    logger.warning("concurrency limit of cluster %s cut to %d (%s, latency %.3f s)",
+                                   state.cluster, state.limit, "error" if failed else "latency",
+                                   state.latency or 0)
+        else:
+            state.limit = min(self.maximum, state.limit + 1.0 / state.limit)
+
+    def describe(self):
+        with self.lock:
+            return {
+                "pool":      self.pool,
+                "adaptive":  self.adaptive,
+                "minimum":   self.minimum,
+                "maximum":   self.maximum,
+                "clusters":  dict([ (name, state.describe()) for name, state in self.clusters.items() ])
+            }
+
+# factory --------------------------------------------------------------
+
+def create(pool, max_workers, adaptive=True, initial=None, tolerance=2.0):
+    """Factory function for per-cluster limiter in front of pool with _max_workers_"""
+
+    maximum = max_workers or 0
+    if initial is None:
+        initial = max(1, maximum // 4)
+
+    return AdaptiveLimiter(pool, initial, maximum=maximum, tolerance=tolerance, adaptive=adaptive)
@@ -2,23 +2,27 @@
 #           Aurora Command Executor using ProcessPool
 # ----------------------------------------------------------------------
 
+import time
 import logging
 import multiprocessing
 
 from functools import partial   # , wraps
 
 from tornado.ioloop import IOLoop
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, Future
 
-logger = logging.getLogger("tornado.access")
+from apache.aurora.rest.monitor import metrics, profiler, memory
+from apache.aurora.rest.executors import context, pool, limiter, breaker, joblock, retry
+from apache.aurora.rest.executors.pool import PoolMonitor, AdmissionControl, run_in_worker_process
 
-# thread-pool executor ------------------------------------------------
+logger = logging.getLogger("tornado.access")
 
-def call_by_name(method_name, obj, *args, **kwargs):
-    """Helper function to enable ProcessPoolExecutor to call object's method"""
+WORKER_RSS = metrics.gauge(
+    "aurora_rest_worker_rss_bytes",
+    "Resident memory of the worker processes of the pool",
+    ["pid"])
 
-    method = getattr(obj, method_name)
-    return method(*args, **kwargs)
+# thread-pool executor ------------------------------------------------
 
 class ProcessAuroraExecutor():
     """Aurora Command Executor that spawns multiple processes to execute requests concurrently
@@ -27,23 +31,90 @@ class ProcessAuroraExecutor():
     are used to provide simultaneous execution of Aurora commands.
     """
 
-    def __init__(self, delegate, process_pool, io_loop):
+    def __init__(self, delegate, process_pool, io_loop, admission=None, cluster_limiter=None,
+                 circuit_breaker=None, job_locks=None):
         logger.info("ProcessAuroraExecutor(procs=%s) created" %
             (str(process_pool._max_workers) if process_pool._max_workers else "unlimited"))
 
-        self.delegate = delegate
-        self.executor = process_pool
-        self.io_loop  = io_loop
+        self.delegate  = delegate
+        self.executor  = process_pool
+        self.io_loop   = io_loop
+        self.monitor   = PoolMonitor("process", max_workers=process_pool._max_workers)
+        self.admission = admission or AdmissionControl("process", process_pool._max_workers)
+        self.limiter   = cluster_limiter or limiter.create("process", 0)
+        self.breaker   = circuit_breaker or breaker.create("process", 0)
+        self.job_locks = job_locks or joblock.create("process", admission=self.admission)
 
     def run_on_executor(self, method_name, obj, *args, **kwargs):
         """Helper method to enable ProcessPoolExecutor to call object's method"""
 
         logger.info("ProcessAuroraExecutor delegated method: %s" % method_name)
 
-        return self.executor.submit(call_by_name, method_name, obj, *args, **kwargs)
+        # the first argument of every command is the cluster
+        cluster = args[0]
+        request_context = context.current()
+
+        def start():
+            self.admission.admit(method_name)
+
+            future = Future()
+            submitted_at = time.time()
+            pool.prepare(request_context)
+            worker_context = request_context.fork() if request_context is not None else None
+
+            self.monitor.submitted()
+
+            def start_in_worker():
+                self.executor.submit(run_in_worker_process, method_name, obj, args, kwargs, worker_context
+                            ).add_done_callback(partial(self.on_done, future, method_name,
+                                                        submitted_at, request_context))
+                return future
+
+            return self.limiter.submit(cluster, start_in_worker, request_context)
+
+        return self.job_locks.submit(method_name, args, kwargs,
+                                     lambda: self.breaker.guard(cluster, start))
+
+    def on_done(self, future, method_name, submitted_at, request_context, worker_future):
+        """Unpack the result sent back by the worker process"""
+
+        self.monitor.finished(started=False)
+        self.admission.release(method_name)
+        try:
+            outcome = worker_future.result()
+        except Exception as e:
+            profiler.abandon(request_context)
+            future.set_exception(e)
+            return
+
+        wait = max(0.0, outcome["started_at"] - submitted_at)
+        self.monitor.waited(wait)
+        metrics.REGISTRY.replay(outcome["samples"])
+
+        (pid, rss) = outcome["worker"]
+        memory.TRACKER.update_worker(pid, rss)
+        WORKER_RSS.set(rss, (str(pid),))
+
+        worker_context = outcome["context"]
+        if request_context is not None:
+            request_context.add_phase("queue", wait)
+            if outcome["expired"] is not None:
+                future.set_exception(
+                    pool.deadline_exceeded("process", request_context, outcome["expired"]))
+                return
+            request_context.merge(worker_context.phases)
+            profile_stats = getattr(worker_context, "profile_stats", None)
+            if profile_stats is not None:
+                profiler.record(request_context, profile_stats[1], source=profile_stats[0])
+            memory_growers = getattr(worker_context, "memory_growers", None)
+            if memory_growers is not None:
+                memory.TRACKER.record(request_context.name, memory_growers)
+
+        future.set_result(outcome["result"])
 
     delegated_methods = [
         "list_jobs",
+        "list_all_jobs",
         "create_job",
         "update_job",
         "cancel_update_job",
@@ -60,13 +131,31 @@ class ProcessAuroraExecutor():
 
 # factory --------------------------------------------------------------
 
-def create(executor, process_pool=None, io_loop=None, max_procs=0):
+def create(executor, process_pool=None, io_loop=None, max_procs=0,
+           max_queued_reads=0, max_queued_mutations=0, retry_after=1, adaptive_limit=True,
+           breaker_failures=0, breaker_reset=30.0, breaker_probes=1, coalesce=True):
     """Factory function for Process-based Aurora executor objects"""
 
     if max_procs is None:
         max_procs = multiprocessing.cpu_count()
 
+    # inherited by the workers when they are forked
+    retry.share_budgets()
+
+    # state of the executor that must outlive its copies in the workers
+    share_state = getattr(executor, "share_state", None)
+    if share_state is not None:
+        share_state()
+
     io_loop     = io_loop or IOLoop.instance()
     process_pool = process_pool or ProcessPoolExecutor(max_procs)
+    admission   = AdmissionControl("process", process_pool._max_workers,
+                                   max_queued_reads, max_queued_mutations, retry_after)
+
+    cluster_limiter = limiter.create("process", process_pool._max_workers, adaptive=adaptive_limit)
+
+    circuit_breaker = breaker.create("process", breaker_failures, breaker_reset, breaker_probes)
+    job_locks       = joblock.create("process", coalesce, admission)
 
-    return ProcessAuroraExecutor(executor, process_pool, io_loop)
+    return ProcessAuroraExecutor(executor, process_pool, io_loop, admission, cluster_limiter,
+                                 circuit_breaker, job_locks)
@@ -2,13 +2,16 @@
 #           Aurora Command Executor using ThreadPool
 # ----------------------------------------------------------------------
 
+import time
 import logging
 import multiprocessing
 
 from tornado.ioloop import IOLoop
-from tornado.concurrent import run_on_executor
 from concurrent.futures import ThreadPoolExecutor
 
+from apache.aurora.rest.executors import context, pool, limiter, breaker, joblock
+from apache.aurora.rest.executors.pool import PoolMonitor, AdmissionControl
+
 logger = logging.getLogger("tornado.access")
 
 # thread-pool executor ------------------------------------------------
@@ -20,53 +23,102 @@ class ThreadAuroraExecutor():
     are used to provide simultaneous execution of Aurora commands.
     """
 
-    def __init__(self, delegate, thread_pool, io_loop):
+    def __init__(self, delegate, thread_pool, io_loop, admission=None, cluster_limiter=None,
+                 circuit_breaker=None, job_locks=None):
         logger.info("ThreadAuroraExecutor(threads=%s) created" %
             (str(thread_pool._max_workers) if thread_pool._max_workers else "unlimited"))
 
-        self.delegate = delegate
-        self.executor = thread_pool
-        self.io_loop  = io_loop
+        self.delegate  = delegate
+        self.executor  = thread_pool
+        self.io_loop   = io_loop
+        self.monitor   = PoolMonitor("thread")
+        self.admission = admission or AdmissionControl("thread", thread_pool._max_workers)
+        self.limiter   = cluster_limiter or limiter.create("thread", 0)
+        self.breaker   = circuit_breaker or breaker.create("thread", 0)
+        self.job_locks = job_locks or joblock.create("thread", admission=self.admission)
+
+    def submit(self, method_name, *args, **kwargs):
+        """Submit call of delegate's method to the thread pool, return future"""
+
+        # the first argument of every command is the cluster
+        cluster = args[0]
+        request_context = context.current()
+
+        def start():
+            self.admission.admit(method_name)
+
+            pool.prepare(request_context)
+
+            self.monitor.submitted()
+            submitted_at = time.time()
+
+            return self.limiter.submit(cluster, lambda: self.executor.submit(
+                        self.run, method_name, submitted_at, request_context, args, kwargs),
+                        request_context)
+
+        return self.job_locks.submit(method_name, args, kwargs,
+                                     lambda: self.breaker.guard(cluster, start))
+
+    def run(self, method_name, submitted_at, request_context, args, kwargs):
+        """Execute delegate's method, runs in worker thread"""
+
+        wait = time.time() - submitted_at
+        self.monitor.started(wait)
+        if request_context is not None:
+            request_context.add_phase("queue", wait)
+        try:
+            expired = pool.deadline_exceeded("thread", request_context)
+            if expired is not None:
+                raise expired
+            return pool.run_in_server_process(method_name, self.delegate, args, kwargs, request_context)
+        finally:
+            self.monitor.finished()
+            self.admission.release(method_name)
 
-    @run_on_executor
     def list_jobs(self, cluster, role):
         logger.info("entered ThreadAuroraExecutor::list_jobs")
 
-        return self.delegate.list_jobs(cluster, role)
+        return self.submit("list_jobs", cluster, role)
+
+    def list_all_jobs(self, cluster):
+        logger.info("entered ThreadAuroraExecutor::list_all_jobs")
+
+        return self.submit("list_all_jobs", cluster)
 
-    @run_on_executor
     def create_job(self, cluster, role, environment, jobname, jobspec):
         logger.info("entered ThreadAuroraExecutor::create_job")
 
-        return self.delegate.create_job(cluster, role, environment, jobname, jobspec)
+        return self.submit("create_job", cluster, role, environment, jobname, jobspec)
 
-    @run_on_executor
-    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[]):
+    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[],
+                   updater_settings=None):
         logger.info("entered ThreadAuroraExecutor::update_job")
 
-        return self.delegate.update_job(cluster, role, environment, jobname, jobspec, instances)
+        return self.submit("update_job", cluster, role, environment, jobname, jobspec, instances,
+                           updater_settings)
 
-    @run_on_executor
     def cancel_update_job(self, cluster, role, environment, jobname, jobspec=None):
         logger.info("entered ThreadAuroraExecutor::cancel_update_job")
 
-        return self.delegate.cancel_update_job(cluster, role, environment, jobname, jobspec)
+        return self.submit("cancel_update_job", cluster, role, environment, jobname, jobspec)
 
-    @run_on_executor
-    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[]):
+    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[],
+                    updater_settings=None):
         logger.info("entered ThreadAuroraExecutor::restart_job")
 
-        return self.delegate.restart_job(cluster, role, environment, jobname, jobspec, instances)
+        return self.submit("restart_job", cluster, role, environment, jobname, jobspec, instances,
+                           updater_settings)
 
-    @run_on_executor
     def delete_job(self, cluster, role, environment, jobname, jobspec=None, instances=[]):
         logger.info("entered ThreadAuroraExecutor::delete_job")
 
-        return self.delegate.delete_job(cluster, role, environment, jobname, jobspec, instances)
+        return self.submit("delete_job", cluster, role, environment, jobname, jobspec, instances)
 
 # factory --------------------------------------------------------------
 
-def create(executor, thread_pool=None, io_loop=None, max_workers=0):
+def create(executor, thread_pool=None, io_loop=None, max_workers=0,
+           max_queued_reads=0, max_queued_mutations=0, retry_after=1, adaptive_limit=True,
+           breaker_failures=0, breaker_reset=30.0, breaker_probes=1, coalesce=True):
     """Factory function for Thread-based Aurora executor objects"""
 
     if max_workers is None:
@@ -74,5 +126,13 @@ def create(executor, thread_pool=None, io_loop=None, max_workers=0):
 
     io_loop     = io_loop or IOLoop.instance()
     thread_pool = thread_pool or ThreadPoolExecutor(max_workers)
+    admission   = AdmissionControl("thread", thread_pool._max_workers,
+                                   max_queued_reads, max_queued_mutations, retry_after)
+
+    cluster_limiter = limiter.create("thread", thread_pool._max_workers, adaptive=adaptive_limit)
+
+    circuit_breaker = breaker.create("thread", breaker_failures, breaker_reset, breaker_probes)
+    job_locks       = joblock.create("thread", coalesce, admission)
 
-    return ThreadAuroraExecutor(executor, thread_pool, io_loop)
+    return ThreadAuroraExecutor(executor, thread_pool, io_loop, admission, cluster_limiter,
+                                circuit_breaker, job_locks)
@@ -0,0 +1,238 @@
+# ----------------------------------------------------------------------
+#           Common Code of Executors that use Pools of Workers
+# ----------------------------------------------------------------------
+
+import os
+import time
+import logging
+import httplib
+import threading
+
+from contextlib import contextmanager
+
+import tornado.web
+
+from apache.aurora.rest.monitor import metrics, profiler, memory
+from apache.aurora.rest.executors import context
+
+logger = logging.getLogger("tornado.access")
+
+IN_FLIGHT = metrics.gauge(
+    "aurora_rest_executor_in_flight",
+    "Number of Aurora commands being executed by the workers of the pool",
+    ["pool"])
+
+QUEUE_DEPTH = metrics.gauge(
+    "aurora_rest_executor_queue_depth",
+    "Number of Aurora commands waiting for a free worker",
+    ["pool"])
+
+QUEUE_WAIT = metrics.histogram(
+    "aurora_rest_executor_queue_wait_seconds",
+    "Time Aurora commands spent waiting for a free worker",
+    ["pool"])
+
+REJECTED = metrics.counter(
+    "aurora_rest_executor_rejected_total",
+    "Number of Aurora commands rejected because the queue of the pool was full",
+    ["pool", "kind"])
+
+EXPIRED = metrics.counter(
+    "aurora_rest_executor_expired_total",
+    "Number of Aurora commands discarded because the client's deadline had passed",
+    ["pool"])
+
+# commands that only read the state of the scheduler, all others are mutations
+READ_METHODS = frozenset([ "list_jobs", "list_all_jobs" ])
+
+def command_kind(method_name):
+    return "read" if method_name in READ_METHODS else "mutation"
+
+# pool monitor ---------------------------------------------------------
+
+class PoolMonitor():
+    """Keeps track of the commands submitted to a pool of workers
+
+    Thread pools report when every command is started by a worker. The
+    server process does not see when worker processes pick up commands,
+    so for process pools the number of running commands is estimated
+    from the number of workers in the pool.
+    """
+
+    def __init__(self, pool, max_workers=None):
+        self.pool        = pool
+        self.max_workers = max_workers
+        self.lock        = threading.Lock()
+        self.outstanding = 0
+        self.running     = 0
+
+        IN_FLIGHT.set_function(self.in_flight, (pool,))
+        QUEUE_DEPTH.set_function(self.queue_depth, (pool,))
+
+    def submitted(self):
+        with self.lock:
+            self.outstanding += 1
+
+    def started(self, wait):
+        with self.lock:
+            self.running += 1
+        QUEUE_WAIT.observe(wait, (self.pool,))
+
+    def waited(self, wait):
+        QUEUE_WAIT.observe(wait, (self.pool,))
+
+    def finished(self, started=True):
+        with self.lock:
+            self.outstanding -= 1
+            if started:
+                self.running -= 1
+
+    def in_flight(self):
+        if self.max_workers:
+            return min(self.outstanding, self.max_workers)
+        return self.running
+
+    def queue_depth(self):
+        return self.outstanding - self.in_flight()
+
+# admission control ----------------------------------------------------
+
+class ExecutorOverloaded(tornado.web.HTTPError):
+    """Command rejected because the queue of the pool is full, answered with 503"""
+
+    def __init__(self, pool, kind, retry_after):
+        tornado.web.HTTPError.__init__(self, httplib.SERVICE_UNAVAILABLE,
+                                       "queue of %s commands of the %s pool is full", kind, pool)
+        self.retry_after = retry_after
+
+class AdmissionControl():
+    """Bounds the number of commands that wait for a free worker of the pool
+
+    Reads and mutations have separate limits, so that a burst of listings
+    does not keep changes of jobs out and vice versa. Commands of a kind
+    are rejected when there are more of them outstanding than there are
+    workers plus the limit of the kind. Limit 0 means unbounded queue.
+    """
+
+    def __init__(self, pool, workers, max_queued_reads=0, max_queued_mutations=0, retry_after=1):
+        self.pool        = pool
+        self.workers     = workers or 0
+        self.limits      = { "read": max_queued_reads, "mutation": max_queued_mutations }
+        self.retry_after = retry_after
+        self.outstanding = { "read": 0, "mutation": 0 }
+        self.lock        = threading.Lock()
+
+        if max_queued_reads > 0 or max_queued_mutations > 0:
+            logger.info("%s pool queue limits: reads=%d, mutations=%d",
+                        pool, max_queued_reads, max_queued_mutations)
+
+    def admit(self, method_name):
+        """Account for new command, raise ExecutorOverloaded if its queue is full"""
+
+        kind = command_kind(method_name)
+        limit = self.limits[kind]
+        with self.lock:
+            if limit > 0 and self.outstanding[kind] >= self.workers + limit:
+                REJECTED.inc((self.pool, kind))
+                raise ExecutorOverloaded(self.pool, kind, self.retry_after)
+            self.outstanding[kind] += 1
+
+    def release(self, method_name):
+        with self.lock:
+            self.outstanding[command_kind(method_name)] -= 1
+
+# deadlines ------------------------------------------------------------
+
+class DeadlineExceeded(tornado.web.HTTPError):
+    """Command discarded because its deadline passed before a worker picked it up"""
+
+    def __init__(self, pool, late):
+        tornado.web.HTTPError.__init__(self, httplib.GATEWAY_TIMEOUT,
+                                       "deadline passed %.3f seconds before a worker of the %s pool "
+                                       "picked up the request", late, pool)
+
+def deadline_exceeded(pool, request_context, late=None):
+    """Return DeadlineExceeded if the deadline of the request has passed, otherwise None
+
+    The discarded command is logged and counted.
+    """
+
+    if late is None:
+        late = request_context.expired() if request_context is not None else None
+    if late is None:
+        return None
+
+    logger.warning("%s discarded, deadline passed %.3f seconds ago", request_context.name, late)
+    EXPIRED.inc((pool,))
+    profiler.abandon(request_context)
+    return DeadlineExceeded(pool, late)
+
+# workers --------------------------------------------------------------
+
+def call_by_name(method_name, obj, *args, **kwargs):
+    """Helper function to enable pool executors to call object's method"""
+
+    method = getattr(obj, method_name)
+    return method(*args, **kwargs)
+
+def prepare(request_context):
+    """Decide how the command of the request is instrumented, called when it is submitted"""
+
+    profiler.mark(request_context)
+    memory.TRACKER.mark(request_context)
+
+@contextmanager
+def instrumented(request_context, profile_sink, memory_sink):
+    """Context manager that executes its block on behalf of the request"""
+
+    with context.activate(request_context), \
+         profiler.profiled(request_context, profile_sink), \
+         memory.measured(request_context, memory_sink):
+        yield
+
+def run_in_server_process(method_name, obj, args, kwargs, request_context=None):
+    """Execute method in the server process, by worker thread or by the IOLoop"""
+
+    def record_profile(stats):
+        profiler.record(request_context, stats, source=threading.current_thread().name)
+
+    def record_memory(growers):
+        memory.TRACKER.record(request_context.name, growers)
+
+    with instrumented(request_context, record_profile, record_memory):
+        return call_by_name(method_name, obj, *args, **kwargs)
+
+def run_in_worker_process(method_name, obj, args, kwargs, request_context=None):
+    """Execute method in worker process of a pool
+
+    Returns the result of the call together with the data collected by
+    the worker, so that the server process can account for it: the time
+    the call started, the metric samples, the request context with the
+    phases, profile and memory growth, and the memory of the worker.
+    Commands whose deadline has passed are not executed, the worker only
+    reports how late they were.
+    """
+
+    def keep_profile(stats):
+        request_context.profile_stats = (os.getpid(), stats)
+
+    def keep_memory(growers):
+        request_context.memory_growers = growers
+
+    started_at = time.time()
+    expired = request_context.expired() if request_context is not None else None
+    if expired is not None:
+        (result, samples) = (None, [])
+    else:
+        with metrics.capture() as samples, \
+             instrumented(request_context, keep_profile, keep_memory):
+            result = call_by_name(method_name, obj, *args, **kwargs)
+
+    return {
+        "result":       result,
+        "expired":      expired,
+        "started_at":   started_at,
+        "samples":      samples,
+        "context":      request_context,
+        "worker":       (os.getpid(), memory.rss_bytes())
+    }
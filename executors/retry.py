@@ -0,0 +1,234 @@
+# ----------------------------------------------------------------------
+#
+#                  Retry of Transient Scheduler Errors
+#
+# Calls to the scheduler that only read its state, or that bring the job
+# to a state that does not change when it is repeated (kill, cancel of
+# update), are retried when they fail with transient error, so that the
+# client does not have to repeat the whole request. The waits between
+# attempts grow exponentially and are drawn at random ("full jitter"),
+# so that the retries of many requests do not arrive at the same time.
+#
+# The retries to every cluster are limited by a budget: every call earns a part
+# of a retry, every retry spends one. When the scheduler keeps failing
+# the budget runs out and the errors are returned as they are, instead
+# of multiplying the load of the struggling scheduler.
+#
+# With process pool the calls are made by the workers, and the budgets
+# are kept in memory shared with them, created by the server before the
+# workers are started. All workers draw from one budget per cluster, as
+# the threads do, instead of each having its own reserve of retries.
+#
+# ----------------------------------------------------------------------
+
+import time
+import zlib
+import random
+import socket
+import logging
+import threading
+import multiprocessing
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.executors import context
+
+logger = logging.getLogger("tornado.application")
+
+RETRIES = metrics.counter(
+    "aurora_rest_scheduler_retries_total",
+    "Number of calls to the Aurora scheduler that were retried",
+    ["cluster", "call"])
+
+RETRIES_DENIED = metrics.counter(
+    "aurora_rest_scheduler_retries_denied_total",
+    "Number of transient errors not retried because the retry budget was spent",
+    ["cluster", "call"])
+
+# calls that can be repeated without changing the outcome
+IDEMPOTENT_CALLS = frozenset([ "get_jobs", "kill_job", "cancel_update" ])
+
+# errors of the connection to the scheduler
+TRANSIENT_EXCEPTIONS = (socket.error, IOError)
+
+# budgets in shared memory, clusters (and ratios) with the same hash share one
+SHARED_SLOTS = 256
+
+# budget ---------------------------------------------------------------
+
+class RetryBudget():
+    """Token bucket that limits the retries to _ratio_ of the calls
+
+    The bucket starts with _reserve_ tokens, so that a few retries are
+    possible before there were calls to earn them.
+    """
+
+    def __init__(self, ratio=0.1, reserve=10.0):
+        self.ratio   = ratio
+        self.reserve = reserve
+        self.tokens  = reserve
+        self.lock    = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Take one retry from the budget, return False if there is none"""
+
+        with self.lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+class SharedRetryBudget():
+    """Retry budget kept in slot of array shared with the workers of process pool"""
+
+    def __init__(self, ratio, reserve, tokens, slot, lock):
+        self.ratio   = ratio
+        self.reserve = reserve
+        self.shared  = tokens
+        self.slot    = slot
+        self.lock    = lock
+
+    def deposit(self):
+        with self.lock:
+            self.shared[self.slot] = min(self.reserve, self.shared[self.slot] + self.ratio)
+
+    def withdraw(self):
+        """Take one retry from the budget, return False if there is none"""
+
+        with self.lock:
+            if self.shared[self.slot] < 1.0:
+                return False
+            self.shared[self.slot] -= 1.0
+            return True
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+_shared = None
+
+def share_budgets(slots=SHARED_SLOTS, reserve=10.0):
+    """Keep the retry budgets in shared memory, call before the workers of process pool start"""
+
+    global _shared
+    with _budgets_lock:
+        if _shared is None:
+            _shared = (multiprocessing.RawArray("d", [ reserve ] * slots), multiprocessing.Lock(),
+                       reserve)
+            logger.info("retry budgets shared with the workers of the process pool")
+
+def slot_of(cluster, ratio, slots):
+    """Return the slot of the shared budget of the cluster with the ratio"""
+
+    if isinstance(cluster, unicode):
+        cluster = cluster.encode("utf-8")
+    return (zlib.crc32("%s/%r" % (cluster, ratio)) & 0xffffffff) % slots
+
+def budget_of(cluster, ratio):
+    """Return the retry budget of the cluster
+
+    The budgets are kept apart from the executors, because with process
+    pools the executor is copied to the worker with every command.
+    """
+
+    with _budgets_lock:
+        budget = _budgets.get((cluster, ratio))
+        if budget is None:
+            if _shared is None:
+                budget = RetryBudget(ratio)
+            else:
+                (tokens, lock, reserve) = _shared
+                budget = SharedRetryBudget(ratio, reserve, tokens,
+                                           slot_of(cluster, ratio, len(tokens)), lock)
+            _budgets[(cluster, ratio)] = budget
+        return budget
+
+# retry policy ---------------------------------------------------------
+
+class RetryPolicy():
+    """Up to _retries_ more attempts of idempotent calls, waiting up to
+    _backoff_ * 2^attempt seconds (at most _max_backoff_) between them
+    """
+
+    def __init__(self, retries=2, backoff=0.1, max_backoff=2.0, budget=0.1,
+                 transient_exceptions=TRANSIENT_EXCEPTIONS):
+        self.retries              = retries
+        self.backoff              = backoff
+        self.max_backoff          = max_backoff
+        self.budget               = budget
+        self.transient_exceptions = transient_exceptions
+
+        logger.info("retry policy: retries=%d, backoff=%.3f s, budget=%.2f",
+                    retries, backoff, budget)
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def within_deadline(self, delay):
+        """Check that the retry can complete before the client gives up"""
+
+        request_context = context.current()
+        if request_context is None or request_context.deadline is None:
+            return True
+        return time.time() + delay < request_context.deadline
+
+    def next_delay(self, cluster, call, attempt):
+        """Return how long to wait before the next attempt, None if the call is not retried"""
+
+        if call not in IDEMPOTENT_CALLS or attempt >= self.retries:
+            return None
+
+        delay = self.delay(attempt)
+        if not self.within_deadline(delay):
+            logger.warning("%s to cluster %s not retried, deadline of the request is too close",
+                           call, cluster)
+            return None
+        if not budget_of(cluster, self.budget).withdraw():
+            logger.warning("%s to cluster %s not retried, retry budget is spent", call, cluster)
+            RETRIES_DENIED.inc((cluster, call))
+            return None
+
+        return delay
+
+    def call(self, cluster, call, func, is_transient=None):
+        """Call _func_ and retry it while it fails with transient error
+
+        _is_transient(result)_ tells whether the result of the call is
+        transient error, exceptions are transient if they are errors of
+        the connection. The result of the last attempt is returned, or
+        its exception raised.
+        """
+
+        budget_of(cluster, self.budget).deposit()
+        attempt = 0
+        while True:
+            try:
+                result = func()
+            except self.transient_exceptions as e:
+                delay = self.next_delay(cluster, call, attempt)
+                if delay is None:
+                    raise
+                failure = "%s: %s" % (type(e).__name__, e)
+            else:
+                if is_transient is None or not is_transient(result):
+                    return result
+                delay = self.next_delay(cluster, call, attempt)
+                if delay is None:
+                    return result
+                failure = str(result)
+
+            attempt += 1
+            RETRIES.inc((cluster, call))
+            logger.warning("%s to cluster %s failed (%s), retry %d/%d in %.3f s",
+                           call, cluster, failure, attempt, self.retries, delay)
+            with context.phase("retry"):
+                time.sleep(delay)
+
+# factory --------------------------------------------------------------
+
+def create(retries=2, backoff_ms=100, budget=0.1, transient_exceptions=TRANSIENT_EXCEPTIONS):
+    """Factory function for retry policy, retries 0 turns off the retries"""
+
+    return RetryPolicy(retries, backoff_ms / 1000.0, budget=budget,
+                       transient_exceptions=transient_exceptions)
@@ -0,0 +1,347 @@
+# ----------------------------------------------------------------------
+#                      Aurora Simulated Executor
+# ----------------------------------------------------------------------
+
+import math
+import time
+import random
+import logging
+import threading
+import multiprocessing
+
+from apache.aurora.common.aurora_job_key import AuroraJobKey
+
+from apache.aurora.rest.monitor import metrics
+from apache.aurora.rest.executors import context, retry
+
+logger = logging.getLogger("tornado.application")
+
+SCHEDULER_CALL_SECONDS = metrics.histogram(
+    "aurora_rest_scheduler_call_seconds",
+    "Latency of calls to the Aurora scheduler",
+    ["cluster", "call"])
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+# Inventory of jobs by (cluster, role). It is kept apart from the executor,
+# because with process pools the executor is copied to the worker with
+# every command, and the changes made to the copy are lost.
+_inventory = {}
+_inventory_lock = threading.Lock()
+_shared = False
+
+# helpers --------------------------------------------------------------
+
+def parse_slowdowns(spec):
+    """Parse per-cluster slowdowns given as "cluster=factor,cluster=factor" """
+
+    slowdowns = {}
+    for item in (spec or "").split(","):
+        if len(item.strip()) == 0:
+            continue
+        (cluster, factor) = item.split("=", 1)
+        slowdowns[cluster.strip()] = float(factor)
+
+    return slowdowns
+
+def parse_outages(spec):
+    """Parse clusters with unreachable scheduler given as "cluster,cluster" """
+
+    return frozenset(item.strip() for item in (spec or "").split(",") if len(item.strip()) > 0)
+
+class LatencyModel():
+    """Random latency of the calls to the scheduler, in seconds"""
+
+    def __init__(self, mean_ms, distribution="lognormal", sigma=0.5, slowdowns=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError("invalid latency distribution: %s" % distribution)
+
+        self.mean         = mean_ms / 1000.0
+        self.distribution = distribution
+        self.sigma        = sigma
+        self.slowdowns    = slowdowns or {}
+
+    def sample(self, cluster):
+        mean = self.mean * self.slowdowns.get(cluster, 1.0)
+        if mean <= 0:
+            return 0.0
+
+        if self.distribution == "constant":
+            return mean
+        elif self.distribution == "uniform":
+            return random.uniform(0, 2 * mean)
+        elif self.distribution == "exponential":
+            return random.expovariate(1.0 / mean)
+        else:
+            # mu is chosen so that the mean of the distribution is _mean_
+            return random.lognormvariate(math.log(mean) - self.sigma ** 2 / 2.0, self.sigma)
+
+# basic handlers -------------------------------------------------------
+
+class AuroraSimulatedExecutor():
+    """Executor for Aurora commands that simulates the Aurora scheduler
+
+    Intended for capacity testing without Aurora cluster. Every command
+    takes random time drawn from the latency model, fails with the given
+    probability, and otherwise is applied to in-memory inventory of jobs.
+    Roles that are seen for the first time start with _jobs_per_role_
+    jobs, so that listings return data right away.
+
+    The schedulers of the clusters in _outages_ are unreachable, calls to
+    them raise an error after the latency, like the connect timeout.
+
+    The inventory is kept by the module. With process pools it is moved
+    to a manager process by share_state() before the workers start, so
+    that all workers see the same jobs, as the threads do.
+    """
+
+    def __init__(self, latency, error_rate=0.0, jobs_per_role=10, outages=frozenset(),
+                 retry_policy=None):
+        logger.info("aurora -- simulated executor created")
+
+        self.latency       = latency
+        self.error_rate    = error_rate
+        self.jobs_per_role = jobs_per_role
+        self.outages       = outages
+        self.retry_policy  = retry_policy or retry.create(retries=0)
+
+    def share_state(self):
+        """Move the inventory to manager process, call before the workers of process pool start"""
+
+        global _inventory, _inventory_lock, _shared
+        if _shared:
+            return
+        manager = multiprocessing.Manager()
+        _inventory = manager.dict(_inventory)
+        _inventory_lock = manager.Lock()
+        _shared = True
+        logger.info("aurora -- simulated inventory shared with the workers of the process pool")
+
+    def make_job_key(self, cluster, role):
+        return cluster + "/" + role
+
+    def pack_instance_list(self, instances):
+        """Convert list/array of Aurora instances (shards) into single element"""
+
+        if instances is None or len(instances) == 0:
+            logger.info("shard(s) are not specified, that means all instances")
+            return(None)
+
+        packed_list = set()
+        for instance in instances:
+            for x in instance.split(","):
+                r = x.split("-")
+                packed_list.update(range(int(r[0]), int(r[-1])+1))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("list of shards: %s", sorted(packed_list))
+        return(packed_list)
+
+    def jobs_of(self, cluster, role):
+        """Return the jobs of the role, call with the lock held
+
+        The shared inventory returns copies, changed jobs are written back
+        with store_jobs().
+        """
+
+        key = (cluster, role)
+        jobs = _inventory.get(key)
+        if jobs is None:
+            jobs = dict([
+                ("%s-job-%04d" % (role, i), { "environment": "devel", "instances": 1, "jobspec": None })
+                for i in range(self.jobs_per_role) ])
+            _inventory[key] = jobs
+
+        return jobs
+
+    def store_jobs(self, cluster, role, jobs):
+        """Write back the changed jobs of the role, call with the lock held"""
+
+        _inventory[(cluster, role)] = jobs
+
+    def call_scheduler(self, cluster, call):
+        """Spend the time of the call and decide whether it fails, return error or None
+
+        Injected errors and outages are transient, and retried like the
+        errors of the real scheduler.
+        """
+
+        def attempt():
+            with SCHEDULER_CALL_SECONDS.time((cluster, call)), context.phase("scheduler"):
+                time.sleep(self.latency.sample(cluster))
+
+            if cluster in self.outages:
+                raise IOError("could not connect to scheduler of cluster %s" % cluster)
+
+            if self.error_rate > 0 and random.random() < self.error_rate:
+                logger.warning("aurora -- %s failed, injected error", call)
+                return "Response from scheduler: ERROR (message: injected failure)"
+
+            return None
+
+        return self.retry_policy.call(cluster, call, attempt, lambda error: error is not None)
+
+    def list_jobs(self, cluster, role):
+        """Method to execute [ aurora list_jobs cluster/role command ]"""
+
+        jobkey = self.make_job_key(cluster, role)
+        logger.info("request to list jobs = %s" % jobkey)
+
+        error = self.call_scheduler(cluster, "get_jobs")
+        if error is not None:
+            return(jobkey, [], ["Failed to list Aurora jobs", error])
+
+        with _inventory_lock:
+            jobs = [ "%s/%s/%s/%s" % (cluster, role, job["environment"], name)
+                        for name, job in sorted(self.jobs_of(cluster, role).items()) ]
+        logger.info("%d jobs found for key = %s", len(jobs), jobkey)
+
+        return(jobkey, jobs, None)
+
+    def list_all_jobs(self, cluster):
+        """Method to list the jobs of all roles seen in the cluster"""
+
+        logger.info("request to list all jobs of cluster = %s", cluster)
+
+        error = self.call_scheduler(cluster, "get_jobs")
+        if error is not None:
+            return(cluster, [], ["Failed to list Aurora jobs", error])
+
+        with _inventory_lock:
+            jobs = [ "%s/%s/%s/%s" % (cluster, role, job["environment"], name)
+                        for (c, role), role_jobs in sorted(_inventory.items()) if c == cluster
+                            for name, job in sorted(role_jobs.items()) ]
+        logger.info("%d jobs found in cluster = %s", len(jobs), cluster)
+
+        return(cluster, jobs, None)
+
+    def create_job(self, cluster, role, environment, jobname, jobspec):
+        """Method to create aurora job"""
+
+        job_key = AuroraJobKey(cluster, role, environment, jobname)
+        logger.info("request to create job = %s", job_key.to_path())
+
+        if jobspec is None or len(jobspec) == 0:
+            return(job_key.to_path(), ["Failed to create Aurora job",
+                                       "Can not create job configuration object because",
+                                       "Job configuration is missing (not provided)!"])
+
+        error = self.call_scheduler(cluster, "create_job")
+        if error is not None:
+            return(job_key.to_path(), ["Error reported by aurora client:", error])
+
+        with _inventory_lock:
+            jobs = self.jobs_of(cluster, role)
+            if jobname in jobs:
+                return(job_key.to_path(), ["Error reported by aurora client:",
+                        "Response from scheduler: INVALID_REQUEST (message: Job already exists)"])
+            jobs[jobname] = { "environment": environment, "instances": 1, "jobspec": jobspec }
+            self.store_jobs(cluster, role, jobs)
+
+        logger.info("aurora -- create job successful")
+        return(job_key.to_path(), None)
+
+    def update_job(self, cluster, role, environment, jobname, jobspec, instances=[],
+                   updater_settings=None):
+        """Method to update aurora job"""
+
+        job_key = AuroraJobKey(cluster, role, environment, jobname)
+        logger.info("request to update => %s", job_key.to_path())
+
+        instances = self.pack_instance_list(instances)
+        if jobspec is None or len(jobspec) == 0:
+            return(job_key.to_path(), ["Failed to update Aurora job",
+                                       "Can not create job configuration object because",
+                                       "Job configuration is missing (not provided)!"])
+
+        error = self.call_scheduler(cluster, "update_job")
+        if error is not None:
+            return(job_key.to_path(), ["Error reported by aurora client:", error])
+
+        with _inventory_lock:
+            jobs = self.jobs_of(cluster, role)
+            job = jobs.get(jobname)
+            if job is None:
+                return(job_key.to_path(), ["Error reported by aurora client:",
+                        "Response from scheduler: INVALID_REQUEST (message: No such job)"])
+            job["jobspec"] = jobspec
+            if instances is not None:
+                job["instances"] = max(job["instances"], max(instances) + 1)
+            self.store_jobs(cluster, role, jobs)
+
+        logger.info("aurora -- update job successful")
+        return(job_key.to_path(), None)
+
+    def cancel_update_job(self, cluster, role, environment, jobname, jobspec=None):
+        """Method to cancel an update of aurora job"""
+
+        job_key = AuroraJobKey(cluster, role, environment, jobname)
+        logger.info("request to cancel update of => %s", job_key.to_path())
+
+        error = self.call_scheduler(cluster, "cancel_update")
+        if error is not None:
+            return(job_key.to_path(), ["Error reported by aurora client:", error])
+
+        with _inventory_lock:
+            if jobname not in self.jobs_of(cluster, role):
+                return(job_key.to_path(), ["Error reported by aurora client:",
+                        "Response from scheduler: INVALID_REQUEST (message: No such job)"])
+
+        logger.info("aurora -- cancel of update job successful")
+        return(job_key.to_path(), None)
+
+    def restart_job(self, cluster, role, environment, jobname, jobspec=None, instances=[],
+                    updater_settings=None):
+        """Method to restart aurora job"""
+
+        job_key = AuroraJobKey(cluster, role, environment, jobname)
+        logger.info("request to restart => %s", job_key.to_path())
+
+        instances = self.pack_instance_list(instances)
+        error = self.call_scheduler(cluster, "restart")
+        if error is not None:
+            return(job_key.to_path(), ["Error reported by aurora client:", error])
+
+        with _inventory_lock:
+            if jobname not in self.jobs_of(cluster, role):
+                return(job_key.to_path(), ["Error reported by aurora client:",
+                        "Response from scheduler: INVALID_REQUEST (message: No such job)"])
+
+        logger.info("aurora -- restart job successful")
+        return(job_key.to_path(), None)
+
+    def delete_job(self, cluster, role, environment, jobname, jobspec=None, instances=[]):
+        """Method to delete aurora job"""
+
+        job_key = AuroraJobKey(cluster, role, environment, jobname)
+        logger.info("request to delete => %s", job_key.to_path())
+
+        instances = self.pack_instance_list(instances)
+        error = self.call_scheduler(cluster, "kill_job")
+        if error is not None:
+            return(job_key.to_path(), [], ["Error reported by aurora client:", error])
+
+        with _inventory_lock:
+            jobs = self.jobs_of(cluster, role)
+            job = jobs.get(jobname)
+            if job is None:
+                return(job_key.to_path(), [], ["Error reported by aurora client:",
+                        "Response from scheduler: INVALID_REQUEST (message: No such job)"])
+            if instances is None or len(instances) >= job["instances"]:
+                del jobs[jobname]
+            else:
+                job["instances"] -= len([ i for i in instances if i < job["instances"] ])
+            self.store_jobs(cluster, role, jobs)
+
+        logger.info("aurora -- kill job successful")
+        return(job_key.to_path(), [job_key.to_path()], None)
+
+# factory --------------------------------------------------------------
+
+def create(latency_ms=100, distribution="lognormal", error_rate=0.0, slowdowns=None, jobs_per_role=10,
+           outages=None, retries=2, retry_backoff_ms=100, retry_budget=0.1):
+    """Factory function for executor objects that simulate the Aurora scheduler"""
+
+    latency = LatencyModel(latency_ms, distribution, slowdowns=parse_slowdowns(slowdowns))
+    retry_policy = retry.create(retries, retry_backoff_ms, retry_budget)
+    return AuroraSimulatedExecutor(latency, error_rate, jobs_per_role, parse_outages(outages),
+                                   retry_policy)
@@ -0,0 +1,89 @@
+# ----------------------------------------------------------------------
+#
+#                  Settings of the Job Updater
+#
+# Restarts of jobs are rolled out by the updater of the Aurora client in
+# batches of instances: every batch is restarted and watched for a while
+# before the next one starts. The settings of the updater are taken from
+# the request, within limits set by the server, and have the defaults of
+# the Aurora client restart command.
+#
+# Updates of jobs take the settings of the updater from update_config of
+# the job configuration, only the health check interval can be set.
+#
+# ----------------------------------------------------------------------
+
+from collections import OrderedDict
+
+# name: (default, minimum, maximum, flag of the Aurora command-line client)
+SETTINGS = OrderedDict([
+    ("batch_size",              (1,  1, 1000,  "--batch_size")),
+    ("restart_threshold",       (60, 1, 3600,  "--restart_threshold")),
+    ("watch_secs",              (30, 1, 3600,  "--watch_secs")),
+    ("max_per_shard_failures",  (0,  0, 100,   "--max_per_shard_failures")),
+    ("max_total_failures",      (0,  0, 10000, "--max_total_failures")),
+    ("health_check_interval",   (3,  1, 600,   "--updater_health_check_interval_seconds")),
+])
+
+DEFAULT_SETTINGS = dict((name, spec[0]) for name, spec in SETTINGS.items())
+
+RESTART_SETTINGS = tuple(SETTINGS.keys())
+UPDATE_SETTINGS  = ("health_check_interval",)
+
+def parse_settings(spec):
+    """Parse settings of the updater given as "name=value,name=value" """
+
+    settings = {}
+    for item in (spec or "").split(","):
+        if len(item.strip()) == 0:
+            continue
+        (name, value) = item.split("=", 1)
+        if name.strip() not in SETTINGS:
+            raise ValueError("unknown setting of the updater: %s" % name)
+        settings[name.strip()] = int(value)
+
+    return settings
+
+def with_defaults(settings):
+    """Return the settings completed with the defaults of the Aurora client"""
+
+    return dict(DEFAULT_SETTINGS, **(settings or {}))
+
+def command_flags(settings, names):
+    """Return the flags of the Aurora command-line client for the settings"""
+
+    return [ "%s=%d" % (SETTINGS[name][3], settings[name])
+                for name in names if name in (settings or {}) ]
+
+# updater limits -------------------------------------------------------
+
+class UpdaterLimits():
+    """Server defaults and upper limits of the settings of the updater"""
+
+    def __init__(self, defaults=None, maximums=None):
+        self.defaults = dict(DEFAULT_SETTINGS)
+        self.maximums = dict((name, spec[2]) for name, spec in SETTINGS.items())
+        self.defaults.update(defaults or {})
+        self.maximums.update(maximums or {})
+
+        for name in SETTINGS:
+            if not SETTINGS[name][1] <= self.defaults[name] <= self.maximums[name]:
+                raise ValueError("default %s=%d is out of range [%d, %d]" %
+                                 (name, self.defaults[name], SETTINGS[name][1], self.maximums[name]))
+
+    def limits(self, name):
+        """Return the default, minimum and maximum of the setting"""
+
+        return (self.defaults[name], SETTINGS[name][1], self.maximums[name])
+
+    def settings(self, names=RESTART_SETTINGS):
+        """Return the defaults of the settings"""
+
+        return dict((name, self.defaults[name]) for name in names)
+
+# factory --------------------------------------------------------------
+
+def create(defaults=None, maximums=None):
+    """Factory function for limits of the updater settings, given as "name=value,name=value" """
+
+    return UpdaterLimits(parse_settings(defaults), parse_settings(maximums))
@@ -0,0 +1,155 @@
+# ----------------------------------------------------------------------
+#
+#                  Asynchronous Logging
+#
+# The handlers set up by tornado write every log record to the stream or
+# file on the thread that logged it, that is on the IOLoop or on the
+# worker thread of the request. The asynchronous handler takes their
+# place: it only puts the records into a bounded queue, and a separate
+# thread formats them and hands them to the original handlers.
+#
+# Messages are formatted by the writer thread when all their arguments
+# are immutable, otherwise at the time of the call, so that the record
+# shows the values as they were. When the queue is full the records of
+# level below WARNING are dropped and counted, records of higher levels
+# wait for free space for a while before they are dropped too.
+#
+# ----------------------------------------------------------------------
+
+import os
+import Queue
+import atexit
+import logging
+import threading
+
+from apache.aurora.rest.monitor import metrics
+
+LOG_QUEUE = metrics.gauge(
+    "aurora_rest_log_queue_records",
+    "Number of log records waiting to be written")
+
+LOG_DROPPED = metrics.counter(
+    "aurora_rest_log_dropped_total",
+    "Number of log records dropped because the log queue was full",
+    ["level"])
+
+# how long records of level WARNING and above wait for space in the queue
+BLOCK_SECONDS = 1.0
+
+IMMUTABLE_TYPES = (basestring, int, long, float, bool, type(None))
+
+def immutable(value):
+    if isinstance(value, tuple):
+        return all(immutable(v) for v in value)
+    return isinstance(value, IMMUTABLE_TYPES)
+
+# asynchronous handler -------------------------------------------------
+
+class AsyncHandler(logging.Handler):
+    """Handler that queues the records for the writer thread and its target handlers"""
+
+    def __init__(self, targets, capacity=10000):
+        logging.Handler.__init__(self)
+
+        self.targets  = targets
+        self.capacity = capacity
+        self.pid      = None
+        self.start()
+
+        LOG_QUEUE.set_function(lambda: self.queue.qsize())
+        atexit.register(self.stop)
+
+    def start(self):
+        """Start the writer thread, again in processes forked from the server"""
+
+        self.pid     = os.getpid()
+        self.queue   = Queue.Queue(self.capacity)
+        self.dropped = 0
+        self.thread  = threading.Thread(target=self.write, name="log-writer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def prepare(self, record):
+        """Make the record safe to format later on another thread"""
+
+        if record.args and not immutable(record.args):
+            record.msg  = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # the traceback refers to the frames of the caller
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+
+        try:
+            record = self.prepare(record)
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, True, BLOCK_SECONDS)
+            else:
+                self.queue.put_nowait(record)
+        except Queue.Full:
+            self.dropped += 1
+            LOG_DROPPED.inc((record.levelname,))
+        except Exception:
+            self.handleError(record)
+
+    def write(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+
+            if self.dropped > 0:
+                (dropped, self.dropped) = (self.dropped, 0)
+                self.dispatch(logging.makeLogRecord({
+                    "name":      "tornado.general",
+                    "levelno":   logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg":       "log queue was full, %d records dropped",
+                    "args":      (dropped,)
+                }))
+            self.dispatch(record)
+
+    def dispatch(self, record):
+        for handler in self.targets:
+            if record.levelno >= handler.level:
+                try:
+                    handler.handle(record)
+                except Exception:
+                    handler.handleError(record)
+
+    def stop(self):
+        """Write the records left in the queue, called at exit"""
+
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, True, BLOCK_SECONDS)
+            self.thread.join(BLOCK_SECONDS * 5)
+        except Queue.Full:
+            pass
+        for handler in self.targets:
+            handler.flush()
+
+# factory --------------------------------------------------------------
+
+def install(capacity=10000, logger=None):
+    """Move the handlers of the logger (root logger by default) behind asynchronous handler"""
+
+    logger = logger or logging.getLogger()
+    targets = list(logger.handlers)
+    if len(targets) == 0:
+        return None
+
+    handler = AsyncHandler(targets, capacity)
+    for target in targets:
+        logger.removeHandler(target)
+    logger.addHandler(handler)
+
+    logging.getLogger("tornado.application").info(
+        "asynchronous logging enabled, queue of %d records", capacity)
+    return handler
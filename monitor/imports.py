@@ -0,0 +1,116 @@
+# ----------------------------------------------------------------------
+#
+#                  Cost of Module Imports at Startup
+#
+# While the profiler is installed every import statement that loads new
+# modules is timed. The time of an import includes the imports it makes
+# in turn, the self time does not, so the report shows both the modules
+# that were requested (e.g. the selected executor) with everything they
+# pulled in, and the individual modules that are expensive to load.
+#
+# ----------------------------------------------------------------------
+
+import sys
+import time
+import logging
+import importlib
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+from apache.aurora.rest.monitor import metrics
+
+logger = logging.getLogger("tornado.application")
+
+STARTUP_IMPORT_SECONDS = metrics.gauge(
+    "aurora_rest_startup_import_seconds",
+    "Time spent at startup to import the modules of the selected modes",
+    ["module"])
+
+# import profiler ------------------------------------------------------
+
+def qualified_name(name, globals):
+    """Full name of module imported by implicit relative import (Python 2)"""
+
+    if name in sys.modules or not globals:
+        return name
+
+    package = globals.get("__package__") or globals.get("__name__", "").rpartition(".")[0]
+    qualified = package + "." + name
+    return qualified if qualified in sys.modules else name
+
+class ImportProfiler():
+    """Context manager that times the imports made in its block"""
+
+    def __init__(self):
+        self.imports  = []
+        self.stack    = []
+        self.original = None
+
+    def __enter__(self):
+        self.original = builtins.__import__
+        builtins.__import__ = self.timed_import
+        return self
+
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self.original
+
+    def timed_import(self, name, *args, **kwargs):
+        loaded = len(sys.modules)
+        start = time.time()
+        self.stack.append(0.0)
+        try:
+            return self.original(name, *args, **kwargs)
+        finally:
+            elapsed  = time.time() - start
+            children = self.stack.pop()
+            if self.stack:
+                self.stack[-1] += elapsed
+            modules = len(sys.modules) - loaded
+            if modules > 0:
+                globals = args[0] if len(args) > 0 else kwargs.get("globals")
+                self.imports.append((qualified_name(name, globals), elapsed, elapsed - children, modules))
+
+    def top(self, limit=10):
+        """Return the imports with the largest self time"""
+
+        return sorted(self.imports, key=lambda i: i[2], reverse=True)[:limit]
+
+    def total(self):
+        return sum(self_time for (name, elapsed, self_time, modules) in self.imports)
+
+# startup report -------------------------------------------------------
+
+class StartupReport():
+    """Import cost of the modules loaded for the selected modes"""
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.profiler   = ImportProfiler()
+        self.modules    = []
+
+    def load(self, module_name):
+        """Import module by name and account its cost, return the module"""
+
+        loaded = len(sys.modules)
+        start = time.time()
+        with self.profiler:
+            module = importlib.import_module(module_name)
+        elapsed = time.time() - start
+
+        self.modules.append((module_name, elapsed, len(sys.modules) - loaded))
+        STARTUP_IMPORT_SECONDS.set(elapsed, (module_name,))
+        return module
+
+    def log(self, limit=10):
+        logger.info("startup completed in %d ms", (time.time() - self.started_at) * 1000)
+        for (name, elapsed, modules) in self.modules:
+            logger.info("  import %-50s %8.1f ms  %4d modules", name, elapsed * 1000, modules)
+
+        if limit > 0 and len(self.profiler.imports) > 0:
+            logger.info("most expensive imports (self time):")
+            for (name, elapsed, self_time, modules) in self.profiler.top(limit):
+                logger.info("  %-58s %8.1f ms  (total %.1f ms, %d modules)",
+                            name, self_time * 1000, elapsed * 1000, modules)
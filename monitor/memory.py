@@ -0,0 +1,271 @@
+# ----------------------------------------------------------------------
+#
+#                  Tracking of Memory Allocations
+#
+# Snapshots of the allocated memory are taken on request and compared
+# to find what keeps growing. With tracemalloc (Python 3.4+ or patched
+# Python 2.7) the allocations are grouped by the source line that made
+# them, otherwise the live objects are grouped by their type.
+#
+# When sampling is enabled every N-th Aurora command of each request
+# handler is measured by the worker that executes it, and the growth
+# is accumulated per handler. Without tracemalloc every measured command
+# walks all live objects twice while holding the GIL, which takes tens
+# of milliseconds on a busy server, so then at most one command is
+# measured every _walk_interval_ seconds. Workers of process pools
+# report their resident memory with every command they execute.
+#
+# ----------------------------------------------------------------------
+
+import gc
+import os
+import sys
+import time
+import logging
+import resource
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+logger = logging.getLogger("tornado.application")
+
+# number of snapshots that are kept for comparison
+MAX_SNAPSHOTS = 16
+
+# number of top growers reported and kept per request handler
+TOP_GROWERS = 25
+
+# seconds between measured commands when live objects are walked instead of traced
+WALK_INTERVAL = 10.0
+
+PAGE_SIZE = resource.getpagesize()
+
+# helpers --------------------------------------------------------------
+
+def rss_bytes():
+    """Return resident memory of the current process"""
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (IOError, OSError, IndexError, ValueError):
+        # peak instead of current usage, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def is_tracing():
+    return tracemalloc is not None and tracemalloc.is_tracing()
+
+def grouping():
+    return "lineno" if is_tracing() else "type"
+
+def take_snapshot():
+    """Return the allocated memory as dictionary { source line or type: [size, count] }"""
+
+    data = {}
+    if is_tracing():
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, os.path.splitext(__file__)[0] + ".py"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            data["%s:%d" % (frame.filename, frame.lineno)] = [stat.size, stat.count]
+    else:
+        for obj in gc.get_objects():
+            entry = data.setdefault(type(obj).__name__, [0, 0])
+            entry[0] += sys.getsizeof(obj, 0)
+            entry[1] += 1
+
+    return data
+
+def compare(old, new, limit=TOP_GROWERS):
+    """Return the top growers between two snapshots, largest growth first"""
+
+    growers = []
+    for key, (size, count) in new.items():
+        (old_size, old_count) = old.get(key, (0, 0))
+        if size > old_size or count > old_count:
+            growers.append((key, size - old_size, count - old_count, size))
+
+    growers.sort(key=lambda g: (g[1], g[2]), reverse=True)
+    return growers[:limit]
+
+def format_growers(growers):
+    return [ { "where": key, "size_diff": size_diff, "count_diff": count_diff, "size": size }
+                for (key, size_diff, count_diff, size) in growers ]
+
+# memory tracker -------------------------------------------------------
+
+class MemoryTracker():
+    """Snapshots of allocated memory, growth per request handler and memory of workers"""
+
+    def __init__(self):
+        self.lock         = threading.Lock()
+        self.snapshots    = deque(maxlen=MAX_SNAPSHOTS)
+        self.next_id      = 1
+        self.sample_every = 0
+        self.walk_interval = WALK_INTERVAL
+        self.last_walk    = 0.0
+        self.counters     = {}
+        self.endpoints    = {}
+        self.workers      = {}
+
+    def start(self, frames=1):
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info("memory allocations are traced, frames=%d", frames)
+
+    def stop(self):
+        if is_tracing():
+            tracemalloc.stop()
+        with self.lock:
+            self.snapshots.clear()
+            self.endpoints.clear()
+            self.counters.clear()
+            self.sample_every = 0
+            self.last_walk = 0.0
+
+    def snapshot(self):
+        """Take snapshot of allocated memory and return its description"""
+
+        data = take_snapshot()
+        with self.lock:
+            snapshot = {
+                "id":       self.next_id,
+                "time":     time.time(),
+                "rss":      rss_bytes(),
+                "grouping": grouping(),
+                "data":     data
+            }
+            self.next_id += 1
+            self.snapshots.append(snapshot)
+
+        return snapshot
+
+    def find_snapshot(self, snapshot_id):
+        for snapshot in self.snapshots:
+            if snapshot["id"] == snapshot_id:
+                return snapshot
+        return None
+
+    def diff(self, base_id=None, limit=TOP_GROWERS):
+        """Compare the last snapshot with the previous one, or with snapshot _base_id_"""
+
+        with self.lock:
+            snapshots = list(self.snapshots)
+        if len(snapshots) < 2:
+            return None
+
+        last = snapshots[-1]
+        base = self.find_snapshot(base_id) if base_id is not None else snapshots[-2]
+        if base is None or base["grouping"] != last["grouping"]:
+            return None
+
+        return {
+            "from":     base["id"],
+            "to":       last["id"],
+            "seconds":  round(last["time"] - base["time"], 3),
+            "rss_diff": last["rss"] - base["rss"],
+            "grouping": last["grouping"],
+            "growers":  format_growers(compare(base["data"], last["data"], limit))
+        }
+
+    def mark(self, request_context):
+        """Mark every N-th command of each request handler to be measured
+
+        Without tracemalloc the commands are also rate limited, at most one
+        of all handlers is measured every _walk_interval_ seconds.
+        """
+
+        if self.sample_every <= 0 or request_context is None:
+            return
+
+        with self.lock:
+            count = self.counters.get(request_context.name, 0) + 1
+            self.counters[request_context.name] = count
+            if count % self.sample_every != 0:
+                return
+            if tracemalloc is None:
+                now = time.time()
+                if now - self.last_walk < self.walk_interval:
+                    return
+                self.last_walk = now
+
+        request_context.memory = True
+
+    def record(self, name, growers):
+        """Accumulate growth measured during command of request handler _name_"""
+
+        with self.lock:
+            endpoint = self.endpoints.setdefault(name, { "samples": 0, "growth": {} })
+            endpoint["samples"] += 1
+            growth = endpoint["growth"]
+            for (key, size_diff, count_diff, size) in growers:
+                entry = growth.setdefault(key, [0, 0])
+                entry[0] += size_diff
+                entry[1] += count_diff
+
+            # keep only the top growers so that the tracker itself does not grow
+            if len(growth) > 4 * TOP_GROWERS:
+                top = sorted(growth.items(), key=lambda item: item[1][0], reverse=True)
+                endpoint["growth"] = dict(top[:2 * TOP_GROWERS])
+
+    def update_worker(self, pid, rss):
+        with self.lock:
+            self.workers[pid] = { "rss": rss, "updated": time.time() }
+
+    def report(self, base_id=None, limit=TOP_GROWERS):
+        with self.lock:
+            snapshots = [ dict([ (k, v) for k, v in s.items() if k != "data" ])
+                            for s in self.snapshots ]
+            endpoints = dict([ (name, {
+                "samples": e["samples"],
+                "growers": [ { "where": key, "size_diff": size, "count_diff": count }
+                                for key, (size, count) in sorted(e["growth"].items(),
+                                        key=lambda item: item[1][0], reverse=True)[:limit] ]
+                }) for name, e in self.endpoints.items() ])
+            workers = dict([ (str(pid), dict(w)) for pid, w in self.workers.items() ])
+
+        return {
+            "tracing":      is_tracing(),
+            "grouping":     grouping(),
+            "rss":          rss_bytes(),
+            "sample_every": self.sample_every,
+            "walk_interval": self.walk_interval if tracemalloc is None else None,
+            "snapshots":    snapshots,
+            "diff":         self.diff(base_id, limit),
+            "endpoints":    endpoints,
+            "workers":      workers
+        }
+
+TRACKER = MemoryTracker()
+
+# workers --------------------------------------------------------------
+
+@contextmanager
+def measured(request_context, sink):
+    """Context manager that measures memory growth of its block if the request was marked
+
+    The top growers are handed to _sink_ that either records them in the
+    tracker, or keeps them to be sent back from the worker process.
+    """
+
+    if not getattr(request_context, "memory", False):
+        yield
+        return
+
+    if tracemalloc is not None and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    before = take_snapshot()
+    try:
+        yield
+    finally:
+        sink(compare(before, take_snapshot()))
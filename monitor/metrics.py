@@ -0,0 +1,311 @@
+# ----------------------------------------------------------------------
+#
+#                  Metrics in Prometheus Text Format
+#
+# Counters, gauges and histograms that are cheap to update from the
+# request handlers and the worker threads. Every labelled series has its
+# own lock that is held only for a couple of additions, so there is no
+# lock shared by the requests that are executed in parallel.
+#
+# Metrics recorded inside the workers of a process pool do not reach
+# the server process by themselves. The worker captures its samples and
+# sends them back with the result of the call, then the server replays
+# them into its own registry.
+#
+# ----------------------------------------------------------------------
+
+import time
+import bisect
+import logging
+import threading
+
+from contextlib import contextmanager
+
+logger = logging.getLogger("tornado.application")
+
+INF = float("inf")
+
+# latency buckets (in seconds) that cover both quick queries and long updates
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, INF)
+
+_local = threading.local()
+
+# helpers --------------------------------------------------------------
+
+def format_value(value):
+    if value == INF:
+        return "+Inf"
+    if value == -INF:
+        return "-Inf"
+    if isinstance(value, float) and value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def escape_label(value):
+    return (u"%s" % value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names, values, extra=None):
+    pairs = [ '%s="%s"' % (n, escape_label(v)) for n, v in zip(names, values) ]
+    if extra is not None:
+        pairs.append('%s="%s"' % extra)
+    return "{" + ",".join(pairs) + "}" if len(pairs) > 0 else ""
+
+# metrics --------------------------------------------------------------
+
+class Metric(object):
+    """Base class of metrics, a family of series that share name and labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name       = name
+        self.doc        = documentation
+        self.labelnames = tuple(labelnames)
+        self.series     = {}
+        self.lock       = threading.Lock()
+
+    def child(self, labels):
+        """Return the series for the label values, create it on first use"""
+
+        labels = tuple(labels)
+        series = self.series.get(labels)
+        if series is None:
+            if len(labels) != len(self.labelnames):
+                raise ValueError("metric %s expects labels %s, got %s"
+                                    % (self.name, self.labelnames, labels))
+            with self.lock:
+                series = self.series.get(labels)
+                if series is None:
+                    series = self.series[labels] = self.make_series()
+        return series
+
+    def make_series(self):
+        raise NotImplementedError()
+
+    def render(self):
+        lines = [ "# HELP %s %s" % (self.name, self.doc),
+                  "# TYPE %s %s" % (self.name, self.kind) ]
+        for labels, series in sorted(self.series.items()):
+            lines.extend(self.render_series(labels, series))
+        return lines
+
+class Counter(Metric):
+    """Monotonically increasing count of events"""
+
+    kind = "counter"
+
+    class Series():
+        def __init__(self):
+            self.value = 0.0
+            self.lock  = threading.Lock()
+
+    def make_series(self):
+        return Counter.Series()
+
+    def inc(self, labels=(), amount=1):
+        samples = getattr(_local, "samples", None)
+        if samples is not None:
+            samples.append((self.name, "inc", tuple(labels), amount))
+            return
+
+        series = self.child(labels)
+        with series.lock:
+            series.value += amount
+
+    def value(self, labels=()):
+        return self.child(labels).value
+
+    def render_series(self, labels, series):
+        return [ "%s%s %s" % (self.name, format_labels(self.labelnames, labels),
+                              format_value(series.value)) ]
+
+class Gauge(Metric):
+    """Value that can go up and down, or is read from a function when rendered"""
+
+    kind = "gauge"
+
+    class Series():
+        def __init__(self):
+            self.value    = 0.0
+            self.function = None
+            self.lock     = threading.Lock()
+
+        def get(self):
+            return self.function() if self.function is not None else self.value
+
+    def make_series(self):
+        return Gauge.Series()
+
+    def set(self, value, labels=()):
+        self.child(labels).value = value
+
+    def inc(self, labels=(), amount=1):
+        series = self.child(labels)
+        with series.lock:
+            series.value += amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set_function(self, function, labels=()):
+        self.child(labels).function = function
+
+    def value(self, labels=()):
+        return self.child(labels).get()
+
+    def render_series(self, labels, series):
+        try:
+            value = series.get()
+        except Exception:
+            logger.exception("failed to read gauge %s%s", self.name, labels)
+            return []
+        return [ "%s%s %s" % (self.name, format_labels(self.labelnames, labels),
+                              format_value(value)) ]
+
+class Histogram(Metric):
+    """Distribution of observed values counted in buckets"""
+
+    kind = "histogram"
+
+    class Series():
+        def __init__(self, nbuckets):
+            self.counts = [0] * nbuckets
+            self.sum    = 0.0
+            self.lock   = threading.Lock()
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+
+        buckets = sorted(buckets)
+        if buckets[-1] != INF:
+            buckets.append(INF)
+        self.buckets = tuple(buckets)
+
+    def make_series(self):
+        return Histogram.Series(len(self.buckets))
+
+    def observe(self, value, labels=()):
+        samples = getattr(_local, "samples", None)
+        if samples is not None:
+            samples.append((self.name, "observe", tuple(labels), value))
+            return
+
+        index  = bisect.bisect_left(self.buckets, value)
+        series = self.child(labels)
+        with series.lock:
+            series.counts[index] += 1
+            series.sum += value
+
+    @contextmanager
+    def time(self, labels=()):
+        """Context manager that observes the time spent in its block"""
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, labels)
+
+    def count(self, labels=()):
+        return sum(self.child(labels).counts)
+
+    def render_series(self, labels, series):
+        with series.lock:
+            counts = list(series.counts)
+            total  = series.sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append("%s_bucket%s %d" % (self.name,
+                format_labels(self.labelnames, labels, ("le", format_value(bound))), cumulative))
+        lines.append("%s_sum%s %s" % (self.name,
+                format_labels(self.labelnames, labels), format_value(total)))
+        lines.append("%s_count%s %d" % (self.name,
+                format_labels(self.labelnames, labels), cumulative))
+        return lines
+
+# registry -------------------------------------------------------------
+
+class Registry():
+    """Collection of metrics exposed by the server"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock    = threading.Lock()
+
+    def register(self, metric):
+        """Register metric, or return the one already registered with the same name"""
+
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError("metric %s already registered as %s"
+                                        % (metric.name, existing.kind))
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def get(self, name):
+        return self.metrics.get(name)
+
+    def render(self):
+        """Render all metrics in Prometheus text exposition format"""
+
+        lines = []
+        for name in sorted(self.metrics.keys()):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def replay(self, samples):
+        """Apply samples captured by another process"""
+
+        for (name, method, labels, value) in samples or []:
+            metric = self.metrics.get(name)
+            if metric is None:
+                logger.warning("dropped sample of unknown metric: %s", name)
+                continue
+            if method == "observe":
+                metric.observe(value, labels)
+            else:
+                metric.inc(labels, value)
+
+REGISTRY = Registry()
+
+# capture of samples ---------------------------------------------------
+
+@contextmanager
+def capture():
+    """Context manager that collects the samples instead of recording them
+
+    Used by the workers of process pools, the list of samples is sent
+    to the server process which then replays it with Registry.replay()
+    """
+
+    samples = []
+    previous = getattr(_local, "samples", None)
+    _local.samples = samples
+    try:
+        yield samples
+    finally:
+        _local.samples = previous
+
+# factory --------------------------------------------------------------
+
+def counter(name, documentation, labelnames=(), registry=REGISTRY):
+    """Factory function for counters registered with the server"""
+
+    return registry.register(Counter(name, documentation, labelnames))
+
+def gauge(name, documentation, labelnames=(), registry=REGISTRY):
+    """Factory function for gauges registered with the server"""
+
+    return registry.register(Gauge(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+    """Factory function for histograms registered with the server"""
+
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
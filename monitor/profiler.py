@@ -0,0 +1,203 @@
+# ----------------------------------------------------------------------
+#
+#                  On-demand Profiling of Aurora Commands
+#
+# Profiling session is started on a live server either for a number of
+# seconds or for the next number of requests of a handler. Commands that
+# are submitted to the executors while the session is active are marked
+# for profiling, executed under deterministic profiler (cProfile) by the
+# worker thread or process that picks them up, and the collected data
+# is merged into the profile of the session.
+#
+# ----------------------------------------------------------------------
+
+import os
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import itertools
+
+from contextlib import contextmanager
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+logger = logging.getLogger("tornado.application")
+
+_session_ids = itertools.count(1)
+
+# helpers --------------------------------------------------------------
+
+class StatsHolder():
+    """Wrapper that lets pstats.Stats load profile data sent by other processes"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+# profiling session ----------------------------------------------------
+
+class ProfileSession():
+    """Profile collected for N seconds, or for the next N requests of a handler"""
+
+    def __init__(self, seconds=None, requests=None, handler=None):
+        self.id         = next(_session_ids)
+        self.seconds    = seconds
+        self.requests   = requests
+        self.handler    = handler
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.remaining  = requests
+        self.pending    = 0
+        self.profiled   = 0
+        self.sources    = set()
+        self.stats      = None
+        self.lock       = threading.Lock()
+
+    def is_active(self):
+        if self.stopped_at is not None:
+            return False
+        if self.seconds is not None and time.time() - self.started_at >= self.seconds:
+            return False
+        if self.remaining is not None and self.remaining <= 0:
+            return False
+        return True
+
+    def is_complete(self):
+        return not self.is_active() and self.pending == 0
+
+    def accept(self, name):
+        """Decide if the command of request _name_ should be profiled"""
+
+        if self.handler is not None and name.split("::")[0] != self.handler:
+            return False
+
+        with self.lock:
+            if not self.is_active():
+                return False
+            if self.remaining is not None:
+                self.remaining -= 1
+            self.pending += 1
+            return True
+
+    def record(self, stats, source):
+        with self.lock:
+            self.pending  -= 1
+            self.profiled += 1
+            self.sources.add(source)
+            if self.stats is None:
+                self.stats = pstats.Stats(StatsHolder(stats))
+            else:
+                self.stats.add(StatsHolder(stats))
+
+    def abandon(self):
+        with self.lock:
+            self.pending -= 1
+
+    def stop(self):
+        if self.stopped_at is None:
+            self.stopped_at = time.time()
+
+    def describe(self):
+        return {
+            "id":           self.id,
+            "seconds":      self.seconds,
+            "requests":     self.requests,
+            "handler":      self.handler,
+            "active":       self.is_active(),
+            "complete":     self.is_complete(),
+            "profiled":     self.profiled,
+            "pending":      self.pending,
+            "sources":      len(self.sources),
+            "elapsed":      round((self.stopped_at or time.time()) - self.started_at, 3),
+        }
+
+    def report(self, sort="cumulative", limit=50):
+        """Format the aggregated profile as text"""
+
+        stream = StringIO()
+        stream.write("profile session %(id)s: %(profiled)s command(s) profiled "
+                     "in %(sources)s worker(s) over %(elapsed)s seconds\n\n" % self.describe())
+        with self.lock:
+            if self.stats is None:
+                stream.write("no commands were profiled\n")
+            else:
+                self.stats.stream = stream
+                self.stats.sort_stats(sort).print_stats(limit)
+
+        return stream.getvalue()
+
+# session management ---------------------------------------------------
+
+_session = None
+
+def start(seconds=None, requests=None, handler=None):
+    """Start new profiling session, the previous one is stopped"""
+
+    global _session
+
+    if _session is not None:
+        _session.stop()
+    _session = ProfileSession(seconds, requests, handler)
+    logger.info("profiling session %s started", _session.id)
+
+    return _session
+
+def session():
+    """Return the current (or the last) profiling session"""
+
+    return _session
+
+def mark(request_context):
+    """Mark the command of the request for profiling if there is active session
+
+    Called in the server process when the command is submitted to the
+    executor, the decision travels with the request context to the worker.
+    """
+
+    if request_context is None:
+        return
+    current = _session
+    if current is not None and current.accept(request_context.name):
+        request_context.profile = current.id
+
+def record(request_context, stats, source=None):
+    """Add profile data of command to the session it was marked for"""
+
+    current = _session
+    if current is not None and current.id == getattr(request_context, "profile", None):
+        current.record(stats, source or os.getpid())
+
+def abandon(request_context):
+    """Account for marked command that failed to return its profile data"""
+
+    current = _session
+    if current is not None and current.id == getattr(request_context, "profile", None):
+        current.abandon()
+
+@contextmanager
+def profiled(request_context, sink):
+    """Context manager that profiles its block if the request was marked for profiling
+
+    The profile data is handed to _sink_ that either records it in the
+    session, or keeps it to be sent back from the worker process.
+    """
+
+    if getattr(request_context, "profile", None) is None:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.create_stats()
+        sink(profile.stats)
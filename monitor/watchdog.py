@@ -0,0 +1,116 @@
+# ----------------------------------------------------------------------
+#
+#                  Watchdog of the Tornado IOLoop
+#
+# Any blocking call made on the IOLoop thread stops the processing of
+# every connection. The IOLoop regularly runs a heartbeat callback, and
+# the delay of every heartbeat against its schedule is recorded as the
+# event-loop lag. A separate thread watches the heartbeat and when the
+# IOLoop has not turned over for longer than the threshold it captures
+# the stack of the code that blocks it.
+#
+# ----------------------------------------------------------------------
+
+import sys
+import time
+import logging
+import threading
+import traceback
+
+from tornado.ioloop import IOLoop
+
+from apache.aurora.rest.monitor import metrics
+
+logger = logging.getLogger("tornado.general")
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+               1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+IOLOOP_LAG = metrics.histogram(
+    "aurora_rest_ioloop_lag_seconds",
+    "Delay of the IOLoop heartbeat against its schedule",
+    buckets=LAG_BUCKETS)
+
+IOLOOP_BLOCKED = metrics.counter(
+    "aurora_rest_ioloop_blocked_total",
+    "Number of times the IOLoop was blocked for longer than the threshold")
+
+IOLOOP_BLOCKED_SECONDS = metrics.histogram(
+    "aurora_rest_ioloop_blocked_seconds",
+    "Duration of the periods the IOLoop was blocked for longer than the threshold",
+    buckets=LAG_BUCKETS)
+
+# watchdog -------------------------------------------------------------
+
+class IOLoopWatchdog():
+    """Thread that detects when the IOLoop is blocked for longer than threshold"""
+
+    def __init__(self, io_loop, threshold_ms):
+        logger.info("IOLoopWatchdog(threshold=%d ms) created", threshold_ms)
+
+        self.io_loop    = io_loop
+        self.threshold  = threshold_ms / 1000.0
+        self.interval   = min(self.threshold / 2.0, 0.1)
+        self.heartbeat  = time.time()
+        self.scheduled  = None
+        self.thread_id  = None
+        self.blocked_at = None
+
+    def start(self):
+        self.io_loop.add_callback(self.beat)
+
+        thread = threading.Thread(target=self.watch, name="ioloop-watchdog")
+        thread.daemon = True
+        thread.start()
+
+    def beat(self):
+        """Heartbeat callback, runs on the IOLoop thread"""
+
+        now = time.time()
+        if self.thread_id is None:
+            self.thread_id = threading.current_thread().ident
+        if self.scheduled is not None:
+            IOLOOP_LAG.observe(max(0.0, now - self.scheduled))
+
+        self.heartbeat = now
+        if self.blocked_at is not None:
+            blocked = now - self.blocked_at
+            self.blocked_at = None
+            IOLOOP_BLOCKED_SECONDS.observe(blocked)
+            logger.warning("IOLoop resumed after being blocked for %d ms", blocked * 1000)
+
+        self.scheduled = now + self.interval
+        self.io_loop.add_timeout(self.scheduled, self.beat)
+
+    def watch(self):
+        """Watchdog loop, runs on its own thread"""
+
+        while True:
+            time.sleep(self.interval)
+
+            heartbeat = self.heartbeat
+            blocked = time.time() - heartbeat
+            if blocked <= self.threshold or self.blocked_at is not None:
+                continue
+
+            self.blocked_at = heartbeat
+            IOLOOP_BLOCKED.inc()
+            logger.warning("IOLoop blocked for more than %d ms, stack of the blocking code:\n%s",
+                           blocked * 1000, self.blocking_stack())
+
+    def blocking_stack(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return "  (stack of the IOLoop thread is not available)"
+
+        return "".join(traceback.format_stack(frame))
+
+# factory --------------------------------------------------------------
+
+def create(threshold_ms, io_loop=None):
+    """Factory function for IOLoop watchdog, the watchdog is started"""
+
+    watchdog = IOLoopWatchdog(io_loop or IOLoop.instance(), threshold_ms)
+    watchdog.start()
+
+    return watchdog
@@ -0,0 +1,101 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Registry of Applied Job Configurations
+# ----------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from apache.aurora.rest.apps import applied
+
+JOB = "c1/r/devel/job"
+
+class ExpandInstancesTest(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(applied.expand_instances([]), [])
+
+    def test_numbers_and_ranges(self):
+        self.assertEqual(applied.expand_instances([ "4-6,0", "2", 5 ]), [ 0, 2, 4, 5, 6 ])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, applied.expand_instances, [ "a" ])
+        self.assertRaises(ValueError, applied.expand_instances, [ "1-2-3" ])
+
+class IsAppliedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.configs = applied.AppliedConfigs()
+
+    def test_unknown_job(self):
+        self.assertFalse(self.configs.is_applied(JOB, "a", []))
+
+    def test_other_configuration(self):
+        self.configs.record(JOB, "a", [])
+        self.assertFalse(self.configs.is_applied(JOB, "b", []))
+
+    def test_applied_to_all_instances(self):
+        self.configs.record(JOB, "a", [])
+        self.assertTrue(self.configs.is_applied(JOB, "a", []))
+        self.assertTrue(self.configs.is_applied(JOB, "a", [ "3" ]))
+
+    def test_applied_to_some_instances(self):
+        self.configs.record(JOB, "a", [ "0-3" ])
+        self.assertTrue(self.configs.is_applied(JOB, "a", [ "1,2" ]))
+        self.assertTrue(self.configs.is_applied(JOB, "a", [ "3", "0-2" ]))
+        self.assertFalse(self.configs.is_applied(JOB, "a", [ "2-4" ]))
+        self.assertFalse(self.configs.is_applied(JOB, "a", []))
+
+    def test_invalid_instances(self):
+        self.configs.record(JOB, "a", [ "0-3" ])
+        self.assertFalse(self.configs.is_applied(JOB, "a", [ "x" ]))
+
+    def test_instances_of_same_configuration_merged(self):
+        self.configs.record(JOB, "a", [ "0-1" ])
+        self.configs.record(JOB, "a", [ "4" ])
+        self.assertEqual(self.configs.jobs[JOB]["instances"], [ 0, 1, 4 ])
+
+        self.configs.record(JOB, "b", [ "2" ])
+        self.assertEqual(self.configs.jobs[JOB]["instances"], [ 2 ])
+
+    def test_all_instances_kept(self):
+        self.configs.record(JOB, "a", [])
+        self.configs.record(JOB, "a", [ "4" ])
+        self.assertTrue(self.configs.is_applied(JOB, "a", []))
+
+    def test_unknown_configuration_forgets_job(self):
+        self.configs.record(JOB, "a", [])
+        self.configs.record(JOB, None, [])
+        self.assertFalse(JOB in self.configs.jobs)
+
+    def test_update_to_other_configuration_forgets_job(self):
+        self.configs.record(JOB, "a", [])
+        self.configs.submitted(JOB, "a")
+        self.assertTrue(self.configs.is_applied(JOB, "a", []))
+
+        # update to "b" is on its way, "a" must not be skipped behind it
+        self.configs.submitted(JOB, "b")
+        self.assertFalse(self.configs.is_applied(JOB, "a", []))
+
+class PersistenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "state", "applied.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_saved_and_loaded(self):
+        applied.AppliedConfigs(self.path).record(JOB, "a", [ "1" ])
+        self.assertTrue(applied.AppliedConfigs(self.path).is_applied(JOB, "a", [ "1" ]))
+
+    def test_unreadable_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("{ not json")
+        self.assertEqual(applied.AppliedConfigs(self.path).jobs, {})
+
+if __name__ == "__main__":
+    unittest.main()
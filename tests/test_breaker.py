@@ -0,0 +1,109 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Circuit Breaker per Cluster
+# ----------------------------------------------------------------------
+
+import socket
+import httplib
+import unittest
+
+import tornado.web
+from concurrent.futures import Future
+
+from apache.aurora.rest.executors import breaker
+
+def completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+def failed(exception):
+    future = Future()
+    future.set_exception(exception)
+    return future
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = breaker.CircuitBreaker("test", failures=3, reset=30.0, probes=1)
+
+    def fail(self, times=1, cluster="c1"):
+        for _ in range(times):
+            self.breaker.guard(cluster, lambda: failed(socket.error("connection refused")))
+
+    def state(self, cluster="c1"):
+        return self.breaker.circuits[cluster].state
+
+    def expire(self, cluster="c1"):
+        self.breaker.circuits[cluster].opened_at -= self.breaker.reset
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail(2)
+        self.assertEqual(self.state(), breaker.CLOSED)
+        self.fail()
+        self.assertEqual(self.state(), breaker.OPEN)
+
+    def test_success_resets_failures(self):
+        self.fail(2)
+        self.breaker.guard("c1", lambda: completed("ok"))
+        self.fail(2)
+        self.assertEqual(self.state(), breaker.CLOSED)
+
+    def test_open_circuit_rejects(self):
+        self.fail(3)
+        started = []
+        with self.assertRaises(breaker.ClusterUnavailable) as raised:
+            self.breaker.guard("c1", lambda: started.append(1))
+        self.assertEqual(raised.exception.status_code, httplib.SERVICE_UNAVAILABLE)
+        self.assertTrue(raised.exception.retry_after >= 1.0)
+        self.assertEqual(started, [])
+        self.assertEqual(self.breaker.circuits["c1"].rejected, 1)
+
+    def test_clusters_apart(self):
+        self.fail(3)
+        self.assertEqual(self.breaker.guard("c2", lambda: completed("ok")).result(), "ok")
+
+    def test_errors_of_the_server_not_counted(self):
+        for _ in range(5):
+            self.breaker.guard("c1", lambda: failed(tornado.web.HTTPError(httplib.SERVICE_UNAVAILABLE)))
+        self.assertEqual(self.state(), breaker.CLOSED)
+
+    def test_successful_probe_closes(self):
+        self.fail(3)
+        self.expire()
+        self.breaker.guard("c1", lambda: completed("ok"))
+        self.assertEqual(self.state(), breaker.CLOSED)
+        self.assertEqual(self.breaker.circuits["c1"].failures, 0)
+
+    def test_failed_probe_opens_again(self):
+        self.fail(3)
+        self.expire()
+        self.fail()
+        self.assertEqual(self.state(), breaker.OPEN)
+        self.assertRaises(breaker.ClusterUnavailable, self.fail)
+
+    def test_probes_limited(self):
+        self.fail(3)
+        self.expire()
+        probe = Future()
+        self.breaker.guard("c1", lambda: probe)
+        self.assertEqual(self.state(), breaker.HALF_OPEN)
+        self.assertRaises(breaker.ClusterUnavailable, self.breaker.guard, "c1", lambda: completed("ok"))
+
+        probe.set_result("ok")
+        self.assertEqual(self.state(), breaker.CLOSED)
+
+    def test_start_raising_counted(self):
+        def start():
+            raise socket.error("connection refused")
+        for _ in range(3):
+            self.assertRaises(socket.error, self.breaker.guard, "c1", start)
+        self.assertEqual(self.state(), breaker.OPEN)
+
+    def test_disabled(self):
+        disabled = breaker.CircuitBreaker("test", failures=0)
+        for _ in range(10):
+            disabled.guard("c1", lambda: failed(socket.error("connection refused")))
+        self.assertEqual(disabled.circuits, {})
+
+if __name__ == "__main__":
+    unittest.main()
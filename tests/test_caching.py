@@ -0,0 +1,81 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Job Listing Cache and Entity Tags
+# ----------------------------------------------------------------------
+
+import time
+import unittest
+
+from apache.aurora.rest.apps import caching
+
+JOBS = [ "c1/r/devel/job-1", "c1/r/devel/job-2" ]
+
+class EtagTest(unittest.TestCase):
+
+    def test_order_of_jobs_ignored(self):
+        self.assertEqual(caching.make_etag(JOBS), caching.make_etag(list(reversed(JOBS))))
+
+    def test_different_jobs(self):
+        self.assertNotEqual(caching.make_etag(JOBS), caching.make_etag(JOBS[:1]))
+
+    def test_quoted(self):
+        etag = caching.make_etag(JOBS)
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_matches(self):
+        etag = caching.make_etag(JOBS)
+        self.assertTrue(caching.etag_matches(etag, etag))
+        self.assertTrue(caching.etag_matches('"other", %s' % etag, etag))
+        self.assertTrue(caching.etag_matches("W/" + etag, etag))
+        self.assertTrue(caching.etag_matches(" * ", etag))
+
+    def test_does_not_match(self):
+        etag = caching.make_etag(JOBS)
+        self.assertFalse(caching.etag_matches('"other"', etag))
+        self.assertFalse(caching.etag_matches(None, etag))
+        self.assertFalse(caching.etag_matches("*", None))
+
+class JobListingCacheTest(unittest.TestCase):
+
+    def test_put_and_get(self):
+        cache = caching.JobListingCache(ttl=60)
+        etag = cache.put("c1", "r", JOBS)
+        self.assertEqual(cache.get("c1", "r"), etag)
+        self.assertEqual(cache.get("c1", "other"), None)
+
+    def test_disabled(self):
+        cache = caching.JobListingCache(ttl=0)
+        self.assertEqual(cache.put("c1", "r", JOBS), caching.make_etag(JOBS))
+        self.assertEqual(cache.get("c1", "r"), None)
+
+    def test_expired(self):
+        cache = caching.JobListingCache(ttl=60)
+        cache.put("c1", "r", JOBS)
+        cache.entries[("c1", "r")] = (cache.entries[("c1", "r")][0], time.time() - 1)
+        self.assertEqual(cache.get("c1", "r"), None)
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_invalidate(self):
+        cache = caching.JobListingCache(ttl=60)
+        cache.put("c1", "r", JOBS)
+        cache.put("c2", "r", JOBS)
+        cache.invalidate("c1", "r")
+        self.assertEqual(cache.get("c1", "r"), None)
+        self.assertNotEqual(cache.get("c2", "r"), None)
+
+    def test_purge_drops_expired(self):
+        cache = caching.JobListingCache(ttl=60, max_entries=2)
+        cache.put("c1", "r", JOBS)
+        cache.put("c2", "r", JOBS)
+        cache.entries[("c1", "r")] = (cache.entries[("c1", "r")][0], time.time() - 1)
+        cache.put("c3", "r", JOBS)
+        self.assertEqual(sorted(cache.entries.keys()), [ ("c2", "r"), ("c3", "r") ])
+
+    def test_purge_drops_all_when_none_expired(self):
+        cache = caching.JobListingCache(ttl=60, max_entries=2)
+        cache.put("c1", "r", JOBS)
+        cache.put("c2", "r", JOBS)
+        cache.put("c3", "r", JOBS)
+        self.assertEqual(list(cache.entries.keys()), [ ("c3", "r") ])
+
+if __name__ == "__main__":
+    unittest.main()
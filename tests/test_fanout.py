@@ -0,0 +1,78 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Listing of Jobs Across Clusters
+# ----------------------------------------------------------------------
+
+import time
+import socket
+import unittest
+
+from tornado.concurrent import Future
+from tornado.testing import AsyncTestCase
+
+from apache.aurora.rest.apps import fanout
+
+def completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+class ParseClustersTest(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(fanout.parse_clusters(" c1, c2,,c1 "), [ "c1", "c2" ])
+
+    def test_empty(self):
+        self.assertEqual(fanout.parse_clusters(","), [])
+        self.assertEqual(fanout.parse_clusters(None), [])
+
+class WaitAllTest(AsyncTestCase):
+
+    def test_nothing_to_wait_for(self):
+        self.assertTrue(fanout.wait_all([], io_loop=self.io_loop).done())
+
+    def test_waits_for_all(self):
+        (first, second) = (Future(), Future())
+        waiting = fanout.wait_all([ first, second ], io_loop=self.io_loop)
+
+        self.io_loop.add_callback(first.set_result, 1)
+        self.io_loop.add_timeout(time.time() + 0.05, lambda: second.set_exception(socket.error()))
+        self.io_loop.add_future(waiting, self.stop)
+        self.wait()
+
+        self.assertTrue(first.done() and second.done())
+
+    def test_deadline(self):
+        (first, second) = (completed(1), Future())
+        started = time.time()
+        waiting = fanout.wait_all([ first, second ], deadline=started + 0.05, io_loop=self.io_loop)
+
+        self.io_loop.add_future(waiting, self.stop)
+        self.wait()
+
+        self.assertFalse(second.done())
+        self.assertTrue(time.time() - started < 1.0)
+
+class OutcomeTest(unittest.TestCase):
+
+    def test_success(self):
+        outcome = fanout.outcome_of(completed(("c1/r", [ "c1/r/e/j" ], None)))
+        self.assertEqual(outcome, { "status": "success", "count": 1, "jobs": [ "c1/r/e/j" ] })
+
+    def test_errors(self):
+        outcome = fanout.outcome_of(completed(("c1/r", [], [ "failed" ])))
+        self.assertEqual(outcome["status"], "failure")
+
+    def test_timeout(self):
+        self.assertEqual(fanout.outcome_of(Future())["status"], "timeout")
+
+    def test_rejected_listing(self):
+        class Executor():
+            def list_jobs(self, cluster, role):
+                raise socket.error("connection refused")
+
+        outcome = fanout.outcome_of(fanout.start_listing(Executor(), "c1", "r"))
+        self.assertEqual(outcome["status"], "failure")
+        self.assertEqual(outcome["errors"], [ "error: connection refused" ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Request Handlers
+#
+# The handlers of the applications are exercised over HTTP with the
+# simulated executor, in every concurrency mode: synchronous, and the
+# coroutine, thread and process executors of the asynchronous
+# application.
+#
+# ----------------------------------------------------------------------
+
+import json
+import httplib
+import unittest
+
+from tornado.testing import AsyncHTTPTestCase
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from apache.aurora.rest.apps import application, application_async
+from apache.aurora.rest.executors import simulated_executor, coroutine_executor, \
+                                         mt_executor, mp_executor, retry
+
+JOBSPEC = "jobs = [ Job(name='hello') ]"
+
+SETTINGS = {
+    "list_cache_ttl":   60,
+    "clusters":         [ "c1", "c2" ],
+}
+
+class HandlersTest(object):
+    """Tests shared by the concurrency modes, mixed into AsyncHTTPTestCase"""
+
+    def get_app(self):
+        client = simulated_executor.create(latency_ms=1, distribution="constant", jobs_per_role=3)
+        return self.create_app(client)
+
+    def fetch_json(self, path, **kwargs):
+        response = self.fetch("/alpha" + path, **kwargs)
+        return (response, json.loads(response.body) if response.body else None)
+
+    def test_version(self):
+        (response, body) = self.fetch_json("/version")
+        self.assertEqual(response.code, httplib.OK)
+        self.assertEqual(body["status"], "success")
+
+    def test_list_jobs(self):
+        (response, body) = self.fetch_json("/jobs/c1/list")
+        self.assertEqual(response.code, httplib.OK)
+        self.assertEqual(body["count"], 3)
+        self.assertTrue(response.headers.get("Etag"))
+
+    def test_conditional_list_jobs(self):
+        (response, _) = self.fetch_json("/jobs/c1/etag")
+        (response, body) = self.fetch_json("/jobs/c1/etag",
+                                           headers={ "If-None-Match": response.headers["Etag"] })
+        self.assertEqual(response.code, httplib.NOT_MODIFIED)
+
+    def test_job_lifecycle(self):
+        # the simulated inventory is kept by the module, every mode has its own role
+        role = type(self).__name__.lower()
+        job = "/jobs/c1/%s/devel/hello" % role
+
+        (response, body) = self.fetch_json(job, method="PUT", body=JOBSPEC)
+        self.assertEqual(response.code, httplib.CREATED)
+
+        (response, body) = self.fetch_json("/jobs/c1/" + role)
+        self.assertTrue("c1/%s/devel/hello" % role in body["jobs"].values())
+
+        (response, body) = self.fetch_json(job + "/update", method="PUT", body=JOBSPEC)
+        self.assertEqual(response.code, httplib.OK)
+        self.assertEqual(body["status"], "unchanged")
+
+        (response, body) = self.fetch_json(job + "/update", method="PUT", body=JOBSPEC + "\n")
+        self.assertEqual(response.code, httplib.ACCEPTED)
+
+        (response, body) = self.fetch_json(job + "/restart", method="PUT", body="")
+        self.assertEqual(response.code, httplib.ACCEPTED)
+
+        (response, body) = self.fetch_json(job, method="DELETE")
+        self.assertEqual(response.code, httplib.OK)
+        self.assertEqual(body["job"], "c1/%s/devel/hello" % role)
+
+        (response, body) = self.fetch_json("/jobs/c1/" + role)
+        self.assertFalse("c1/%s/devel/hello" % role in body["jobs"].values())
+
+    def test_job_without_configuration(self):
+        (response, body) = self.fetch_json("/jobs/c1/bad/devel/hello", method="PUT", body="")
+        self.assertEqual(response.code, httplib.INTERNAL_SERVER_ERROR)
+        self.assertEqual(body["status"], "failure")
+
+    def test_fan_out(self):
+        (response, body) = self.fetch_json("/jobs/*/fan")
+        self.assertEqual(response.code, httplib.OK)
+        self.assertEqual(body["count"], 6)
+        self.assertEqual(sorted(body["clusters"].keys()), [ "c1", "c2" ])
+
+    def test_fan_out_without_clusters(self):
+        (response, body) = self.fetch_json("/jobs/,/fan")
+        self.assertEqual(response.code, httplib.BAD_REQUEST)
+
+class SyncHandlersTest(HandlersTest, AsyncHTTPTestCase):
+
+    def create_app(self, client):
+        return application.create("alpha", executor=client, **SETTINGS)
+
+    def test_fan_out(self):
+        (response, body) = self.fetch_json("/jobs/*/fan")
+        self.assertEqual(response.code, httplib.BAD_REQUEST)
+
+class CoroutineHandlersTest(HandlersTest, AsyncHTTPTestCase):
+
+    def create_app(self, client):
+        return application_async.create("alpha", executor=coroutine_executor.create(client),
+                                        **SETTINGS)
+
+class ThreadHandlersTest(HandlersTest, AsyncHTTPTestCase):
+
+    def create_app(self, client):
+        self.pool = ThreadPoolExecutor(4)
+        executor = mt_executor.create(client, thread_pool=self.pool, io_loop=self.io_loop)
+        return application_async.create("alpha", executor=executor, **SETTINGS)
+
+    def tearDown(self):
+        super(ThreadHandlersTest, self).tearDown()
+        self.pool.shutdown()
+
+class ProcessHandlersTest(HandlersTest, AsyncHTTPTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the process executor moves the state of these modules to shared memory
+        cls.saved = (simulated_executor._inventory, simulated_executor._inventory_lock,
+                     simulated_executor._shared, retry._shared, dict(retry._budgets))
+
+    @classmethod
+    def tearDownClass(cls):
+        (simulated_executor._inventory, simulated_executor._inventory_lock,
+         simulated_executor._shared, retry._shared, budgets) = cls.saved
+        retry._budgets.clear()
+        retry._budgets.update(budgets)
+
+    def create_app(self, client):
+        self.pool = ProcessPoolExecutor(2)
+        executor = mp_executor.create(client, process_pool=self.pool, io_loop=self.io_loop)
+        return application_async.create("alpha", executor=executor, **SETTINGS)
+
+    def tearDown(self):
+        super(ProcessHandlersTest, self).tearDown()
+        self.pool.shutdown()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Serialization of Mutations per Job
+# ----------------------------------------------------------------------
+
+import unittest
+
+from concurrent.futures import Future
+
+from apache.aurora.rest.executors import joblock
+from apache.aurora.rest.executors.pool import AdmissionControl, ExecutorOverloaded
+
+JOB   = ("c1", "r", "devel", "job")
+OTHER = ("c1", "r", "devel", "other")
+
+class JobLocksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.locks = joblock.JobLocks("test")
+        self.started = []
+
+    def command(self, name):
+        """Return _start_ of command that completes when its future is resolved"""
+
+        def start():
+            future = Future()
+            self.started.append((name, future))
+            return future
+        return start
+
+    def submit(self, method_name, args=JOB, kwargs={}, name=None):
+        return self.locks.submit(method_name, args, kwargs, self.command(name or method_name))
+
+    def complete(self, name, result="ok"):
+        for (started, future) in self.started:
+            if started == name and not future.done():
+                future.set_result(result)
+                return
+        self.fail("%s is not running" % name)
+
+    def names(self):
+        return [ name for (name, _) in self.started ]
+
+    def test_mutations_of_job_one_at_a_time(self):
+        update = self.submit("update_job")
+        restart = self.submit("restart_job")
+        self.assertEqual(self.names(), [ "update_job" ])
+
+        self.complete("update_job")
+        self.assertEqual(update.result(), "ok")
+        self.assertEqual(self.names(), [ "update_job", "restart_job" ])
+        self.assertFalse(restart.done())
+
+        self.complete("restart_job", "restarted")
+        self.assertEqual(restart.result(), "restarted")
+        self.assertEqual(self.locks.jobs, {})
+
+    def test_other_jobs_and_listings_in_parallel(self):
+        self.submit("update_job")
+        self.submit("update_job", OTHER, name="other")
+        self.submit("list_jobs", ("c1", "r"))
+        self.assertEqual(self.names(), [ "update_job", "other", "list_jobs" ])
+
+    def test_identical_waiting_mutations_coalesced(self):
+        self.submit("update_job")
+        first = self.submit("restart_job", kwargs={ "instances": [0] })
+        second = self.submit("restart_job", kwargs={ "instances": [0] })
+        self.assertTrue(first is second)
+        self.assertEqual(self.locks.waiting(), 1)
+
+        self.complete("update_job")
+        self.complete("restart_job")
+        self.assertEqual(self.names(), [ "update_job", "restart_job" ])
+        self.assertEqual(second.result(), "ok")
+
+    def test_different_arguments_not_coalesced(self):
+        self.submit("update_job")
+        first = self.submit("restart_job", kwargs={ "instances": [0] })
+        second = self.submit("restart_job", kwargs={ "instances": [1] })
+        self.assertFalse(first is second)
+        self.assertEqual(self.locks.waiting(), 2)
+
+    def test_running_mutation_not_coalesced(self):
+        running = self.submit("restart_job")
+        waiting = self.submit("restart_job")
+        self.assertFalse(running is waiting)
+
+    def test_coalescing_disabled(self):
+        self.locks = joblock.JobLocks("test", coalesce=False)
+        self.submit("update_job")
+        self.assertFalse(self.submit("restart_job") is self.submit("restart_job"))
+
+    def test_failed_start_releases_job(self):
+        def start():
+            raise RuntimeError("pool is shut down")
+        self.assertRaises(RuntimeError, self.locks.submit, "update_job", JOB, {}, start)
+        self.submit("restart_job")
+        self.assertEqual(self.names(), [ "restart_job" ])
+
+    def test_failed_start_of_waiting_mutation(self):
+        self.submit("update_job")
+        def start():
+            raise RuntimeError("pool is shut down")
+        waiting = self.locks.submit("restart_job", JOB, {}, start)
+        self.complete("update_job")
+        self.assertTrue(isinstance(waiting.exception(), RuntimeError))
+        self.assertEqual(self.locks.jobs, {})
+
+class AdmissionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.admission = AdmissionControl("test", 0, max_queued_mutations=1)
+        self.locks = joblock.JobLocks("test", admission=self.admission)
+        self.running = Future()
+
+    def test_waiting_mutations_admitted(self):
+        self.locks.submit("update_job", JOB, {}, lambda: self.running)
+        self.locks.submit("restart_job", JOB, {}, lambda: Future())
+        self.assertEqual(self.admission.outstanding["mutation"], 1)
+
+        self.assertRaises(ExecutorOverloaded, self.locks.submit,
+                          "kill_job", JOB, {}, lambda: Future())
+        self.assertEqual(self.locks.waiting(), 1)
+
+    def test_coalesced_mutations_not_admitted(self):
+        self.locks.submit("update_job", JOB, {}, lambda: self.running)
+        self.locks.submit("restart_job", JOB, {}, lambda: Future())
+        self.locks.submit("restart_job", JOB, {}, lambda: Future())
+        self.assertEqual(self.admission.outstanding["mutation"], 1)
+
+    def test_released_when_started(self):
+        self.locks.submit("update_job", JOB, {}, lambda: self.running)
+        self.locks.submit("restart_job", JOB, {}, lambda: Future())
+        self.running.set_result("ok")
+        self.assertEqual(self.admission.outstanding["mutation"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Adaptive Concurrency Limit
+# ----------------------------------------------------------------------
+
+import unittest
+
+from concurrent.futures import Future
+
+from apache.aurora.rest.executors import limiter
+
+def completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+def failed(exception):
+    future = Future()
+    future.set_exception(exception)
+    return future
+
+class SchedulerFailedTest(unittest.TestCase):
+
+    def test_success(self):
+        self.assertFalse(limiter.scheduler_failed(("c/r", [], None)))
+
+    def test_invalid_request(self):
+        self.assertFalse(limiter.scheduler_failed(("c/r/e/j", [], [
+            "Error reported by aurora client:",
+            "Response from scheduler: INVALID_REQUEST (message: No such job)" ])))
+
+    def test_errors_without_response_code(self):
+        self.assertFalse(limiter.scheduler_failed(("c/r/e/j", [
+            "Failed to create Aurora job", "Job configuration is missing (not provided)!" ])))
+
+    def test_error(self):
+        self.assertTrue(limiter.scheduler_failed(("c/r", [], [
+            "Failed to list Aurora jobs",
+            "Response from scheduler: ERROR (message: injected failure)" ])))
+
+    def test_error_transient(self):
+        self.assertTrue(limiter.scheduler_failed(("c/r/e/j", [
+            "Response from scheduler: ERROR_TRANSIENT (message: storage is busy)" ])))
+
+class AdaptiveLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = limiter.AdaptiveLimiter("test", 8, maximum=16)
+
+    def limit(self, cluster="c1"):
+        return self.limiter.clusters[cluster].limit
+
+    def test_invalid_request_keeps_limit(self):
+        result = ("c1/r/e/j", [], [ "Error reported by aurora client:",
+                  "Response from scheduler: INVALID_REQUEST (message: No such job)" ])
+        outcome = self.limiter.submit("c1", lambda: completed(result))
+
+        self.assertEqual(outcome.result(), result)
+        self.assertEqual(self.limit(), 8 + 1.0 / 8)
+        self.assertEqual(self.limiter.clusters["c1"].errors, 0)
+
+    def test_scheduler_error_cuts_limit(self):
+        result = ("c1/r", [], [ "Response from scheduler: ERROR (message: overloaded)" ])
+        self.limiter.submit("c1", lambda: completed(result))
+
+        self.assertEqual(self.limit(), 4)
+        self.assertEqual(self.limiter.clusters["c1"].errors, 1)
+
+    def test_exception_cuts_limit(self):
+        outcome = self.limiter.submit("c1", lambda: failed(IOError("connection refused")))
+
+        self.assertRaises(IOError, outcome.result)
+        self.assertEqual(self.limit(), 4)
+
+    def test_commands_over_limit_wait(self):
+        self.limiter = limiter.AdaptiveLimiter("test", 1, maximum=1)
+        first = Future()
+        self.limiter.submit("c1", lambda: first)
+        waiting = self.limiter.submit("c1", lambda: completed(("c1/r", [], None)))
+
+        self.assertFalse(waiting.done())
+        self.assertEqual(len(self.limiter.clusters["c1"].pending), 1)
+
+        first.set_result(("c1/r", [], None))
+        self.assertEqual(waiting.result(), ("c1/r", [], None))
+        self.assertEqual(self.limiter.clusters["c1"].in_flight, 0)
+
+    def test_clusters_are_independent(self):
+        self.limiter.submit("c1", lambda: failed(IOError("connection refused")))
+        self.limiter.submit("c2", lambda: completed(("c2/r", [], None)))
+
+        self.assertEqual(self.limit("c1"), 4)
+        self.assertTrue(self.limit("c2") > 8)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Tracking of Memory Allocations
+# ----------------------------------------------------------------------
+
+import unittest
+
+from apache.aurora.rest.monitor import memory
+from apache.aurora.rest.executors.context import RequestContext
+
+class MarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = memory.MemoryTracker()
+        self.tracker.sample_every = 2
+
+    def marked(self, name="ListJobsHandler"):
+        request_context = RequestContext(name)
+        self.tracker.mark(request_context)
+        return request_context.memory
+
+    def test_disabled(self):
+        self.tracker.sample_every = 0
+        self.assertFalse(self.marked())
+
+    def test_every_nth_command(self):
+        self.tracker.walk_interval = 0
+        self.assertEqual([ self.marked() for _ in range(4) ], [ False, True, False, True ])
+
+    def test_counted_per_handler(self):
+        self.tracker.walk_interval = 0
+        self.assertFalse(self.marked("ListJobsHandler"))
+        self.assertFalse(self.marked("UpdateJobHandler"))
+        self.assertTrue(self.marked("ListJobsHandler"))
+
+    @unittest.skipIf(memory.tracemalloc is not None, "live objects are walked only without tracemalloc")
+    def test_walks_rate_limited(self):
+        self.tracker.walk_interval = 3600
+        self.assertEqual([ self.marked() for _ in range(6) ], [ False, True, False, False, False, False ])
+
+        self.tracker.stop()
+        self.tracker.sample_every = 2
+        self.assertEqual([ self.marked() for _ in range(2) ], [ False, True ])
+
+class CompareTest(unittest.TestCase):
+
+    def test_growers(self):
+        growers = memory.compare({ "dict": [100, 1], "list": [50, 2] },
+                                 { "dict": [300, 3], "list": [50, 2], "str": [40, 1] })
+        self.assertEqual(growers, [ ("dict", 200, 2, 300), ("str", 40, 1, 40) ])
+
+if __name__ == "__main__":
+    unittest.main()
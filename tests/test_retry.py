@@ -0,0 +1,117 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Retry of Transient Scheduler Errors
+# ----------------------------------------------------------------------
+
+import socket
+import unittest
+
+from apache.aurora.rest.executors import retry
+
+class RetryBudgetTest(unittest.TestCase):
+
+    def test_reserve(self):
+        budget = retry.RetryBudget(ratio=0.5, reserve=2.0)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+    def test_calls_earn_retries(self):
+        budget = retry.RetryBudget(ratio=0.5, reserve=2.0)
+        budget.withdraw()
+        budget.withdraw()
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+    def test_reserve_is_maximum(self):
+        budget = retry.RetryBudget(ratio=1.0, reserve=1.0)
+        for _ in range(5):
+            budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+class SharedBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        retry._budgets.clear()
+        retry._shared = None
+        retry.share_budgets(slots=1024, reserve=2.0)
+
+    def tearDown(self):
+        retry._budgets.clear()
+        retry._shared = None
+
+    def test_slot_of_unicode_cluster(self):
+        slot = retry.slot_of(u"cl\u00fcster", 0.1, 1024)
+        self.assertEqual(slot, retry.slot_of(u"cl\u00fcster".encode("utf-8"), 0.1, 1024))
+
+    def test_slot_depends_on_ratio(self):
+        self.assertNotEqual(retry.slot_of("west", 0.1, 1024), retry.slot_of("west", 0.2, 1024))
+
+    def test_budget_kept_in_shared_memory(self):
+        budget = retry.budget_of(u"cl\u00fcster", 0.1)
+        self.assertTrue(isinstance(budget, retry.SharedRetryBudget))
+        self.assertTrue(budget is retry.budget_of(u"cl\u00fcster", 0.1))
+
+        budget.withdraw()
+        (tokens, _, _) = retry._shared
+        self.assertEqual(tokens[budget.slot], 1.0)
+
+    def test_ratios_do_not_share_budget(self):
+        first = retry.budget_of("west", 0.1)
+        second = retry.budget_of("west", 0.2)
+        self.assertNotEqual(first.slot, second.slot)
+
+        first.withdraw()
+        first.withdraw()
+        self.assertFalse(first.withdraw())
+        self.assertTrue(second.withdraw())
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        retry._budgets.clear()
+        self.attempts = []
+
+    def tearDown(self):
+        retry._budgets.clear()
+
+    def failing(self, failures):
+        def call():
+            self.attempts.append(None)
+            if len(self.attempts) <= failures:
+                raise socket.error("connection refused")
+            return "ok"
+        return call
+
+    def test_transient_error_retried(self):
+        policy = retry.RetryPolicy(retries=2, backoff=0.0)
+        self.assertEqual(policy.call("c1", "get_jobs", self.failing(2)), "ok")
+        self.assertEqual(len(self.attempts), 3)
+
+    def test_retries_limited(self):
+        policy = retry.RetryPolicy(retries=2, backoff=0.0)
+        self.assertRaises(socket.error, policy.call, "c1", "get_jobs", self.failing(3))
+        self.assertEqual(len(self.attempts), 3)
+
+    def test_mutation_not_retried(self):
+        policy = retry.RetryPolicy(retries=2, backoff=0.0)
+        self.assertRaises(socket.error, policy.call, "c1", "create_job", self.failing(1))
+        self.assertEqual(len(self.attempts), 1)
+
+    def test_transient_result_retried(self):
+        policy = retry.RetryPolicy(retries=1, backoff=0.0)
+        results = [ "ERROR_TRANSIENT", "OK" ]
+        result = policy.call("c1", "kill_job", lambda: results.pop(0),
+                             is_transient=lambda r: r == "ERROR_TRANSIENT")
+        self.assertEqual(result, "OK")
+
+    def test_spent_budget_stops_retries(self):
+        policy = retry.RetryPolicy(retries=100, backoff=0.0, budget=0.0)
+        self.assertRaises(socket.error, policy.call, "c1", "get_jobs", self.failing(100))
+        # the reserve of the budget and the first attempt
+        self.assertEqual(len(self.attempts), 11)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# ----------------------------------------------------------------------
+#                  Tests of the Search of Jobs Across Roles
+# ----------------------------------------------------------------------
+
+import socket
+import unittest
+
+from concurrent.futures import Future
+
+from apache.aurora.rest.apps import search
+
+JOBS = [ "c1/web/prod/frontend-api", "c1/web/devel/frontend_ui", "c1/batch/prod/report.daily" ]
+
+def completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+class TokensTest(unittest.TestCase):
+
+    def test_tokens(self):
+        self.assertEqual(search.tokens_of("c1/Web/prod/frontend-API"),
+                         set([ "web", "prod", "frontend-api", "frontend", "api" ]))
+
+class JobIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = search.JobIndex([ "c1", "c2" ])
+        self.index.update("c1", JOBS)
+
+    def test_covers(self):
+        self.assertTrue(self.index.covers("c1"))
+        self.assertFalse(self.index.covers("c3"))
+
+    def test_prefix(self):
+        self.assertEqual(self.index.search("front"), sorted(JOBS[:2]))
+        self.assertEqual(self.index.search("dail"), [ JOBS[2] ])
+        self.assertEqual(self.index.search("batch"), [ JOBS[2] ])
+        self.assertEqual(self.index.search("nothing"), [])
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.index.search("FRONTEND-API"), [ JOBS[0] ])
+
+    def test_glob_of_name(self):
+        self.assertEqual(self.index.search("front*ui"), [ JOBS[1] ])
+        self.assertEqual(self.index.search("*.daily"), [ JOBS[2] ])
+
+    def test_glob_of_path(self):
+        self.assertEqual(self.index.search("web/prod/*"), [ JOBS[0] ])
+
+    def test_cluster(self):
+        self.index.update("c2", [ "c2/web/prod/frontend-api" ])
+        self.assertEqual(self.index.search("frontend-api"),
+                         [ JOBS[0], "c2/web/prod/frontend-api" ])
+        self.assertEqual(self.index.search("frontend-api", "c2"), [ "c2/web/prod/frontend-api" ])
+
+    def test_update_adds_and_removes(self):
+        self.assertEqual(self.index.update("c1", JOBS[1:] + [ "c1/web/prod/backend" ]), (1, 1))
+        self.assertEqual(self.index.search("frontend-api"), [])
+        self.assertEqual(self.index.search("back"), [ "c1/web/prod/backend" ])
+        self.assertEqual(self.index.with_prefix("api"), [])
+
+    def test_tokens_kept_sorted(self):
+        self.index.add("c1/aaa/prod/zzz")
+        self.assertEqual(self.index.tokens, sorted(self.index.tokens))
+        self.index.remove("c1/aaa/prod/zzz")
+        self.assertFalse("aaa" in self.index.tokens)
+
+    def test_describe(self):
+        self.assertEqual(self.index.describe()["c1"]["jobs"], 3)
+        self.assertEqual(self.index.describe()["c2"]["jobs"], 0)
+
+class IndexRefresherTest(unittest.TestCase):
+
+    class Executor():
+        def __init__(self, results):
+            self.results = results
+
+        def list_all_jobs(self, cluster):
+            result = self.results[cluster]
+            if isinstance(result, Exception):
+                raise result
+            return completed(result)
+
+    class IOLoop():
+        def add_future(self, future, callback):
+            callback(future)
+
+    def refresh(self, results):
+        index = search.JobIndex(sorted(results.keys()))
+        refresher = search.IndexRefresher(index, self.Executor(results), 60, io_loop=self.IOLoop())
+        refresher.refresh()
+        return index
+
+    def test_refreshed(self):
+        index = self.refresh({ "c1": ("c1", JOBS, None) })
+        self.assertEqual(index.search("frontend"), sorted(JOBS[:2]))
+        self.assertNotEqual(index.status["c1"]["refreshed_at"], None)
+        self.assertEqual(index.status["c1"]["errors"], None)
+
+    def test_errors_reported(self):
+        index = self.refresh({ "c1": ("c1", [], [ "Response from scheduler: ERROR" ]),
+                               "c2": socket.error("connection refused") })
+        self.assertEqual(index.status["c1"]["errors"], [ "Response from scheduler: ERROR" ])
+        self.assertEqual(index.status["c2"]["errors"], [ "error: connection refused" ])
+        self.assertEqual(index.status["c1"]["refreshed_at"], None)
+
+if __name__ == "__main__":
+    unittest.main()